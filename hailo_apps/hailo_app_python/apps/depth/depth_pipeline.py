@@ -31,12 +31,14 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import (
     dummy_callback,
 )
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    ANALYTICS_BRANCH_PIPELINE,
     DISPLAY_PIPELINE,
     INFERENCE_PIPELINE,
     INFERENCE_PIPELINE_WRAPPER,
     SOURCE_PIPELINE,
     USER_CALLBACK_PIPELINE,
 )
+from hailo_apps.hailo_app_python.core.gstreamer.inference_gating import create_inference_gate
 
 hailo_logger = get_logger(__name__)  # same run_id everywhere
 
@@ -64,6 +66,14 @@ class GStreamerDepthApp(GStreamerApp):
         )
 
         self.app_callback = app_callback
+        # The depth wrapper uses its own name prefix; gate it instead of the default one
+        self.inference_gate = create_inference_gate(
+            self.options_menu, name="inference_wrapper_depth"
+        )
+        if self.inference_regions is not None:
+            # A depth map covers the whole frame; region crops would leave most of it empty
+            hailo_logger.warning("--roi is not supported by the depth app; inferring the whole frame")
+            self.inference_regions = None
         setproctitle.setproctitle(DEPTH_APP_TITLE)  # Set the process title
         hailo_logger.debug("Process title set to %s", DEPTH_APP_TITLE)
 
@@ -104,6 +114,7 @@ class GStreamerDepthApp(GStreamerApp):
             video_height=self.video_height,
             frame_rate=self.frame_rate,
             sync=self.sync,
+            video_format=self.video_format,
         )
         depth_pipeline = INFERENCE_PIPELINE(
             hef_path=self.hef_path,
@@ -112,11 +123,23 @@ class GStreamerDepthApp(GStreamerApp):
             name="depth_inference",
         )
         depth_pipeline_wrapper = INFERENCE_PIPELINE_WRAPPER(
-            depth_pipeline, name="inference_wrapper_depth"
+            depth_pipeline, name="inference_wrapper_depth", gated=self.inference_gate is not None
         )
         user_callback_pipeline = USER_CALLBACK_PIPELINE()
+        if self.analytics is not None:
+            user_callback_pipeline += " ! " + ANALYTICS_BRANCH_PIPELINE(
+                name=self.analytics.element_name,
+                max_fps=self.analytics.max_fps,
+                frame_size=self.analytics.frame_size,
+            )
         display_pipeline = DISPLAY_PIPELINE(
-            video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps
+            video_sink=self.video_sink,
+            sync=self.sync,
+            show_fps=self.show_fps,
+            latency_overlay=self.latency_overlay,
+            preview_size=self.preview_size,
+            preview_fps=self.preview_fps,
+            full_res_pipeline=self.full_res_pipeline,
         )
 
         pipeline_str = (
@@ -13,8 +13,10 @@ from gi.repository import Gst
 
 from hailo_apps.hailo_app_python.apps.detection.detection_pipeline import GStreamerDetectionApp
 from hailo_apps.hailo_app_python.core.common.buffer_utils import (
+    draw_color,
     get_caps_from_pad,
-    get_numpy_from_buffer,
+    get_rgb_numpy_from_buffer,
+    map_writable_frame,
 )
 
 # Logger
@@ -65,7 +67,7 @@ def app_callback(pad, info, user_data):
     frame = None
     if user_data.use_frame and format is not None and width is not None and height is not None:
         # Get video frame
-        frame = get_numpy_from_buffer(buffer, format, width, height)
+        frame = get_rgb_numpy_from_buffer(buffer, format, width, height)
 
     # Get the detections from the buffer
     roi = hailo.get_roi_from_buffer(buffer)
@@ -97,6 +99,19 @@ def app_callback(pad, info, user_data):
                 bbox.height(),
             )
             detection_count += 1
+    if user_data.draw_in_place:
+        # Draw on the frame that continues to the display: no copy and no separate window
+        with map_writable_frame(buffer, format, width, height) as writable_frame:
+            if writable_frame is not None:
+                cv2.putText(
+                    writable_frame,
+                    f"Detections: {detection_count}",
+                    (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1,
+                    draw_color(writable_frame, (0, 255, 0)),
+                    2,
+                )
     if user_data.use_frame:
         # Note: using imshow will not work here, as the callback function is not running in the main thread
         # Let's print the detection count to the frame
@@ -22,6 +22,7 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import (
     dummy_callback,
 )
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    ANALYTICS_BRANCH_PIPELINE,
     DISPLAY_PIPELINE,
     INFERENCE_PIPELINE,
     SOURCE_PIPELINE,
@@ -114,6 +115,7 @@ class GStreamerDetectionApp(GStreamerApp):
             video_height=self.video_height,
             frame_rate=self.frame_rate,
             sync=self.sync,
+            video_format=self.video_format,
             no_webcam_compression=True,
         )
 
@@ -126,8 +128,20 @@ class GStreamerDetectionApp(GStreamerApp):
             additional_params=self.thresholds_str,
         )
         user_callback_pipeline = USER_CALLBACK_PIPELINE()
+        if self.analytics is not None:
+            user_callback_pipeline += " ! " + ANALYTICS_BRANCH_PIPELINE(
+                name=self.analytics.element_name,
+                max_fps=self.analytics.max_fps,
+                frame_size=self.analytics.frame_size,
+            )
         display_pipeline = DISPLAY_PIPELINE(
-            video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps
+            video_sink=self.video_sink,
+            sync=self.sync,
+            show_fps=self.show_fps,
+            latency_overlay=self.latency_overlay,
+            preview_size=self.preview_size,
+            preview_fps=self.preview_fps,
+            full_res_pipeline=self.full_res_pipeline,
         )
 
         pipeline_string = (
@@ -45,8 +45,11 @@ from hailo_apps.hailo_app_python.core.common.defines import (
     BASIC_PIPELINES_VIDEO_EXAMPLE_NAME
 )
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import QUEUE, SOURCE_PIPELINE, INFERENCE_PIPELINE, INFERENCE_PIPELINE_WRAPPER, TRACKER_PIPELINE, USER_CALLBACK_PIPELINE, DISPLAY_PIPELINE, CROPPER_PIPELINE
+from hailo_apps.hailo_app_python.core.gstreamer.probe_dispatcher import APP_CALLBACK_ORDER
 # endregion
 
+VECTOR_DB_CALLBACK_ORDER = APP_CALLBACK_ORDER - 1  # the user callback sees the face_recon classifications
+
 class GStreamerFaceRecognitionApp(GStreamerApp):
     def __init__(self, app_callback, user_data, parser=None):
         setproctitle.setproctitle("Hailo Face Recognition App")
@@ -65,6 +68,8 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
         self.lance_db_vector_search_classificaiton_confidence_threshold = self.algo_params['lance_db_vector_search_classificaiton_confidence_threshold']
         # Both for face detection & recognition networks (not tunable from the UI)
         self.batch_size = self.algo_params['batch_size']
+        # Samples kept per person in the database, the most diverse ones (no bound if not set)
+        self.max_samples_per_record = self.algo_params.get('max_samples_per_record')
 
         # Initialize the database and table
         self.db_handler = DatabaseHandler(db_name='persons.db', 
@@ -72,7 +77,8 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
                                           schema=Record, 
                                           threshold=self.lance_db_vector_search_classificaiton_confidence_threshold,
                                           database_dir=get_resource_path(pipeline_name=None, resource_type=FACE_RECON_DIR_NAME, arch=self.arch, model=FACE_RECON_DATABASE_DIR_NAME),
-                                          samples_dir = get_resource_path(pipeline_name=None, resource_type=FACE_RECON_DIR_NAME, arch=self.arch, model=FACE_RECON_SAMPLES_DIR_NAME))
+                                          samples_dir = get_resource_path(pipeline_name=None, resource_type=FACE_RECON_DIR_NAME, arch=self.arch, model=FACE_RECON_SAMPLES_DIR_NAME),
+                                          max_samples_per_record=self.max_samples_per_record)
         
         if BASIC_PIPELINES_VIDEO_EXAMPLE_NAME in self.video_source:
             self.video_source = get_resource_path(pipeline_name=None, resource_type=RESOURCES_VIDEOS_DIR_NAME, arch=self.arch, model=FACE_RECOGNITION_VIDEO_NAME)
@@ -155,14 +161,12 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
                                                             f'{QUEUE(name="detector_pos_face_align_q")} ! '
                                                             f'{mobile_facenet_pipeline}'),
                                             so_path=self.post_process_so_cropper, function_name=self.cropper_func, internal_offset=True)
-        vector_db_callback_pipeline = USER_CALLBACK_PIPELINE(name=self.vector_db_callback_name)  # 'identity name' - is a GStreamer element that does nothing, but allows to add a probe to it
-        user_callback_pipeline = USER_CALLBACK_PIPELINE()
+        user_callback_pipeline = USER_CALLBACK_PIPELINE()  # the vector DB handler runs from the same probe, before the user callback
         display_pipeline = DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps)
 
         if self.options_menu.mode == 'train':
             source_pipeline = (f"multifilesrc location={self.current_file} loop=true num-buffers=30 ! "  # each image 30 times
                                f"decodebin ! videoconvert n-threads=4 qos=false ! video/x-raw, format=RGB, pixel-aspect-ratio=1/1 ")
-            vector_db_callback_pipeline = USER_CALLBACK_PIPELINE(name=self.train_vector_db_callback_name)
             display_pipeline = DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps)
 
         return (
@@ -170,7 +174,6 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
             f'{detection_pipeline_wrapper} ! '
             f'{tracker_pipeline} ! '
             f'{cropper_pipeline} ! '
-            f'{vector_db_callback_pipeline} ! '
             f'{user_callback_pipeline} ! '
             f'{display_pipeline}'
         )
@@ -223,16 +226,13 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
         print("Training completed")
 
     def connect_vector_db_callback(self):
-        identity = self.pipeline.get_by_name(self.vector_db_callback_name)
-        if identity:
-            identity_pad = identity.get_static_pad("src")  # src is the output of an element
-            identity_pad.add_probe(Gst.PadProbeType.BUFFER, self.vector_db_callback, self.user_data)  # trigger - when the pad gets buffer
+        # runs from the identity_callback probe, before the user callback (attached in run())
+        self.probe_dispatcher.register(self.vector_db_callback_name, self.vector_db_callback, self.user_data, order=VECTOR_DB_CALLBACK_ORDER)
     
     def connect_train_vector_db_callback(self):
-        identity = self.pipeline.get_by_name(self.train_vector_db_callback_name)
-        if identity:
-            identity_pad = identity.get_static_pad("src")  # src is the output of an element
-            identity_pad.add_probe(Gst.PadProbeType.BUFFER, self.train_vector_db_callback, self.user_data)  # trigger - when the pad gets buffer
+        # training does not go through run(), so the probe is attached to each new pipeline here
+        self.probe_dispatcher.register(self.train_vector_db_callback_name, self.train_vector_db_callback, self.user_data, order=VECTOR_DB_CALLBACK_ORDER)
+        self.probe_dispatcher.attach(self.pipeline)
 
     def save_image_file(self, frame, image_path):
         image = Image.fromarray(frame)  # Convert the frame to an image
@@ -305,7 +305,8 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
         format, width, height = get_caps_from_pad(pad)
         roi = hailo.get_roi_from_buffer(buffer)
         
-        # for each face detection
+        # for each face detection: collect the embeddings to look up
+        pending = []  # (detection, track_id, embedding vector)
         for detection in (d for d in roi.get_objects_typed(hailo.HAILO_DETECTION) if d.get_label() == 'face'):
             track_id = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)[0].get_id() if detection.get_objects_typed(hailo.HAILO_UNIQUE_ID) else None
             
@@ -315,7 +316,6 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
                 continue
             
             # after self.skip_frames  
-            frame = get_numpy_from_buffer_efficient(buffer, format, width, height)
             embedding = detection.get_objects_typed(hailo.HAILO_MATRIX)  # face recognition embedding
             if len(embedding) == 0:
                 continue  # if cropper pipeline element decided to pass the detection - it will arrive to this stage of the pipeline without face embedding
@@ -324,8 +324,14 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
                 detection.remove_object(embedding[0])
                 continue
             # exactly single embedding is expected, so we can safely remove it from the detection
-            embedding_vector = np.array(embedding[0].get_data())
-            person = self.db_handler.search_record(embedding=embedding_vector)  # most time consuming operation - search the database for the person with the closest embedding
+            pending.append((detection, track_id, np.array(embedding[0].get_data())))
+        if not pending:
+            return Gst.PadProbeReturn.OK
+
+        # most time consuming operation - search the database for the closest person of all the faces at once
+        persons = self.db_handler.search_records(np.stack([embedding_vector for _, _, embedding_vector in pending]))
+        frame = get_numpy_from_buffer_efficient(buffer, format, width, height) if self.user_data.telegram_enabled else None
+        for (detection, track_id, _), person in zip(pending, persons):
             new_confidence = (1-person['_distance'])
             classification = detection.get_objects_typed(hailo.HAILO_CLASSIFICATION)
             if not classification or classification[0].get_confidence() < new_confidence:
@@ -367,7 +373,7 @@ class GStreamerFaceRecognitionApp(GStreamerApp):
             self.add_task('save_image', frame=cropped_frame, image_path=image_path)  # Add the frame to the queue for processing
             name = os.path.basename(os.path.dirname(self.current_file))
             if self.is_name_processed(name):
-                self.db_handler.insert_new_sample(record=self.db_handler.get_record_by_id(self.get_processed_names_by_name(name)), embedding=embedding_vector, sample=image_path, timestamp=int(time.time())) 
+                self.db_handler.insert_new_sample(record=self.db_handler.get_record_by_id(self.get_processed_names_by_name(name), with_samples=False), embedding=embedding_vector, sample=image_path, timestamp=int(time.time())) 
                 print(f"Adding face to: {name}")
             else: 
                 person = self.db_handler.create_record(embedding=embedding_vector, sample=image_path, timestamp=int(time.time()), label=name)
@@ -17,7 +17,7 @@ from hailo_apps.hailo_app_python.apps.instance_segmentation.instance_segmentatio
 )
 from hailo_apps.hailo_app_python.core.common.buffer_utils import (
     get_caps_from_pad,
-    get_numpy_from_buffer,
+    get_rgb_numpy_from_buffer,
 )
 
 # Logger
@@ -86,7 +86,7 @@ def app_callback(pad, info, user_data):
     reduced_frame = None
     if user_data.use_frame and format is not None and width is not None and height is not None:
         hailo_logger.debug("Extracting frame from buffer for processing.")
-        frame = get_numpy_from_buffer(buffer, format, width, height)
+        frame = get_rgb_numpy_from_buffer(buffer, format, width, height)
         reduced_frame = cv2.resize(
             frame, (reduced_width, reduced_height), interpolation=cv2.INTER_AREA
         )
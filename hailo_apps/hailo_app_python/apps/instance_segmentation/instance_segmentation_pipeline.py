@@ -26,6 +26,7 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import (
     dummy_callback,
 )
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    ANALYTICS_BRANCH_PIPELINE,
     DISPLAY_PIPELINE,
     INFERENCE_PIPELINE,
     INFERENCE_PIPELINE_WRAPPER,
@@ -138,6 +139,7 @@ class GStreamerInstanceSegmentationApp(GStreamerApp):
             video_height=self.video_height,
             frame_rate=self.frame_rate,
             sync=self.sync,
+            video_format=self.video_format,
         )
 
         infer_pipeline = INFERENCE_PIPELINE(
@@ -147,13 +149,27 @@ class GStreamerInstanceSegmentationApp(GStreamerApp):
             batch_size=self.batch_size,
             config_json=self.config_file,
         )
-        infer_pipeline_wrapper = INFERENCE_PIPELINE_WRAPPER(infer_pipeline)
+        infer_pipeline_wrapper = INFERENCE_PIPELINE_WRAPPER(
+            infer_pipeline,
+            gated=self.inference_gate is not None,
+            crop_regions=self.inference_regions is not None,
+        )
         tracker_pipeline = TRACKER_PIPELINE(class_id=1)
         user_callback_pipeline = USER_CALLBACK_PIPELINE()
+        if self.analytics is not None:
+            user_callback_pipeline += " ! " + ANALYTICS_BRANCH_PIPELINE(
+                name=self.analytics.element_name,
+                max_fps=self.analytics.max_fps,
+                frame_size=self.analytics.frame_size,
+            )
         display_pipeline = DISPLAY_PIPELINE(
             video_sink=self.video_sink,
             sync=self.sync,
             show_fps=self.show_fps,
+            latency_overlay=self.latency_overlay,
+            preview_size=self.preview_size,
+            preview_fps=self.preview_fps,
+            full_res_pipeline=self.full_res_pipeline,
         )
 
         pipeline_string = (
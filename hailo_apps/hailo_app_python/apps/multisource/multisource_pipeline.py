@@ -15,6 +15,7 @@ from hailo_apps.hailo_app_python.core.common.core import get_default_parser, get
 from hailo_apps.hailo_app_python.core.common.defines import TAPPAS_STREAM_ID_TOOL_SO_FILENAME, MULTI_SOURCE_APP_TITLE, SIMPLE_DETECTION_PIPELINE, RESOURCES_MODELS_DIR_NAME, RESOURCES_SO_DIR_NAME, DETECTION_POSTPROCESS_SO_FILENAME, DETECTION_POSTPROCESS_FUNCTION, TAPPAS_POSTPROC_PATH_KEY
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import get_source_type, USER_CALLBACK_PIPELINE, TRACKER_PIPELINE, QUEUE, SOURCE_PIPELINE, INFERENCE_PIPELINE, DISPLAY_PIPELINE
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import GStreamerApp, app_callback_class, dummy_callback
+from hailo_apps.hailo_app_python.core.gstreamer.probe_dispatcher import APP_CALLBACK_ORDER
 # endregion imports
 
 # User Gstreamer Application: This class inherits from the common.GStreamerApp class
@@ -56,7 +57,7 @@ class GStreamerMultisourceApp(GStreamerApp):
                                               frame_rate=self.frame_rate, sync=self.sync, name=f"source_{id}", no_webcam_compression=False)
             sources_string += f"! hailofilter name=set_src_{id} so-path={set_stream_id_so} config-path=src_{id} "
             sources_string += f"! robin.sink_{id} "
-            router_string += f"router.src_{id} ! {USER_CALLBACK_PIPELINE(name=f'src_{id}_callback')} ! {QUEUE(name=f'callback_q_{id}')} ! {DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps, name=f'hailo_display_{id}')} "
+            router_string += f"router.src_{id} ! {DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps, name=f'hailo_display_{id}')} "
 
         self.thresholds_str = (
             f"nms-score-threshold=0.3 "
@@ -98,11 +99,10 @@ class GStreamerMultisourceApp(GStreamerApp):
             setattr(self, f'src_{id}_callback', callback_function)
 
     def connect_src_callbacks(self):
+        # Per-source handlers run from the identity_callback probe (after the user callback), each on the buffers of its own stream
         for id in range(self.num_sources):
-            identity = self.pipeline.get_by_name(f'src_{id}_callback')
-            identity_pad = identity.get_static_pad(f'src')
             callback_function = getattr(self, f'src_{id}_callback', None)
-            identity_pad.add_probe(Gst.PadProbeType.BUFFER, callback_function, self.user_data)
+            self.probe_dispatcher.register(f'src_{id}_callback', callback_function, self.user_data, stream_id=f'src_{id}', order=APP_CALLBACK_ORDER + 1)
 
 def main():
     # Create an instance of the user app callback class
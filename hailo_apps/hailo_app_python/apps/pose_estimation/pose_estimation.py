@@ -15,8 +15,10 @@ from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline i
     GStreamerPoseEstimationApp,
 )
 from hailo_apps.hailo_app_python.core.common.buffer_utils import (
+    draw_color,
     get_caps_from_pad,
-    get_numpy_from_buffer,
+    get_rgb_numpy_from_buffer,
+    map_writable_frame,
 )
 
 # Logger
@@ -57,13 +59,14 @@ def app_callback(pad, info, user_data):
     frame = None
     if user_data.use_frame and format and width and height:
         hailo_logger.debug("Extracting frame from buffer.")
-        frame = get_numpy_from_buffer(buffer, format, width, height)
+        frame = get_rgb_numpy_from_buffer(buffer, format, width, height)
 
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
     hailo_logger.debug("Number of detections: %d", len(detections))
 
     keypoints = get_keypoints()
+    eye_points = []
 
     for detection in detections:
         label = detection.get_label()
@@ -93,9 +96,17 @@ def app_callback(pad, info, user_data):
                     y = int((point.y() * bbox.height() + bbox.ymin()) * height)
                     hailo_logger.debug("Eye %s position: x=%d y=%d", eye, x, y)
                     string_to_print += f"{eye}: x: {x:.2f} y: {y:.2f}\n"
+                    eye_points.append((x, y))
                     if user_data.use_frame:
                         cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
 
+    if user_data.draw_in_place and eye_points:
+        # Draw on the frame that continues to the display: no copy and no separate window
+        with map_writable_frame(buffer, format, width, height) as writable_frame:
+            if writable_frame is not None:
+                for x, y in eye_points:
+                    cv2.circle(writable_frame, (x, y), 5, draw_color(writable_frame, (0, 255, 0)), -1)
+
     if user_data.use_frame:
         frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
         user_data.set_frame(frame)
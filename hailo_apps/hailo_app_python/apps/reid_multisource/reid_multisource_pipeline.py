@@ -17,6 +17,7 @@ from hailo import HailoTracker
 from hailo_apps.hailo_app_python.core.common.core import get_default_parser, get_resource_path
 from hailo_apps.hailo_app_python.core.common.db_handler import DatabaseHandler, Record
 from hailo_apps.hailo_app_python.core.common.installation_utils import detect_host_arch
+from hailo_apps.hailo_app_python.core.common.write_behind import WRITE_BEHIND_FLUSH_INTERVAL
 from hailo_apps.hailo_app_python.core.common.defines import (
     ALL_DETECTIONS_CROPPER_POSTPROCESS_SO_FILENAME,
     ARCFACE_MOBILEFACENET_POSTPROCESS_FUNCTION,
@@ -59,6 +60,7 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines impor
     get_source_type
 )
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import GStreamerApp, app_callback_class, dummy_callback
+from hailo_apps.hailo_app_python.core.gstreamer.probe_dispatcher import APP_CALLBACK_ORDER
 # endregion imports
 
 # User Gstreamer Application: This class inherits from the common.GStreamerApp class
@@ -123,7 +125,8 @@ class GStreamerREIDMultisourceApp(GStreamerApp):
                                           schema=Record, 
                                           threshold=self.lance_db_vector_search_classificaiton_confidence_threshold,
                                           database_dir=get_resource_path(pipeline_name=None, resource_type=MULTI_SOURCE_DIR_NAME, arch=self.arch, model=MULTI_SOURCE_DATABASE_DIR_NAME),
-                                          samples_dir=None)
+                                          samples_dir=None,
+                                          write_behind_interval=WRITE_BEHIND_FLUSH_INTERVAL)  # records are created from the streaming thread
 
     def get_pipeline_string(self):
         sources_string = ''
@@ -137,7 +140,7 @@ class GStreamerREIDMultisourceApp(GStreamerApp):
                                               frame_rate=self.frame_rate, sync=self.sync, name=f"source_{id}", no_webcam_compression=True)
             sources_string += f"! hailofilter name=set_src_{id} so-path={set_stream_id_so} config-path='src_{id}' "
             sources_string += f"! robin.sink_{id} "
-            router_string += f"router.src_{id} ! {USER_CALLBACK_PIPELINE(name=f'src_{id}_callback')} ! {QUEUE(name=f'callback_q_{id}')} ! {DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps, name=f'hailo_display_{id}')} "
+            router_string += f"router.src_{id} ! {DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps, name=f'hailo_display_{id}')} "
 
         detection_pipeline = INFERENCE_PIPELINE(hef_path=self.hef_path_scrfd_detection, post_process_so=self.post_process_so_scrfd_detection, post_function_name=self.post_function_scrfd_detection, batch_size=self.batch_size, config_json=get_resource_path(pipeline_name=None, resource_type=RESOURCES_JSON_DIR_NAME, arch=self.arch, model=FACE_DETECTION_JSON_NAME))
         tracker_pipeline = TRACKER_PIPELINE(class_id=-1, name='hailo_face_tracker')
@@ -171,14 +174,18 @@ class GStreamerREIDMultisourceApp(GStreamerApp):
                 if buffer is None:
                     return Gst.PadProbeReturn.OK
                 roi = hailo.get_roi_from_buffer(buffer)
-                detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-                for detection in detections:
+                detections = []  # (detection, embedding vector)
+                for detection in roi.get_objects_typed(hailo.HAILO_DETECTION):
                     embedding = detection.get_objects_typed(hailo.HAILO_MATRIX)
                     if len(embedding) == 0:
                         continue
-                    embedding_vector = np.array(embedding[0].get_data())
-                    res = self.db_handler.search_record(embedding=embedding_vector)
-                    s_id = roi.get_stream_id().replace("'", "")
+                    detections.append((detection, np.array(embedding[0].get_data())))
+                if not detections:
+                    return Gst.PadProbeReturn.OK
+                # Look up all the embeddings of the frame at once
+                results = self.db_handler.search_records(np.stack([embedding_vector for _, embedding_vector in detections]))
+                s_id = roi.get_stream_id().replace("'", "")
+                for (detection, embedding_vector), res in zip(detections, results):
                     classifications = detection.get_objects_typed(hailo.HAILO_CLASSIFICATION)  # remove all old classifications both from detection object & tracker's detection pointer 
                     for classification in classifications:
                         detection.remove_object(classification)
@@ -199,11 +206,10 @@ class GStreamerREIDMultisourceApp(GStreamerApp):
             setattr(self, f'src_{id}_callback', callback_function)
     
     def connect_src_callbacks(self):
+        # Per-source handlers run from the identity_callback probe (after the user callback), each on the buffers of its own stream
         for id in range(self.num_sources):
-            identity = self.pipeline.get_by_name(f'src_{id}_callback')
-            identity_pad = identity.get_static_pad(f'src')
             callback_function = getattr(self, f'src_{id}_callback', None)
-            identity_pad.add_probe(Gst.PadProbeType.BUFFER, callback_function, self.user_data)
+            self.probe_dispatcher.register(f'src_{id}_callback', callback_function, self.user_data, stream_id=f'src_{id}', order=APP_CALLBACK_ORDER + 1)
 
 def main():
     # Create an instance of the user app callback class
@@ -245,7 +245,11 @@ class GStreamerTilingApp(GStreamerApp):
         display_pipeline = DISPLAY_PIPELINE(
             video_sink=self.video_sink,
             sync=self.sync,
-            show_fps=self.show_fps
+            show_fps=self.show_fps,
+            latency_overlay=self.latency_overlay,
+            preview_size=self.preview_size,
+            preview_fps=self.preview_fps,
+            full_res_pipeline=self.full_res_pipeline,
         )
 
         pipeline_string = (
@@ -1,9 +1,12 @@
 # region imports
+from contextlib import contextmanager
+
 import gi
 
 gi.require_version("Gst", "1.0")
+gi.require_version("GstVideo", "1.0")
 import numpy as np
-from gi.repository import Gst
+from gi.repository import Gst, GstVideo
 
 from .defines import HAILO_NV12_VIDEO_FORMAT, HAILO_RGB_VIDEO_FORMAT, HAILO_YUYV_VIDEO_FORMAT
 from .hailo_logger import get_logger
@@ -100,3 +103,118 @@ def get_numpy_from_buffer_efficient(buffer, format, width, height):
     finally:
         buffer.unmap(map_info)
         hailo_logger.debug("Buffer unmapped successfully")
+
+
+def nv12_to_rgb(y_plane, uv_plane):
+    """Converts NV12 planes (as returned by handle_nv12) to an RGB frame, using the BT.601
+    limited-range coefficients of GStreamer's videoconvert for SD/HD content.
+
+    Args:
+        y_plane (np.ndarray): Luma plane, shape (height, width).
+        uv_plane (np.ndarray): Interleaved chroma plane, shape (height // 2, width // 2, 2).
+
+    Returns:
+        np.ndarray: RGB frame, shape (height, width, 3), dtype uint8.
+    """
+    height, width = y_plane.shape
+    y = (y_plane.astype(np.int32) - 16) * 298
+    # Each chroma sample covers a 2x2 block of luma samples
+    uv = uv_plane.astype(np.int32).repeat(2, axis=0).repeat(2, axis=1)[:height, :width] - 128
+    u, v = uv[..., 0], uv[..., 1]
+    rgb = np.empty((height, width, 3), dtype=np.int32)
+    rgb[..., 0] = y + 409 * v
+    rgb[..., 1] = y - 100 * u - 208 * v
+    rgb[..., 2] = y + 516 * u
+    rgb += 128
+    rgb >>= 8
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+
+def get_rgb_numpy_from_buffer(buffer, format, width, height):
+    """Returns the frame of a buffer as an RGB numpy array, whatever the pipeline format.
+
+    RGB frames are copied as is. NV12 frames (--nv12) are converted here, so the conversion is only
+    paid in callbacks that actually draw on or analyze the full frame.
+    """
+    frame = get_numpy_from_buffer(buffer, format, width, height)
+    if format == HAILO_NV12_VIDEO_FORMAT:
+        return nv12_to_rgb(*frame)
+    return frame
+
+
+_read_only_mapping_logged = False
+
+# Value drawn on the luma plane of an NV12 frame, which has no color: white
+NV12_DRAW_LUMA = 255
+
+
+def _first_plane_layout(buffer, format, width, height):
+    """Returns the (offset, stride) of the first plane of a raw video buffer: from its video meta
+    when the producer attached one (padded strides, e.g. from decoders), else GStreamer's default
+    layout for the format and size."""
+    meta = GstVideo.buffer_get_video_meta(buffer)
+    if meta is not None:
+        return meta.offset[0], meta.stride[0]
+    info = GstVideo.VideoInfo.new()
+    info.set_format(GstVideo.VideoFormat.from_string(format), width, height)
+    return info.offset[0], info.stride[0]
+
+
+def draw_color(frame, color):
+    """Returns the color to draw with on a map_writable_frame() view: color on an RGB view, or the
+    scalar NV12_DRAW_LUMA on the luma plane of an NV12 frame (cv2 would draw only the first
+    channel of color there, e.g. black for green)."""
+    return NV12_DRAW_LUMA if frame.ndim == 2 else color
+
+
+@contextmanager
+def map_writable_frame(buffer, format, width, height):
+    """Maps a buffer for writing and yields a numpy view of its frame, to draw on it in place.
+
+    The drawing stays on the frame that continues down the pipeline (hailooverlay, display), with no
+    copy, color conversion or separate window as with --use-frame. Use it from a pad probe:
+
+        with map_writable_frame(buffer, format, width, height) as frame:
+            if frame is not None:
+                color = draw_color(frame, (0, 255, 0))
+                cv2.putText(frame, "text", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+
+    The view is an RGB (height, width, 3) array, or the luma plane (height, width) for NV12 frames
+    (see draw_color()). It is only valid inside the block.
+
+    Yields:
+        np.ndarray or None: None when the format is not supported or the buffer cannot be written
+        (e.g. it is shared with another branch, or the Python bindings only map read-only copies).
+    """
+    if format not in (HAILO_RGB_VIDEO_FORMAT, HAILO_NV12_VIDEO_FORMAT):
+        hailo_logger.debug(f"In-place drawing not supported for format: {format}")
+        yield None
+        return
+    success, map_info = buffer.map(Gst.MapFlags.READ | Gst.MapFlags.WRITE)
+    if not success:
+        hailo_logger.debug("Buffer is not writable; skipping in-place drawing")
+        yield None
+        return
+    try:
+        offset, stride = _first_plane_layout(buffer, format, width, height)
+        if format == HAILO_RGB_VIDEO_FORMAT:
+            frame = np.ndarray(
+                shape=(height, width, 3),
+                dtype=np.uint8,
+                buffer=map_info.data,
+                offset=offset,
+                strides=(stride, 3, 1),
+            )
+        else:
+            frame = np.ndarray(
+                shape=(height, width), dtype=np.uint8, buffer=map_info.data, offset=offset, strides=(stride, 1)
+            )
+        if not frame.flags.writeable:
+            global _read_only_mapping_logged
+            if not _read_only_mapping_logged:
+                hailo_logger.warning("The GStreamer Python bindings map buffers read-only; in-place drawing is unavailable")
+                _read_only_mapping_logged = True
+            frame = None
+        yield frame
+    finally:
+        buffer.unmap(map_info)
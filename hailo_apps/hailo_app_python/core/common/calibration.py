@@ -0,0 +1,136 @@
+# region imports
+# Standard library imports
+import threading
+
+# Third-party imports
+import numpy as np
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Range of the calibrated classification confidence thresholds: the most spread identity gets the
+# lowest threshold, the most compact one the highest
+CALIBRATION_MIN_THRESHOLD = 0.1
+CALIBRATION_MAX_THRESHOLD = 0.9
+# Upper bound of the padded sample block (float32 elements) decomposed at once, about 64 MB
+CALIBRATION_CHUNK_ELEMENTS = 1 << 24
+
+
+def group_principal_stds(keys: np.ndarray, vectors: np.ndarray, n_components: int = 2):
+    """Returns, for each group of vectors, the standard deviations along its top principal axes.
+
+    The standard deviation along the i-th principal axis of a group of n vectors is s_i / sqrt(n),
+    s_i being the i-th singular value of the centered vectors, so no covariance matrix is formed.
+    The groups are sorted by size and zero-padded to the largest size of their chunk (zero rows
+    do not change the singular values), then each chunk is decomposed by one batched thin SVD.
+
+    Args:
+        keys (np.ndarray): The group of each vector.
+        vectors (np.ndarray): (n_vectors, dim) vectors.
+        n_components (int): The number of principal axes. Defaults to 2.
+
+    Returns:
+        tuple: (unique keys, (n_keys, n_components) standard deviations, number of vectors of each
+            key). Groups smaller than n_components have zeros for the missing axes.
+    """
+    unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    stds = np.zeros((len(unique_keys), n_components))
+    if len(unique_keys) == 0:
+        return unique_keys, stds, counts
+    dim = vectors.shape[1]
+    # Center each group, with its vectors contiguous
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    vectors = vectors[order].astype(np.float64)
+    means = np.add.reduceat(vectors, starts, axis=0) / counts[:, None]
+    centered = (vectors - np.repeat(means, counts, axis=0)).astype(np.float32)
+
+    by_size = np.argsort(counts, kind="stable")
+    by_size = by_size[counts[by_size] > 1]  # a single vector has no spread
+    begin = 0
+    while begin < len(by_size):
+        # The next groups (ascending sizes) whose padded block fits in the chunk
+        end = begin + 1
+        while end < len(by_size) and (end - begin + 1) * counts[by_size[end]] * dim <= CALIBRATION_CHUNK_ELEMENTS:
+            end += 1
+        groups = by_size[begin:end]
+        largest = counts[groups[-1]]
+        sizes = counts[groups]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        rows = np.arange(sizes.sum()) - np.repeat(offsets, sizes)  # row of each vector in its block
+        padded = np.zeros((len(groups), largest, dim), dtype=np.float32)
+        padded[np.repeat(np.arange(len(groups)), sizes), rows] = centered[np.repeat(starts[groups], sizes) + rows]
+        singular_values = np.linalg.svd(padded, compute_uv=False)[:, :n_components]
+        stds[groups, : singular_values.shape[1]] = singular_values / np.sqrt(sizes)[:, None]
+        begin = end
+    return unique_keys, stds, counts
+
+
+def spread_areas(keys: np.ndarray, vectors: np.ndarray):
+    """Returns, for each group of vectors, the area of its confidence ellipse: pi times the standard
+    deviations along its two principal axes (0 for a group of less than 2 vectors).
+
+    Returns:
+        tuple: (unique keys, areas).
+    """
+    unique_keys, stds, _ = group_principal_stds(keys, vectors, n_components=2)
+    return unique_keys, np.pi * stds[:, 0] * stds[:, 1]
+
+
+def thresholds_from_areas(areas: np.ndarray) -> np.ndarray:
+    """Maps the areas to thresholds between CALIBRATION_MIN_THRESHOLD (largest area) and
+    CALIBRATION_MAX_THRESHOLD (smallest area), linearly."""
+    areas = np.asarray(areas, dtype=np.float64)
+    if len(areas) > 0 and np.max(areas) != np.min(areas):  # Avoid division by zero
+        norm_areas = (areas - np.min(areas)) / (np.max(areas) - np.min(areas))
+    else:
+        norm_areas = np.zeros_like(areas)
+    return CALIBRATION_MIN_THRESHOLD + (CALIBRATION_MAX_THRESHOLD - CALIBRATION_MIN_THRESHOLD) * (1 - norm_areas)
+
+
+class CalibrationState:
+    """The spread areas of the identities at their last calibration, and the identities whose
+    samples changed since, so a calibration only decomposes the changed identities.
+
+    The owner reports the changes (mark_changed(), remove()); invalidate() forgets everything and
+    the next calibration is a full one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.areas = {}
+        self.changed = set()
+        self.loaded = False
+
+    def mark_changed(self, global_id):
+        with self._lock:
+            self.changed.add(global_id)
+
+    def remove(self, global_ids):
+        with self._lock:
+            for global_id in global_ids:
+                self.areas.pop(global_id, None)
+                self.changed.discard(global_id)
+
+    def invalidate(self):
+        with self._lock:
+            self.areas = {}
+            self.changed = set()
+            self.loaded = False
+
+    def take_changed(self):
+        """Returns the identities changed since the last call, and forgets them."""
+        with self._lock:
+            changed, self.changed = self.changed, set()
+            return changed
+
+    def update(self, global_ids, areas, full=False):
+        """Stores the areas of global_ids (all the identities if full)."""
+        with self._lock:
+            if full:
+                self.areas = {}
+                self.loaded = True
+            self.areas.update(zip(global_ids, (float(area) for area in areas), strict=True))
@@ -91,6 +91,45 @@ def load_environment(env_file=DEFAULT_DOTENV_PATH, required_vars=None) -> bool:
     return True
 
 
+def parse_frame_size(value):
+    """Parses a 'WIDTHxHEIGHT' command line value (e.g. 640x360) into a (width, height) tuple."""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size '{value}', expected WIDTHxHEIGHT (e.g. 640x360)") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid size '{value}', width and height must be > 0")
+    return width, height
+
+
+def parse_frame_rate(value):
+    """Parses a frame rate limit command line value. videorate's max-rate is a whole number of
+    frames per second, so the value must be an integer >= 1."""
+    try:
+        fps = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid frame rate '{value}', expected a whole number of frames per second") from None
+    if fps < 1:
+        raise argparse.ArgumentTypeError(f"Invalid frame rate '{value}', it must be >= 1")
+    return fps
+
+
+def parse_region(value):
+    """Parses a region of interest 'x,y,w,h' in normalized (0-1) frame coordinates (e.g.
+    0.25,0.1,0.5,0.8) into a (xmin, ymin, width, height) tuple."""
+    try:
+        xmin, ymin, width, height = (float(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid region '{value}', expected X,Y,W,H (e.g. 0.25,0.1,0.5,0.8)") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid region '{value}', width and height must be > 0")
+    if xmin < 0 or ymin < 0 or xmin + width > 1.0 or ymin + height > 1.0:
+        raise argparse.ArgumentTypeError(
+            f"Invalid region '{value}', it must be inside the frame (normalized 0-1 coordinates)"
+        )
+    return xmin, ymin, width, height
+
+
 def get_default_parser():
     hailo_logger.debug("Creating default argparse parser.")
     parser = argparse.ArgumentParser(description="Hailo App Help")
@@ -103,6 +142,10 @@ def get_default_parser():
         Defaults to application specific video."
     )
     parser.add_argument("--use-frame", "-u", action="store_true", help="Use frame from the callback function")
+    parser.add_argument(
+        "--draw-in-place", action="store_true",
+        help="Let the callback draw directly on the frame that goes to the display (no copy and no separate window, unlike --use-frame)."
+    )
     parser.add_argument("--show-fps", "-f", action="store_true", help="Print FPS on sink")
     parser.add_argument(
             "--arch",
@@ -128,6 +171,102 @@ def get_default_parser():
         "--frame-rate", "-r", type=int, default=30,
         help="Frame rate of the video source. Default is 30."
     )
+    parser.add_argument(
+        "--nv12", action="store_true",
+        help="Keep frames in NV12 from decode to display; only the model input is converted to RGB. Supported by the detection, pose estimation, instance segmentation and depth applications."
+    )
+    parser.add_argument(
+        "--preview-size", type=parse_frame_size, default=None, metavar="WxH",
+        help="Downscale the displayed video to WxH (e.g. 640x360) before drawing the overlay, so the display cost does not grow with the source resolution."
+    )
+    parser.add_argument(
+        "--preview-fps", type=parse_frame_rate, default=None,
+        help="Maximum frame rate of the display. Processing still runs at the source frame rate."
+    )
+    parser.add_argument(
+        "--record", type=str, default=None, metavar="FILE",
+        help="Record the full-resolution video, without overlay, to FILE (.mkv). The display branch is split from the recording and drops frames rather than slowing it down."
+    )
+    parser.add_argument(
+        "--analytics-fps", type=parse_frame_rate, default=None,
+        help="Maximum frame rate of the analytics branch (when the app's user data defines analytics_callback). Default is no limit: as fast as the callback runs."
+    )
+    parser.add_argument(
+        "--analytics-size", type=parse_frame_size, default=None, metavar="WxH",
+        help="Frame size passed to analytics_callback, e.g. 640x360. Default is the stream size."
+    )
+    parser.add_argument(
+        "--coalesce-queues", action="store_true",
+        help="Merge queues that are directly linked to each other in the composed pipeline, saving a thread and a buffering point per merge. Logs the streaming thread count before and after."
+    )
+    parser.add_argument(
+        "--low-latency", action="store_true",
+        help="Live sources only: drop frames in the source, inference input and display queues instead of queueing them, and use a tighter pipeline latency."
+    )
+    parser.add_argument(
+        "--measure-latency", action="store_true",
+        help="Draw the running time of each frame on the display and log the capture-to-display latency. Film the display with the camera to measure glass-to-glass latency."
+    )
+    parser.add_argument(
+        "--frame-deadline-ms", type=float, default=None,
+        help="Drop frames older than this many milliseconds (since capture) right before inference, so late frames are not inferred and displayed late. Counters are kept per source."
+    )
+    parser.add_argument(
+        "--inference-stride", type=int, default=1,
+        help="Run inference only on every Nth frame; frames in between reuse the last detections. Default is 1 (every frame)."
+    )
+    parser.add_argument(
+        "--inference-fps", type=float, default=None,
+        help="Target inference rate in frames per second. Overrides --inference-stride when set."
+    )
+    parser.add_argument(
+        "--extrapolate-metadata", action="store_true",
+        help="Move reused detections along their last observed motion on frames that skip inference."
+    )
+    parser.add_argument(
+        "--metadata-export", type=str, default=None, metavar="DEST",
+        help="Stream the detections of every frame as JSON records to DEST: jsonl:<path>, unix:<socket path> or udp:<host>:<port>. Records are dropped, not queued, when DEST cannot keep up."
+    )
+    parser.add_argument(
+        "--detection-log", type=str, default=None, metavar="DIR",
+        help="Log every detection to a Parquet dataset in DIR, partitioned by date and stream id (date=YYYY-MM-DD/stream_id=<id>/)."
+    )
+    parser.add_argument(
+        "--shm-output", type=str, default=None, metavar="NAME",
+        help="Publish frames and their detections to the shared memory segment NAME. Other local processes read them with SharedMemoryFrameReader (core/common/shm_frames.py)."
+    )
+    parser.add_argument(
+        "--shm-slots", type=int, default=4,
+        help="Number of frames kept in the --shm-output ring. Default is 4."
+    )
+    parser.add_argument(
+        "--roi", action="append", type=parse_region, default=None, metavar="X,Y,W,H",
+        help="Run inference only on this region of the frame, in normalized (0-1) coordinates, e.g. 0.25,0.1,0.5,0.8. Can be repeated for several regions."
+    )
+    parser.add_argument(
+        "--gated-metadata", choices=["last", "empty"], default="last",
+        help="Metadata of frames that skip inference: reuse the last detections ('last') or pass them without detections ('empty'). Default is 'last'."
+    )
+    parser.add_argument(
+        "--motion-gate", action="store_true",
+        help="Skip inference while the scene is static (downscaled frame differencing). Useful for static cameras."
+    )
+    parser.add_argument(
+        "--motion-threshold", type=float, default=0.01,
+        help="Fraction of changed pixels that counts as motion for --motion-gate. Default is 0.01."
+    )
+    parser.add_argument(
+        "--motion-pixel-threshold", type=int, default=25,
+        help="Minimum luma difference (0-255) for a pixel to count as changed for --motion-gate. Default is 25."
+    )
+    parser.add_argument(
+        "--motion-hold-frames", type=int, default=15,
+        help="Number of frames to keep running inference after motion stops. Default is 15."
+    )
+    parser.add_argument(
+        "--motion-keyframe-interval", type=int, default=60,
+        help="Run inference at least every N frames even on a static scene (0 disables). Default is 60."
+    )
     return parser
 
 
@@ -0,0 +1,431 @@
+"""Benchmarks of the record database (db_handler.DatabaseHandler) on synthetic embeddings.
+
+Usage:
+    python -m hailo_apps.hailo_app_python.core.common.db_benchmark search --records 100 10000 100000
+    python -m hailo_apps.hailo_app_python.core.common.db_benchmark samples --records 100 1000
+    python -m hailo_apps.hailo_app_python.core.common.db_benchmark bulk --records 1000 2000
+    python -m hailo_apps.hailo_app_python.core.common.db_benchmark calibrate --records 100 1000 5000
+    python -m hailo_apps.hailo_app_python.core.common.db_benchmark compact --records 10000 100000
+"""
+
+# region imports
+# Standard library imports
+import argparse
+import functools
+import json
+import tempfile
+import time
+import uuid
+
+# Third-party imports
+import lancedb
+import numpy as np
+import pyarrow as pa
+from lancedb.pydantic import LanceModel, Vector
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.calibration import spread_areas
+from hailo_apps.hailo_app_python.core.common.db_handler import (
+    DatabaseHandler,
+    Record,
+    vectors_to_numpy,
+)
+from hailo_apps.hailo_app_python.core.common.embedding_cache import EmbeddingCache
+
+# endregion imports
+
+EMBEDDING_DIM = 512
+DEFAULT_BENCHMARK_RECORDS = (100, 10_000, 100_000)
+DEFAULT_BENCHMARK_QUERIES = 200
+DEFAULT_BENCHMARK_SAMPLES_PER_RECORD = 20
+DEFAULT_BENCHMARK_INSERTS = 50
+DEFAULT_BENCHMARK_BULK_RECORDS = (1000, 2000)
+DEFAULT_BENCHMARK_CALIBRATE_RECORDS = (100, 1000, 5000)
+DEFAULT_BENCHMARK_COMPACT_RECORDS = (10_000, 100_000)
+# Look-alike identities of the compact benchmark: clusters of records, their spread around the
+# cluster center and the noise of the queries
+BENCHMARK_CLUSTER_SIZE = 10
+BENCHMARK_CLUSTER_SPREAD = 0.02
+BENCHMARK_QUERY_NOISE = 0.05
+
+
+def random_embeddings(rng, count, dim=EMBEDDING_DIM):
+    return rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def populate(handler, count, rng, samples_per_record=1):
+    """Adds count records with random embeddings, and their samples, to the handler's tables."""
+    embeddings = random_embeddings(rng, count)
+    global_ids = [str(uuid.uuid4()) for _ in range(count)]
+    timestamp = int(time.time())
+    table = pa.table(
+        {
+            "global_id": global_ids,
+            "label": [f"person_{i}" for i in range(count)],
+            "avg_embedding": pa.FixedSizeListArray.from_arrays(pa.array(embeddings.ravel()), EMBEDDING_DIM),
+            "last_sample_recieved_time": pa.array(np.full(count, timestamp), pa.int64()),
+            "classificaiton_confidence_threshold": np.full(count, handler.classificaiton_confidence_threshold),
+            "value": np.zeros(count),
+            "num_samples": np.full(count, samples_per_record),
+        }
+    )
+    handler.tbl_records.add(table.cast(handler.tbl_records.schema))
+    sample_embeddings = sample_embeddings_around(rng, embeddings, samples_per_record)
+    samples = pa.table(
+        {
+            "id": [str(uuid.uuid4()) for _ in range(count * samples_per_record)],
+            "global_id": np.repeat(global_ids, samples_per_record),
+            "embedding": pa.FixedSizeListArray.from_arrays(pa.array(sample_embeddings.ravel()), EMBEDDING_DIM),
+            "sample_path": pa.nulls(count * samples_per_record, pa.string()),
+            "timestamp": pa.array(np.full(count * samples_per_record, timestamp), pa.int64()),
+        }
+    )
+    handler.tbl_samples.add(samples.cast(handler.tbl_samples.schema))
+    return embeddings
+
+
+def sample_embeddings_around(rng, embeddings, samples_per_record):
+    """Returns samples_per_record noisy copies of each embedding, grouped by embedding."""
+    repeated = np.repeat(embeddings, samples_per_record, axis=0)
+    return repeated + 0.1 * random_embeddings(rng, len(repeated))
+
+
+def create_handler(database_dir, use_embedding_cache=True):
+    return DatabaseHandler(
+        db_name="benchmark.db",
+        table_name="persons",
+        schema=Record,
+        threshold=0.5,
+        database_dir=database_dir,
+        samples_dir=database_dir,
+        use_embedding_cache=use_embedding_cache,
+    )
+
+
+def time_per_call(function, arguments):
+    """Returns the mean time (ms) of function(argument) over the arguments."""
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return 1000 * (time.perf_counter() - start) / len(arguments)
+
+
+def benchmark_search(record_counts=DEFAULT_BENCHMARK_RECORDS, queries=DEFAULT_BENCHMARK_QUERIES, seed=0):
+    """Mean search_record latency through LanceDB and through the embedding cache."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in record_counts:
+        with tempfile.TemporaryDirectory() as database_dir:
+            lancedb_handler = create_handler(database_dir, use_embedding_cache=False)
+            embeddings = populate(lancedb_handler, count, rng)
+            cached_handler = create_handler(database_dir)
+            # Queries close to stored records, as in a running application
+            picks = rng.integers(0, count, queries)
+            query_embeddings = embeddings[picks] + 0.1 * random_embeddings(rng, queries)
+            start = time.perf_counter()
+            cached_handler.load_embedding_cache()
+            load_ms = 1000 * (time.perf_counter() - start)
+            rows.append(
+                {
+                    "records": count,
+                    "lancedb_ms": time_per_call(lancedb_handler.search_record, query_embeddings),
+                    "cache_ms": time_per_call(cached_handler.search_record, query_embeddings),
+                    "cache_load_ms": load_ms,
+                }
+            )
+    return rows
+
+
+class LegacyRecord(LanceModel):
+    """The records schema before the samples table: every sample serialized in samples_json."""
+
+    global_id: str
+    label: str
+    avg_embedding: Vector(EMBEDDING_DIM)  # type: ignore the warning
+    last_sample_recieved_time: int
+    samples_json: str
+    classificaiton_confidence_threshold: float
+    value: float = 0.0
+
+
+def legacy_populate(table, count, rng, samples_per_record):
+    embeddings = random_embeddings(rng, count)
+    sample_embeddings = sample_embeddings_around(rng, embeddings, samples_per_record)
+    timestamp = int(time.time())
+    rows = []
+    for i, embedding in enumerate(embeddings):
+        samples = [
+            {"embedding": sample.tolist(), "sample_path": None, "id": str(uuid.uuid4())}
+            for sample in sample_embeddings[i * samples_per_record : (i + 1) * samples_per_record]
+        ]
+        rows.append(
+            {
+                "global_id": str(uuid.uuid4()),
+                "label": f"person_{i}",
+                "avg_embedding": embedding.tolist(),
+                "last_sample_recieved_time": timestamp,
+                "samples_json": json.dumps(samples),
+                "classificaiton_confidence_threshold": 0.5,
+                "value": 0.0,
+            }
+        )
+    table.add(rows)
+    return embeddings
+
+
+def legacy_insert_new_sample(table, global_id, embedding):
+    """The sample insertion of the samples_json schema: parse, append, average, serialize."""
+    record = table.search().where(f"global_id = '{global_id}'").to_list()[0]
+    samples = json.loads(record["samples_json"])
+    samples.append({"embedding": embedding.tolist(), "sample_path": None, "id": str(uuid.uuid4())})
+    avg_embedding = np.mean([np.array(sample["embedding"]) for sample in samples], axis=0)
+    table.update(
+        where=f"global_id = '{global_id}'",
+        values={"avg_embedding": avg_embedding, "samples_json": json.dumps(samples), "last_sample_recieved_time": 0},
+    )
+
+
+def legacy_search_record(table, embedding):
+    """The search of the samples_json schema: LanceDB query and parse of the winner's samples."""
+    result = table.search(embedding.tolist(), vector_column_name="avg_embedding").metric("cosine").limit(1).to_list()
+    if result:
+        result[0]["samples_json"] = json.loads(result[0]["samples_json"])
+    return result
+
+
+def legacy_read_calibration_embeddings(table):
+    """The sample embeddings read of the samples_json calibration: one JSON parse per record."""
+    return [
+        np.array([sample["embedding"] for sample in json.loads(record["samples_json"])])
+        for record in table.search().to_list()
+    ]
+
+
+def read_calibration_embeddings(handler):
+    """The sample embeddings read of the calibration with the samples table."""
+    samples = handler.tbl_samples.to_arrow().select(["global_id", "embedding"])
+    return vectors_to_numpy(samples, "embedding")
+
+
+def benchmark_samples(
+    record_counts=DEFAULT_BENCHMARK_RECORDS,
+    samples_per_record=DEFAULT_BENCHMARK_SAMPLES_PER_RECORD,
+    inserts=DEFAULT_BENCHMARK_INSERTS,
+    queries=DEFAULT_BENCHMARK_QUERIES,
+    seed=0,
+):
+    """Sample insertion, search (LanceDB) and calibration input read with the samples stored as
+    JSON text in the records (before) and in the samples table (after)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in record_counts:
+        with tempfile.TemporaryDirectory() as database_dir:
+            legacy_table = lancedb.connect(database_dir).create_table("legacy", schema=LegacyRecord)
+            legacy_embeddings = legacy_populate(legacy_table, count, rng, samples_per_record)
+            handler = create_handler(database_dir, use_embedding_cache=False)
+            embeddings = populate(handler, count, rng, samples_per_record)
+
+            legacy_ids = legacy_table.to_arrow().column("global_id").to_pylist()
+            global_ids = handler.tbl_records.to_arrow().column("global_id").to_pylist()
+            picks = rng.integers(0, count, inserts)
+            new_samples = random_embeddings(rng, inserts)
+            legacy_queries = legacy_embeddings[rng.integers(0, count, queries)]
+            search_queries = embeddings[rng.integers(0, count, queries)]
+
+            row = {"records": count, "samples": count * samples_per_record}
+            row["insert_before_ms"] = time_per_call(
+                lambda i, legacy_table=legacy_table, legacy_ids=legacy_ids, picks=picks, new_samples=new_samples: (
+                    legacy_insert_new_sample(legacy_table, legacy_ids[picks[i]], new_samples[i])
+                ),
+                range(inserts),
+            )
+            row["insert_after_ms"] = time_per_call(
+                lambda i, handler=handler, global_ids=global_ids, picks=picks, new_samples=new_samples: (
+                    handler.insert_new_sample({"global_id": global_ids[picks[i]]}, new_samples[i], None, 0)
+                ),
+                range(inserts),
+            )
+            row["search_before_ms"] = time_per_call(functools.partial(legacy_search_record, legacy_table), legacy_queries)
+            row["search_after_ms"] = time_per_call(handler.search_record, search_queries)
+            row["calibrate_read_before_ms"] = time_per_call(legacy_read_calibration_embeddings, [legacy_table])
+            row["calibrate_read_after_ms"] = time_per_call(read_calibration_embeddings, [handler])
+            rows.append(row)
+    return rows
+
+
+def loop_update_threshold_for_all(handler, threshold):
+    """The per-record threshold update: one query and one commit per record."""
+    for record in handler.get_all_records(with_samples=False):
+        handler.tbl_records.update(
+            where=f"global_id = '{record['global_id']}'", values={"classificaiton_confidence_threshold": threshold}
+        )
+
+
+def loop_latest_unknown(handler):
+    """The latest 'Unknown' record search of clear_unknown_labels_keep_latest(): one query per record."""
+    records = handler.tbl_records.search().where("label = 'Unknown'").to_list()
+    return max(records, key=lambda record: handler.get_records_last_sample_recieved_time(record["global_id"]))
+
+
+def bulk_latest_unknown(handler):
+    unknowns = handler.tbl_records.search().where("label = 'Unknown'").select(["global_id", "last_sample_recieved_time"]).to_arrow()
+    return unknowns.column("global_id")[int(np.argmax(unknowns.column("last_sample_recieved_time").to_numpy()))].as_py()
+
+
+def loop_keep_only_last_sample(handler, global_id):
+    """keep_only_last_sample() removing the samples one by one (average embedding updated each time)."""
+    for sample in handler.get_samples(global_id, with_embeddings=False)[:-1]:
+        handler.remove_sample_by_id(global_id, sample["id"])
+
+
+def loop_update_thresholds(handler, global_ids, thresholds):
+    """The threshold updates of the calibration: one commit per record."""
+    for global_id, threshold in zip(global_ids, thresholds, strict=True):
+        handler.update_record_classificaiton_confidence_threshold(global_id, threshold)
+
+
+def benchmark_bulk(record_counts=DEFAULT_BENCHMARK_BULK_RECORDS, samples_per_record=DEFAULT_BENCHMARK_SAMPLES_PER_RECORD, seed=0):
+    """Maintenance operations as per-record loops (before) and as set-based operations (after)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in record_counts:
+        with tempfile.TemporaryDirectory() as database_dir:
+            handler = create_handler(database_dir, use_embedding_cache=False)
+            populate(handler, count, rng, samples_per_record)
+            global_ids = handler.tbl_records.to_arrow().column("global_id").to_pylist()
+            handler.tbl_records.update(values={"label": "Unknown"})
+            thresholds = rng.uniform(0.1, 0.9, count)
+
+            row = {"records": count}
+            row["threshold_all_before_ms"] = time_per_call(functools.partial(loop_update_threshold_for_all, handler), [0.4])
+            row["threshold_all_after_ms"] = time_per_call(handler.update_classification_confidence_threshold_for_all, [0.6])
+            row["latest_unknown_before_ms"] = time_per_call(loop_latest_unknown, [handler])
+            row["latest_unknown_after_ms"] = time_per_call(bulk_latest_unknown, [handler])
+            row["keep_last_before_ms"] = time_per_call(functools.partial(loop_keep_only_last_sample, handler), global_ids[:1])
+            row["keep_last_after_ms"] = time_per_call(handler.keep_only_last_sample, global_ids[1:2])
+            row["calibrate_update_before_ms"] = time_per_call(
+                functools.partial(loop_update_thresholds, handler, global_ids), [thresholds]
+            )
+            row["calibrate_update_after_ms"] = time_per_call(
+                functools.partial(handler.update_records_classificaiton_confidence_thresholds, global_ids), [thresholds]
+            )
+            rows.append(row)
+    return rows
+
+
+def loop_calibration_areas(handler):
+    """The area computation of the per-record calibration: a 512x512 covariance and eigh per record."""
+    samples = handler.tbl_samples.to_arrow().select(["global_id", "embedding"])
+    all_embeddings = vectors_to_numpy(samples, "embedding")
+    rows_by_record = {}
+    for row, global_id in enumerate(samples.column("global_id").to_pylist()):
+        rows_by_record.setdefault(global_id, []).append(row)
+    areas = []
+    for rows in rows_by_record.values():
+        if len(rows) < 2:
+            areas.append(0)
+            continue
+        reduced_embeddings, _, _ = handler.perform_pca(all_embeddings[rows], n_components=2)
+        std_dev = np.std(reduced_embeddings, axis=0)
+        areas.append(np.pi * std_dev[0] * std_dev[1])
+    return areas
+
+
+def benchmark_calibrate(record_counts=DEFAULT_BENCHMARK_CALIBRATE_RECORDS, samples_per_record=DEFAULT_BENCHMARK_SAMPLES_PER_RECORD, seed=0):
+    """Threshold calibration: per-record PCA areas (before), the vectorized full calibration and the
+    calibration of the changed records only, after one new sample (after)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in record_counts:
+        with tempfile.TemporaryDirectory() as database_dir:
+            handler = create_handler(database_dir, use_embedding_cache=False)
+            populate(handler, count, rng, samples_per_record)
+            global_id = handler.tbl_records.search().select(["global_id"]).limit(1).to_list()[0]["global_id"]
+            row = {"records": count, "samples": count * samples_per_record}
+            row["areas_before_ms"] = time_per_call(loop_calibration_areas, [handler])
+            row["areas_after_ms"] = time_per_call(
+                lambda samples: spread_areas(
+                    samples.column("global_id").to_numpy(zero_copy_only=False), vectors_to_numpy(samples, "embedding")
+                ),
+                [handler.tbl_samples.to_arrow().select(["global_id", "embedding"])],
+            )
+            row["calibrate_full_ms"] = time_per_call(handler.calibrate_classification_confidence_threshold, [False])
+            handler.insert_new_sample({"global_id": global_id}, random_embeddings(rng, 1)[0], None, 0)
+            row["calibrate_changed_ms"] = time_per_call(handler.calibrate_classification_confidence_threshold, [True])
+            rows.append(row)
+    return rows
+
+
+def benchmark_compact(record_counts=DEFAULT_BENCHMARK_COMPACT_RECORDS, queries=DEFAULT_BENCHMARK_QUERIES, seed=0):
+    """Memory, search latency and recall@1 of the embedding cache in each storage type, against the
+    float32 cache. The records come in clusters of look-alike identities, so the compressed
+    search has close candidates to confuse; 'int8+rerank' rescores the candidates in float32."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for count in record_counts:
+        centers = np.repeat(random_embeddings(rng, -(-count // BENCHMARK_CLUSTER_SIZE)), BENCHMARK_CLUSTER_SIZE, axis=0)[:count]
+        embeddings = centers + BENCHMARK_CLUSTER_SPREAD * random_embeddings(rng, count)
+        records = [{"global_id": str(index)} for index in range(count)]
+        exact = dict(zip((record["global_id"] for record in records), embeddings, strict=True))
+        picks = rng.integers(0, count, queries)
+        query_embeddings = embeddings[picks] + BENCHMARK_QUERY_NOISE * random_embeddings(rng, queries)
+        reference = None
+        for name, dtype, rerank_source in (
+            ("float32", "float32", None),
+            ("float16", "float16", None),
+            ("int8", "int8", None),
+            ("int8+rerank", "int8", lambda global_ids, exact=exact: {global_id: exact[global_id] for global_id in global_ids}),
+        ):
+            cache = EmbeddingCache(dtype=dtype, rerank_source=rerank_source)
+            cache.load(records, embeddings)
+            start = time.perf_counter()
+            top = [results[0]["global_id"] for results in cache.search_batch(query_embeddings)]
+            batch_ms = 1000 * (time.perf_counter() - start) / queries
+            reference = reference or top
+            rows.append(
+                {
+                    "records": count,
+                    "storage": name,
+                    "cache_mb": cache.nbytes / 2**20,
+                    "search_ms": time_per_call(cache.search, query_embeddings[:20]),
+                    "batch_ms": batch_ms,
+                    "recall@1": float(np.mean([found == expected for found, expected in zip(top, reference, strict=True)])),
+                }
+            )
+    return rows
+
+
+BENCHMARKS = {
+    "bulk": benchmark_bulk,
+    "calibrate": benchmark_calibrate,
+    "compact": benchmark_compact,
+    "samples": benchmark_samples,
+    "search": benchmark_search,
+}
+
+
+def print_rows(rows):
+    columns = list(rows[0])
+    widths = [max(14, len(column)) for column in columns]
+    print("  ".join(f"{column:>{width}}" for column, width in zip(columns, widths, strict=True)))
+    for row in rows:
+        print(
+            "  ".join(
+                f"{row[column]:>{width}.3f}" if isinstance(row[column], float) else f"{row[column]:>{width}}"
+                for column, width in zip(columns, widths, strict=True)
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record database benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--records", type=int, nargs="+", help="Record counts (default: per benchmark)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    kwargs = {"record_counts": args.records} if args.records else {}
+    print_rows(BENCHMARKS[args.benchmark](seed=args.seed, **kwargs))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,25 @@
 # region imports
 # Standard library imports
+import atexit
 import json
 import os
+import threading
 import time
 import uuid
 from typing import Any
 
 # Third-party imports
-import numpy as np
 import lancedb
+import numpy as np
+import pyarrow as pa
 from lancedb.pydantic import LanceModel, Vector
 
 # Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.calibration import (
+    CalibrationState,
+    spread_areas,
+    thresholds_from_areas,
+)
 from hailo_apps.hailo_app_python.core.common.core import get_resource_path
 from hailo_apps.hailo_app_python.core.common.defines import (
     FACE_RECON_DATABASE_DIR_NAME,
@@ -19,9 +27,33 @@ from hailo_apps.hailo_app_python.core.common.defines import (
     FACE_RECON_SAMPLES_DIR_NAME,
     HAILO_ARCH_KEY,
 )
+from hailo_apps.hailo_app_python.core.common.embedding_cache import EmbeddingCache
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
 from hailo_apps.hailo_app_python.core.common.installation_utils import detect_hailo_arch
+from hailo_apps.hailo_app_python.core.common.sample_retention import (
+    SampleRetentionWorker,
+    select_diverse_samples,
+)
+from hailo_apps.hailo_app_python.core.common.vector_index import VectorIndexManager
+from hailo_apps.hailo_app_python.core.common.write_behind import (
+    COMPACTION_INTERVAL,
+    TableCompactor,
+    WriteBehindQueue,
+)
+
+hailo_logger = get_logger(__name__)
 # endregion
 
+# Suffix of the samples table of a records table (e.g. 'persons' -> 'persons_samples')
+SAMPLES_TABLE_SUFFIX = "_samples"
+# Column of the pre-samples-table schema holding every sample (with its embedding) as JSON text
+LEGACY_SAMPLES_JSON_COLUMN = "samples_json"
+# The running mean of a record's samples is recomputed exactly every this many samples, so float
+# rounding errors of the incremental updates cannot accumulate
+AVG_EMBEDDING_RECOMPUTE_INTERVAL = 64
+# Value types of the vector columns of the tables a handler creates
+EMBEDDING_STORAGE_TYPES = {"float32": pa.float32(), "float16": pa.float16()}
+
 
 # Define the LanceModel schema for the records table
 class Record(LanceModel):
@@ -30,26 +62,163 @@ class Record(LanceModel):
     label: str  # unique (but same IRL record might have multiple e.g., "Bob", "Bob glasses" etc.) with default "None" value
     avg_embedding: Vector(512)  # type: ignore the warning
     last_sample_recieved_time: int  # epoch timestamp: In case the last sample removed - not maintend to previous sample time...
-    samples_json: str  # Store samples as a JSON string  # [{"embedding", "sample_path", "id"}] (path to sample)
     classificaiton_confidence_threshold: float
     # optional fields, but default values are set
     value: float = 0.0  # in some cases numeric value might be relevant
+    num_samples: int = 0  # number of samples averaged in avg_embedding
+
+
+# Define the LanceModel schema for the samples table: the samples of all records, one row per sample
+class Sample(LanceModel):
+    id: str  # unique id
+    global_id: str  # the record the sample belongs to
+    embedding: Vector(512)  # type: ignore the warning
+    sample_path: str | None = None  # path to the sample file (e.g. face crop), None if not saved
+    timestamp: int  # epoch timestamp
+
+
+def group_sum(keys: np.ndarray, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sums vectors by key.
+
+    Returns:
+        tuple: (unique keys, (n_keys, dim) float64 sums, number of vectors of each key).
+    """
+    unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    if len(unique_keys) == 0:
+        return unique_keys, np.zeros((0, vectors.shape[-1])), counts
+    # Sort the vectors by key, then sum each contiguous group
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sums = np.add.reduceat(vectors[order].astype(np.float64), starts, axis=0)
+    return unique_keys, sums, counts
+
+
+def with_vector_type(schema, value_type) -> pa.Schema:
+    """Returns the Arrow schema of a LanceModel with the value type of its vector columns replaced."""
+    arrow_schema = schema.to_arrow_schema()
+    for index, field in enumerate(arrow_schema):
+        if pa.types.is_fixed_size_list(field.type):
+            arrow_schema = arrow_schema.set(index, field.with_type(pa.list_(value_type, field.type.list_size)))
+    return arrow_schema
+
+
+def vectors_to_numpy(table, column: str) -> np.ndarray:
+    """Returns a fixed size list column of an Arrow table as a (num_rows, dim) float32 array."""
+    values = table.column(column).combine_chunks().flatten().to_numpy().astype(np.float32, copy=False)
+    return values.reshape(table.num_rows, -1) if table.num_rows else values.reshape(0, 0)
 
 
 class DatabaseHandler:
-    def __init__(self, db_name, table_name, schema, threshold, database_dir, samples_dir):
+    """Records (identities) with their samples and average embedding, stored in LanceDB.
+
+    The samples of the records (embedding, sample file, timestamp) are rows of a second table,
+    '<table_name>_samples', with a typed vector column; they are only read when needed (average
+    embedding updates, calibration, get_record_by_id() / get_all_records() with samples). Tables
+    of the previous schema, with every sample serialized in a 'samples_json' column, are migrated
+    once when opened.
+
+    Cosine searches are served by an in-memory EmbeddingCache of the average embeddings, filled
+    from the table on the first search and updated by every mutation of this handler. The table
+    stays the source of truth; pass use_embedding_cache=False to search LanceDB directly. The
+    vector index LanceDB searches use is maintained by a VectorIndexManager, in the background.
+
+    With write_behind_interval set, the writes of the streaming paths (create_record(),
+    insert_new_sample(), label and threshold updates) are queued in a WriteBehindQueue and
+    committed in batches every write_behind_interval seconds instead of one LanceDB commit each;
+    the other methods flush the queue before reading or changing the tables. A TableCompactor
+    compacts both tables and removes their old versions every compaction_interval seconds.
+
+    With max_samples_per_record set, a record keeps at most that many samples, the most diverse
+    ones: when a sample exceeds the bound, a background pass (SampleRetentionWorker) evicts the
+    most redundant samples, with their files (see enforce_sample_retention()).
+
+    Embeddings can be stored compactly: embedding_storage='float16' halves the vector columns of
+    the tables the handler creates (existing tables keep their type), and embedding_cache_dtype
+    ('float16' or 'int8') shrinks the search cache; with rerank_embeddings the best candidates of
+    a compressed search are rescored with the embeddings of the table.
+    """
+
+    def __init__(
+        self,
+        db_name,
+        table_name,
+        schema,
+        threshold,
+        database_dir,
+        samples_dir,
+        use_embedding_cache=True,
+        samples_schema=Sample,
+        avg_recompute_interval=AVG_EMBEDDING_RECOMPUTE_INTERVAL,
+        write_behind_interval=None,
+        compaction_interval=COMPACTION_INTERVAL,
+        max_samples_per_record=None,
+        embedding_storage="float32",
+        embedding_cache_dtype="float32",
+        rerank_embeddings=False,
+    ):
+        if embedding_storage not in EMBEDDING_STORAGE_TYPES:
+            raise ValueError(
+                f"Unsupported embedding storage '{embedding_storage}', expected one of {tuple(EMBEDDING_STORAGE_TYPES)}"
+            )
         self.db = self.__init_database(
             db_name=db_name, database_dir=database_dir, samples_dir=samples_dir
         )
+        vector_type = EMBEDDING_STORAGE_TYPES[embedding_storage]
         self.tbl_records = self.__init_table(
             self.db,
             table_name=table_name,
-            schema=schema,
+            schema=schema if embedding_storage == "float32" else with_vector_type(schema, vector_type),
             indexes=[("global_id", "BTREE"), ("label", "BTREE")],
         )
+        self.tbl_samples = self.__init_table(
+            self.db,
+            table_name=table_name + SAMPLES_TABLE_SUFFIX,
+            schema=samples_schema if embedding_storage == "float32" else with_vector_type(samples_schema, vector_type),
+            indexes=[("id", "BTREE"), ("global_id", "BTREE")],
+        )
+        stored_type = self.tbl_records.schema.field("avg_embedding").type.value_type
+        if stored_type != vector_type:
+            hailo_logger.info(f"Table '{table_name}' stores {stored_type} embeddings, embedding_storage applies to new tables")
+        self.record_fields = set(schema.model_fields)
+        self.avg_recompute_interval = avg_recompute_interval
         self.classificaiton_confidence_threshold = (
             threshold  # Default classification confidence threshold
         )
+        self.embedding_cache = None
+        if use_embedding_cache:
+            self.embedding_cache = EmbeddingCache(
+                dtype=embedding_cache_dtype,
+                rerank_source=self.__read_avg_embeddings if rerank_embeddings else None,
+            )
+        self.calibration = CalibrationState()
+        self._record_lock = threading.RLock()
+        self._cache_load_lock = threading.RLock()  # one embedding cache load at a time
+        self.max_samples_per_record = max_samples_per_record
+        self.sample_retention = SampleRetentionWorker(self.enforce_sample_retention) if max_samples_per_record else None
+        self.write_behind = None
+        if write_behind_interval is not None:
+            self.write_behind = WriteBehindQueue(
+                self.tbl_records, self.tbl_samples, flush_interval=write_behind_interval
+            )
+        if LEGACY_SAMPLES_JSON_COLUMN in self.tbl_records.schema.names:
+            self.migrate_samples_json()
+        if "num_samples" not in self.tbl_records.schema.names:
+            # Tables created before the sample count: count the samples and recompute the averages
+            self.tbl_records.add_columns({"num_samples": "CAST(0 AS BIGINT)"})
+            self.recompute_avg_embeddings()
+        self.vector_index = VectorIndexManager(self.tbl_records, "avg_embedding", metric="cosine")
+        if self.sample_retention is not None:
+            # Records above the bound, e.g. from before it was set
+            over = self.tbl_records.search().where(f"num_samples > {max_samples_per_record}").select(["global_id"])
+            for row in over.to_list():
+                self.sample_retention.mark(row["global_id"])
+        self.compactor = TableCompactor(
+            [self.tbl_records, self.tbl_samples],
+            interval=compaction_interval,
+            lock=self.write_behind.flush_lock if self.write_behind is not None else None,
+        )
+        if self.write_behind is not None:
+            atexit.register(self.close)  # write the queued writes when the application exits
 
     def __init_database(self, db_name: str, database_dir: str, samples_dir: str):
         """Initializes the LanceDB database.
@@ -107,29 +276,34 @@ class DatabaseHandler:
 
         Note: sample file path id != image id
 
-        In case after this insertion there are more than 256 records in the table, the table will be indexed by the embedding column.
+        The vector index of the table is built or updated in the background as the table grows
+        (see VectorIndexManager).
         """
         record = Record(
             global_id=str(uuid.uuid4()),
             label=label,
             avg_embedding=embedding.tolist(),
             last_sample_recieved_time=timestamp,
-            samples_json=json.dumps(
-                [{"embedding": embedding.tolist(), "sample_path": sample, "id": str(uuid.uuid4())}]
-            ),
             classificaiton_confidence_threshold=self.classificaiton_confidence_threshold,
+            num_samples=1,
         )
-        self.tbl_records.add([record])
-        if len(self.tbl_records.search().to_list()) > 256:
-            self.tbl_records.create_index(
-                vector_column_name="embedding", metric="cosine", replace=True
-            )
+        if self.write_behind is not None:
+            self.write_behind.add_record(record.model_dump())
+        else:
+            self.tbl_records.add([record])
+        self.__add_sample(record.global_id, embedding, sample, timestamp)
+        if self.embedding_cache is not None:
+            self.embedding_cache.upsert(record.model_dump())
+        self.vector_index.rows_added(1)
         return record.model_dump()
 
     def insert_new_sample(
         self, record: dict[str, Any], embedding: np.ndarray, sample: str, timestamp: int
     ) -> None:
-        """Adds a new sample to a record, creates for the sample id and recalculates the average embedding.
+        """Adds a new sample to a record, creates for the sample id and updates the average embedding.
+
+        The average is updated as a running mean, so the cost does not depend on the number of
+        samples of the record.
 
         Args:
             record (Dict[str, Any]): The record to insert the sample into.
@@ -137,25 +311,97 @@ class DatabaseHandler:
             sample (str): The sample sample path.
             timestamp (int): The timestamp of the sample.
         """
-        samples = record["samples_json"]
-        samples.append(
-            {"embedding": embedding.tolist(), "sample_path": sample, "id": str(uuid.uuid4())}
-        )
-        all_embeddings = [
-            np.array(sample["embedding"]) for sample in samples
-        ]  # Recalculate the average embedding
-        avg_embedding = np.mean(all_embeddings, axis=0)
-        self.tbl_records.update(
-            where=f"global_id = '{record['global_id']}'",
-            values={
-                "avg_embedding": avg_embedding,
-                "samples_json": json.dumps(samples),
+        global_id = record["global_id"]
+        with self._record_lock:  # the read-modify-write of the average, see enforce_sample_retention()
+            avg_embedding, num_samples = self.__get_running_mean(global_id)
+            self.__add_sample(global_id, embedding, sample, timestamp)
+            num_samples += 1
+            avg_embedding = avg_embedding + (np.asarray(embedding, dtype=np.float64) - avg_embedding) / num_samples
+            values = {
+                "avg_embedding": self.__checked_avg_embedding(global_id, avg_embedding, num_samples),
+                "num_samples": num_samples,
                 "last_sample_recieved_time": timestamp,
-            },
+            }
+            self.__update_record(global_id, values)
+            self.__cache_upsert(record, values)
+        if self.sample_retention is not None and num_samples > self.max_samples_per_record:
+            self.sample_retention.mark(global_id)
+
+    def flush(self) -> None:
+        """Writes the queued writes (see write_behind_interval) to the tables."""
+        if self.write_behind is not None:
+            self.write_behind.flush()
+
+    def __update_record(self, global_id: str, values: dict[str, Any]) -> None:
+        if self.write_behind is not None:
+            self.write_behind.update_record(global_id, values)
+        else:
+            self.tbl_records.update(where=f"global_id = '{global_id}'", values=values)
+
+    def __pending_record(self, global_id: str) -> dict[str, Any] | None:
+        """Returns the queued values of a record (see WriteBehindQueue.pending_record), or None."""
+        if self.write_behind is None:
+            return None
+        return self.write_behind.pending_record(global_id)
+
+    def __get_running_mean(self, global_id: str) -> tuple[np.ndarray, int]:
+        """Returns the stored average embedding (float64) and sample count of a record."""
+        pending = self.__pending_record(global_id)
+        if pending and pending.get("num_samples", 0) >= 1 and "avg_embedding" in pending:
+            return np.asarray(pending["avg_embedding"], dtype=np.float64), pending["num_samples"]
+        row = (
+            self.tbl_records.search()
+            .where(f"global_id = '{global_id}'")
+            .select(["avg_embedding", "num_samples"])
+            .to_arrow()
         )
+        num_samples = row.column("num_samples")[0].as_py() if row.num_rows else 0
+        if num_samples < 1:  # no count stored: start from the samples
+            embeddings = self.get_samples_embeddings(global_id).astype(np.float64)
+            if len(embeddings) == 0:
+                return np.zeros(self.vector_index.dim), 0
+            return embeddings.mean(axis=0), len(embeddings)
+        return vectors_to_numpy(row, "avg_embedding")[0].astype(np.float64), num_samples
+
+    def __checked_avg_embedding(self, global_id: str, avg_embedding: np.ndarray, num_samples: int) -> np.ndarray:
+        """Returns the running mean, or the exact mean of the samples every avg_recompute_interval samples."""
+        if self.avg_recompute_interval and num_samples % self.avg_recompute_interval == 0:
+            self.flush()  # the queued samples
+            exact = self.get_samples_embeddings(global_id).astype(np.float64).mean(axis=0)
+            hailo_logger.debug(
+                f"Average embedding of {global_id} recomputed, drift {np.abs(exact - avg_embedding).max():.2e}"
+            )
+            return exact
+        return avg_embedding
+
+    def __add_sample(self, global_id: str, embedding: np.ndarray, sample: str, timestamp: int) -> None:
+        row = Sample(
+            id=str(uuid.uuid4()),
+            global_id=global_id,
+            embedding=np.asarray(embedding).tolist(),
+            sample_path=sample,
+            timestamp=timestamp,
+        )
+        if self.write_behind is not None:
+            self.write_behind.add_sample(row.model_dump())
+        else:
+            self.tbl_samples.add([row])
+        self.calibration.mark_changed(global_id)
+
+    def __cache_upsert(self, record: dict[str, Any], values: dict[str, Any]) -> None:
+        """Updates the cached row of a record after its table row was updated with values."""
+        if self.embedding_cache is not None:
+            fields = {key: value for key, value in record.items() if key in self.record_fields}
+            self.embedding_cache.upsert({**fields, **values})
+
+    def __cache_update(self, global_id: str, values: dict[str, Any]) -> None:
+        """Updates the cached row of a record, if it is cached, after its table row was updated
+        with values (a record deleted meanwhile is not added back)."""
+        if self.embedding_cache is not None:
+            self.embedding_cache.upsert({"global_id": global_id, **values}, insert=False)
 
     def remove_sample_by_id(self, global_id: str, sample_id: str) -> bool:
-        """Removes a sample from a record & recalculates the average embedding.
+        """Removes a sample from a record & updates the average embedding (reverse running mean).
 
         Args:
             global_id (str): The global ID of the record to remove from.
@@ -164,25 +410,38 @@ class DatabaseHandler:
         Returns:
             bool: True if the record was removed, False otherwise.
         """
-        record = self.tbl_records.search().where(f"global_id = '{global_id}'").to_list()[0]
-        samples = json.loads(record["samples_json"])
-        sample_to_delete = next(sample for sample in samples if sample["id"] == sample_id)
-        self.delete_record_sample(sample_to_delete)
-        new_samples = [sample for sample in samples if sample["id"] != sample_id]
-        if not new_samples:  # If there are no more samples, remove the record from the database
-            self.tbl_records.delete(where=f"global_id = '{global_id}'")
-            return True
-        else:  # Update the record's record with the new list of samples and the recalculated average embedding
-            self.tbl_records.update(
-                where=f"global_id = '{global_id}'",
-                values={
-                    "avg_embedding": np.mean(
-                        [np.array(sample["embedding"]) for sample in new_samples], axis=0
-                    ).tolist(),
-                    "samples_json": json.dumps(new_samples),
-                },
+        with self._record_lock:
+            self.flush()
+            removed = (
+                self.tbl_samples.search()
+                .where(f"id = '{sample_id}' AND global_id = '{global_id}'")
+                .select(["embedding", "sample_path"])
+                .to_arrow()
             )
-            return False
+            if removed.num_rows == 0:
+                return False
+            avg_embedding, num_samples = self.__get_running_mean(global_id)
+            self.delete_record_sample(removed.select(["sample_path"]).to_pylist()[0])
+            self.tbl_samples.delete(f"id = '{sample_id}'")
+            self.calibration.mark_changed(global_id)
+            num_samples -= 1
+            if num_samples < 1:  # If there are no more samples, remove the record from the database
+                self.tbl_records.delete(where=f"global_id = '{global_id}'")
+                if self.embedding_cache is not None:
+                    self.embedding_cache.remove(global_id)
+                self.calibration.remove([global_id])
+                self.vector_index.rows_removed()
+                return True
+            else:  # Update the record with the average embedding of the remaining samples
+                embedding = vectors_to_numpy(removed, "embedding")[0].astype(np.float64)
+                avg_embedding = (avg_embedding * (num_samples + 1) - embedding) / num_samples
+                values = {
+                    "avg_embedding": self.__checked_avg_embedding(global_id, avg_embedding, num_samples),
+                    "num_samples": num_samples,
+                }
+                self.__update_record(global_id, values)
+                self.__cache_update(global_id, values)
+                return False
 
     def search_record(
         self, embedding: np.ndarray, top_k: int = 1, metric_type: str = "cosine"
@@ -197,14 +456,49 @@ class DatabaseHandler:
         Returns:
             Dict[str, Any]: The search result with classification confidence.
         """
-        search_result = (
-            self.tbl_records.search(embedding.tolist(), vector_column_name="avg_embedding")
-            .metric(metric_type)
-            .limit(top_k)
-            .to_list()
-        )
+        return self.search_records(np.asarray(embedding).reshape(1, -1), top_k=top_k, metric_type=metric_type)[0]
+
+    def search_records(
+        self, embeddings: np.ndarray, top_k: int = 1, metric_type: str = "cosine"
+    ) -> list[dict[str, Any]]:
+        """Searches the records of several embeddings (e.g. all the faces of a frame) at once.
+
+        With the embedding cache, all the queries are resolved by a single matrix product.
+
+        Args:
+            embeddings (np.ndarray): (N, D) embedding vectors to search for.
+            top_k (int): The number of top results to consider per embedding.
+            metric_type (str): The similarity metric to use (e.g., "cosine").
+
+        Returns:
+            List[Dict[str, Any]]: For each embedding, the result of search_record: the closest
+            record if it passes its classification confidence threshold, otherwise an 'Unknown' record.
+        """
+        embeddings = np.asarray(embeddings)
+        if len(embeddings) == 0:
+            return []
+        if self.embedding_cache is not None and metric_type == "cosine":
+            if not self.embedding_cache.loaded:
+                with self._cache_load_lock:
+                    if not self.embedding_cache.loaded:  # not loaded by another thread meanwhile
+                        self.load_embedding_cache()
+            search_results = self.embedding_cache.search_batch(embeddings, top_k=top_k)
+        else:
+            self.flush()
+            search_results = []
+            for embedding in embeddings:
+                search_result = (
+                    self.tbl_records.search(embedding.tolist(), vector_column_name="avg_embedding")
+                    .metric(metric_type)
+                    .limit(top_k)
+                    .to_list()
+                )
+                search_results.append(search_result)
+        return [self.__best_match(search_result) for search_result in search_results]
+
+    def __best_match(self, search_result: list[dict[str, Any]]) -> dict[str, Any]:
+        """Returns the closest record of a search if it passes its threshold, otherwise an 'Unknown' record."""
         if search_result:
-            search_result[0]["samples_json"] = json.loads(search_result[0]["samples_json"])
             if (
                 (1 - search_result[0]["_distance"])
                 > search_result[0]["classificaiton_confidence_threshold"]
@@ -216,11 +510,74 @@ class DatabaseHandler:
             "label": "Unknown",
             "avg_embedding": None,
             "last_sample_recieved_time": None,
-            "samples_json": None,
             "classificaiton_confidence_threshold": None,
             "_distance": 0.0,
         }
 
+    def __read_avg_embeddings(self, global_ids: list[str]) -> dict[str, np.ndarray]:
+        """Returns the average embedding of records by global ID (the re-ranking source of the cache)."""
+        embeddings = {}
+        for global_id in global_ids:
+            pending = self.__pending_record(global_id)
+            if pending and "avg_embedding" in pending:
+                embeddings[global_id] = pending["avg_embedding"]
+        missing = [global_id for global_id in global_ids if global_id not in embeddings]
+        if missing:
+            where = "global_id IN (" + ", ".join(f"'{global_id}'" for global_id in missing) + ")"
+            table = self.tbl_records.search().where(where).select(["global_id", "avg_embedding"]).to_arrow()
+            embeddings.update(zip(table.column("global_id").to_pylist(), vectors_to_numpy(table, "avg_embedding"), strict=True))
+        return embeddings
+
+    def load_embedding_cache(self) -> None:
+        """(Re)loads the embedding cache from the table.
+
+        The mutations made while the table is read are replayed by the cache (see
+        EmbeddingCache.begin_load()); a snapshot read across an invalidation is read again.
+        """
+        with self._cache_load_lock:
+            loaded = False
+            while not loaded:
+                token = self.embedding_cache.begin_load()
+                self.flush()
+                table = self.tbl_records.to_arrow()
+                loaded = self.embedding_cache.load(
+                    table.drop(["avg_embedding"]).to_pylist(), vectors_to_numpy(table, "avg_embedding"), token=token
+                )
+
+    def recompute_avg_embeddings(self) -> int:
+        """Recomputes the exact average embedding and sample count of every record from its samples.
+
+        Returns:
+            int: The number of updated records.
+        """
+        self.flush()
+        samples = self.tbl_samples.to_arrow().select(["global_id", "embedding"])
+        global_ids, sums, counts = group_sum(
+            samples.column("global_id").to_numpy(zero_copy_only=False), vectors_to_numpy(samples, "embedding")
+        )
+        if len(global_ids) == 0:
+            return 0
+        averages = (sums / counts[:, None]).astype(np.float32)
+        dim = averages.shape[1]
+        self.__merge_records(
+            pa.table(
+                {
+                    "global_id": global_ids,
+                    "avg_embedding": pa.FixedSizeListArray.from_arrays(pa.array(averages.ravel()), dim),
+                    "num_samples": counts,
+                }
+            )
+        )
+        if self.embedding_cache is not None:
+            self.embedding_cache.invalidate()
+        return len(global_ids)
+
+    def __merge_records(self, updates: pa.Table) -> None:
+        """Updates the columns of updates in the records of its 'global_id' column, in one commit."""
+        schema = self.tbl_records.schema
+        updates = updates.cast(pa.schema([schema.field(name) for name in updates.column_names]))
+        self.tbl_records.merge_insert("global_id").when_matched_update_all().execute(updates)
+
     def update_record_label(self, global_id: str, label: str = "Unknown") -> None:
         """Updates the label associated with a record in the LanceDB table.
 
@@ -228,7 +585,9 @@ class DatabaseHandler:
             global_id (str): The global ID of the record to update.
             label (str): The new label to associate with the record.
         """
-        self.tbl_records.update(where=f"global_id = '{global_id}'", values={"label": label})
+        self.__update_record(global_id, {"label": label})
+        if self.embedding_cache is not None:
+            self.embedding_cache.update_fields(global_id, label=label)
 
     def update_record_classificaiton_confidence_threshold(
         self, global_id: str, classificaiton_confidence_threshold: float
@@ -239,10 +598,37 @@ class DatabaseHandler:
             global_id (str): The global ID of the record to update.
             classificaiton_confidence_threshold (str): The new classificaiton confidence threshold to associate with the record.
         """
-        self.tbl_records.update(
-            where=f"global_id = '{global_id}'",
-            values={"classificaiton_confidence_threshold": classificaiton_confidence_threshold},
+        self.__update_record(
+            global_id, {"classificaiton_confidence_threshold": classificaiton_confidence_threshold}
+        )
+        if self.embedding_cache is not None:
+            self.embedding_cache.update_fields(
+                global_id, classificaiton_confidence_threshold=classificaiton_confidence_threshold
+            )
+
+    def update_records_classificaiton_confidence_thresholds(
+        self, global_ids: list[str], classificaiton_confidence_thresholds: np.ndarray
+    ) -> None:
+        """Updates the classificaiton confidence thresholds of many records in one commit.
+
+        Args:
+            global_ids (List[str]): The global IDs of the records to update.
+            classificaiton_confidence_thresholds (np.ndarray): The new threshold of each record.
+        """
+        if len(global_ids) == 0:
+            return
+        self.flush()
+        self.__merge_records(
+            pa.table(
+                {
+                    "global_id": global_ids,
+                    "classificaiton_confidence_threshold": np.asarray(classificaiton_confidence_thresholds),
+                }
+            )
         )
+        if self.embedding_cache is not None:
+            for global_id, threshold in zip(global_ids, classificaiton_confidence_thresholds, strict=True):
+                self.embedding_cache.update_fields(global_id, classificaiton_confidence_threshold=float(threshold))
 
     def update_classification_confidence_threshold_for_all(self, new_threshold: float) -> None:
         """Updates the classification_confidence_threshold for all records in the LanceDB table.
@@ -250,15 +636,11 @@ class DatabaseHandler:
         Args:
             new_threshold (float): The new confidence threshold value to set for all records.
         """
-        # Get all records from the database
-        records = self.get_all_records()
-        # Iterate through each record and update the classification_confidence_threshold
-        for record in records:
-            global_id = record["global_id"]  # Assuming each record has a unique global_id
-            self.tbl_records.update(
-                where=f"global_id = '{global_id}'",
-                values={"classificaiton_confidence_threshold": new_threshold},
-            )
+        self.flush()
+        # A single update of every row
+        self.tbl_records.update(values={"classificaiton_confidence_threshold": new_threshold})
+        if self.embedding_cache is not None:
+            self.embedding_cache.update_all_fields(classificaiton_confidence_threshold=new_threshold)
 
     def delete_record(self, global_id: str) -> None:
         """Deletes a record from the LanceDB table.
@@ -266,17 +648,37 @@ class DatabaseHandler:
         Args:
             global_id (str): The global ID of the record to delete.
         """
-        record = self.get_record_by_id(global_id)
-        for sample in record["samples_json"]:
-            self.delete_record_sample(sample)
-        self.tbl_records.delete('global_id = "' + global_id + '"')
+        self.delete_records([global_id])
+
+    def delete_records(self, global_ids: list[str]) -> None:
+        """Deletes records, with their samples, from the LanceDB tables (one delete per table).
+
+        Args:
+            global_ids (List[str]): The global IDs of the records to delete.
+        """
+        if not global_ids:
+            return
+        with self._record_lock:  # not during a sample update of the records (e.g. a retention pass)
+            self.flush()
+            self.delete_records_samples(global_ids)
+            to_delete = ", ".join(f"'{global_id}'" for global_id in global_ids)
+            self.tbl_records.delete(f"global_id IN ({to_delete})")
+            if self.embedding_cache is not None:
+                for global_id in global_ids:
+                    self.embedding_cache.remove(global_id)
+            self.calibration.remove(global_ids)
+        self.vector_index.rows_removed()
 
     def clear_table(self) -> None:
         """Deletes all records from the LanceDB table."""
-        to_delete = ", ".join(
-            [f"'{record['global_id']}'" for record in self.tbl_records.search().to_list()]
-        )  # Get all records
-        self.tbl_records.delete(f"global_id IN ({to_delete})")
+        with self._record_lock:
+            self.flush()
+            self.tbl_records.delete("true")
+            self.tbl_samples.delete("true")
+            if self.embedding_cache is not None:
+                self.embedding_cache.invalidate()
+            self.calibration.invalidate()
+        self.vector_index.rows_removed()
         # Clear all files from the 'resources/samples' folder
         samples_dir = get_resource_path(
             pipeline_name=None, resource_type=FACE_RECON_DIR_NAME, arch=os.getenv(HAILO_ARCH_KEY, detect_hailo_arch() or "hailo8"), model=FACE_RECON_SAMPLES_DIR_NAME
@@ -290,111 +692,182 @@ class DatabaseHandler:
 
     def clear_unknown_labels(self) -> None:
         """Deletes all records from the LanceDB table with the label 'Unknown'."""
-        records = self.tbl_records.search().where("label = 'Unknown'").to_list()
-        if len(records) > 0:
-            for record in records:
-                for sample in json.loads(record["samples_json"]):
-                    self.delete_record_sample(sample)
-            to_delete = ", ".join([f"'{record['global_id']}'" for record in records])
-            self.tbl_records.delete(f"global_id IN ({to_delete})")
+        self.flush()
+        unknowns = self.tbl_records.search().where("label = 'Unknown'").select(["global_id"]).to_arrow()
+        self.delete_records(unknowns.column("global_id").to_pylist())
 
     def clear_unknown_labels_keep_latest(self) -> None:
         """Deletes all records from the LanceDB table with the label 'Unknown',
         except the latest one based on the last sample received time.
         """
-        # Fetch all records with the label 'Unknown'
-        records = self.tbl_records.search().where("label = 'Unknown'").to_list()
-        current_time = int(time.time())
-        if len(records) > 1:  # Only proceed if there are 'Unknown' records
-            # Find the record with the latest 'last_sample_recieved_time'
-            latest_record = max(
-                records,
-                key=lambda record: self.get_records_last_sample_recieved_time(record["global_id"]),
-            )
-            latest_global_id = latest_record["global_id"]
-
-            # if latest timestamp is older than 10 seconds - delete him also: this is the case when start button clicked but no person in front of the camera - so the latest might be from previous run
-            if current_time - latest_record["last_sample_recieved_time"] < 10:
-                # Filter out the latest record and prepare the rest for deletion
-                records_to_delete = [
-                    record for record in records if record["global_id"] != latest_global_id
-                ]
-            else:
-                records_to_delete = records
-
-            for record in records_to_delete:
-                for sample in json.loads(record["samples_json"]):
-                    self.delete_record_sample(sample)
-
-            to_delete = ", ".join([f"'{record['global_id']}'" for record in records_to_delete])
-            self.tbl_records.delete(f"global_id IN ({to_delete})")
+        # Fetch the times of all records with the label 'Unknown'
+        self.flush()
+        unknowns = (
+            self.tbl_records.search()
+            .where("label = 'Unknown'")
+            .select(["global_id", "last_sample_recieved_time"])
+            .to_arrow()
+        )
+        if unknowns.num_rows == 0:
+            return
+        global_ids = unknowns.column("global_id").to_pylist()
+        times = unknowns.column("last_sample_recieved_time").to_numpy()
+        latest = int(np.argmax(times))
+        latest_global_id = global_ids[latest]
+        # if latest timestamp is older than 10 seconds - delete him also: this is the case when start button clicked but no person in front of the camera - so the latest might be from previous run
+        if int(time.time()) - times[latest] < 10:
+            self.delete_records([global_id for global_id in global_ids if global_id != latest_global_id])
             self.keep_only_last_sample(latest_global_id)
-
-        elif len(records) == 1:
-            latest_record = records[0]
-            if current_time - latest_record["last_sample_recieved_time"] < 10:
-                # If there's only one 'Unknown' record, keep it as is
-                latest_global_id = latest_record["global_id"]
-                self.keep_only_last_sample(latest_global_id)
-            else:
-                self.delete_record(
-                    latest_global_id
-                )  # Delete the only record if it's older than 10 seconds
+        else:
+            self.delete_records(global_ids)
 
     def keep_only_last_sample(self, global_id: str) -> None:
-        """Updates the record with the given global_id to retain only the last sample
-        in the samples_json field.
-        Assumption - samples are added in order of time - the last one is the latest one.
+        """Updates the record with the given global_id to retain only the last sample.
+        Assumption - the sample with the latest timestamp is the last one.
+
+        The older samples are deleted at once and the average embedding becomes the last sample's
+        embedding.
 
         Args:
             global_id (str): The global ID of the record to update.
         """
-        # Fetch the record by global_id
-        record = self.get_record_by_id(global_id)
-        if not record:
-            return
+        with self._record_lock:
+            self.flush()
+            samples = (
+                self.tbl_samples.search()
+                .where(f"global_id = '{global_id}'")
+                .select(["id", "embedding", "sample_path", "timestamp"])
+                .to_arrow()
+                .sort_by("timestamp")
+            )
+            if samples.num_rows <= 1:
+                return
+            old_samples = samples.slice(0, samples.num_rows - 1).select(["id", "sample_path"]).to_pylist()
+            for sample in old_samples:
+                self.delete_record_sample(sample)
+            to_delete = ", ".join(f"'{sample['id']}'" for sample in old_samples)
+            self.tbl_samples.delete(f"id IN ({to_delete})")
+            self.calibration.mark_changed(global_id)
+            values = {"avg_embedding": vectors_to_numpy(samples, "embedding")[-1], "num_samples": 1}
+            self.__update_record(global_id, values)
+            self.__cache_update(global_id, values)
+
+    def enforce_sample_retention(self, global_id: str) -> int:
+        """Keeps the max_samples_per_record most diverse samples of a record (see
+        select_diverse_samples()) and evicts the others: rows and sample files. The average
+        embedding is recomputed from the kept samples. Called by the background pass.
 
-        # Parse the samples_json field
-        samples = record.get("samples_json", [])
-        if len(samples) > 1:
-            # Keep only the last sample
-            for sample in samples[:-1]:
-                self.remove_sample_by_id(
-                    global_id, sample["id"]
-                )  # safe way incl. recalculation of the average embedding
+        Args:
+            global_id (str): The global ID of the record.
 
-    def get_all_records(self, only_unknowns=False) -> dict[str, Any]:
+        Returns:
+            int: The number of evicted samples.
+        """
+        if not self.max_samples_per_record:
+            return 0
+        with self._record_lock:
+            self.flush()
+            samples = (
+                self.tbl_samples.search()
+                .where(f"global_id = '{global_id}'")
+                .select(["id", "embedding", "sample_path", "timestamp"])
+                .to_arrow()
+                .sort_by("timestamp")
+            )
+            if samples.num_rows <= self.max_samples_per_record:
+                return 0
+            embeddings = vectors_to_numpy(samples, "embedding")
+            kept = select_diverse_samples(embeddings, self.max_samples_per_record)
+            evicted = samples.take(np.setdiff1d(np.arange(samples.num_rows), kept)).select(["id", "sample_path"]).to_pylist()
+            for sample in evicted:
+                self.delete_record_sample(sample)
+            to_delete = ", ".join(f"'{sample['id']}'" for sample in evicted)
+            self.tbl_samples.delete(f"id IN ({to_delete})")
+            self.calibration.mark_changed(global_id)
+            values = {"avg_embedding": embeddings[kept].astype(np.float64).mean(axis=0), "num_samples": len(kept)}
+            self.__update_record(global_id, values)
+            self.__cache_update(global_id, values)
+            return len(evicted)
+
+    def get_all_records(self, only_unknowns=False, with_samples=True) -> dict[str, Any]:
         """Gets all records from the LanceDB table.
 
         Args:
             only_unknowns (bool): If True, return only records with the label 'Unknown'.
+            with_samples (bool): If True, add the samples of each record (see get_samples) as 'samples'.
 
         Returns:
             List[Dict[str, Any]]: All the records.
         """
+        self.flush()
         if only_unknowns:
             records = self.tbl_records.search().where("label = 'Unknown'").to_list()
         else:
             records = self.tbl_records.search().to_list()
 
-        for record in records:
-            record["samples_json"] = json.loads(record["samples_json"])
+        if with_samples:
+            samples_by_record = {record["global_id"]: [] for record in records}
+            for sample in self.get_samples():
+                if sample["global_id"] in samples_by_record:
+                    samples_by_record[sample["global_id"]].append(sample)
+            for record in records:
+                record["samples"] = samples_by_record[record["global_id"]]
         return records
 
-    def get_record_by_id(self, global_id: str) -> dict[str, Any]:
+    def get_record_by_id(self, global_id: str, with_samples=True) -> dict[str, Any]:
         """Gets a record record from the LanceDB table by global ID.
 
         Args:
             global_id (str): The global ID of the record to retrieve.
+            with_samples (bool): If True, add the samples of the record (see get_samples) as 'samples'.
 
         Returns:
-            Dict[str, Any]: The record record.
+            Dict[str, Any]: The record record, None if not found.
+
+        Without samples, a record with queued writes is read without flushing them.
+        """
+        if with_samples:
+            self.flush()
+        pending = self.__pending_record(global_id)
+        if pending is not None and self.record_fields <= pending.keys():
+            return pending  # not written yet
+        results = self.tbl_records.search().where(f"global_id = '{global_id}'").to_list()
+        if not results:
+            return None
+        result = {**results[0], **(pending or {})}
+        if with_samples:
+            result["samples"] = self.get_samples(global_id)
+        return result
+
+    def get_samples(self, global_id: str | None = None, with_embeddings: bool = True) -> list[dict[str, Any]]:
+        """Gets the samples of a record, or of all records, from the samples table.
+
+        Args:
+            global_id (str): The global ID of the record. Defaults to None (all the samples).
+            with_embeddings (bool): If False, the embeddings are not read.
+
+        Returns:
+            List[Dict[str, Any]]: The samples ('id', 'global_id', 'embedding', 'sample_path' and
+            'timestamp'), oldest first.
         """
-        result = self.tbl_records.search().where(f"global_id = '{global_id}'").to_list()[0]
-        if result:
-            result["samples_json"] = json.loads(result["samples_json"])
-            return result
-        return None
+        self.flush()
+        query = self.tbl_samples.search()
+        if global_id is not None:
+            query = query.where(f"global_id = '{global_id}'")
+        columns = [name for name in self.tbl_samples.schema.names if with_embeddings or name != "embedding"]
+        return query.select(columns).to_arrow().sort_by("timestamp").to_pylist()
+
+    def get_samples_embeddings(self, global_id: str) -> np.ndarray:
+        """Gets the embeddings of a record's samples as an (n_samples, dim) array, oldest first."""
+        self.flush()
+        table = (
+            self.tbl_samples.search()
+            .where(f"global_id = '{global_id}'")
+            .select(["embedding", "timestamp"])
+            .to_arrow()
+            .sort_by("timestamp")
+        )
+        return vectors_to_numpy(table, "embedding")
 
     def get_record_by_label(self, label: str = "Unknown") -> dict[str, Any]:
         """Gets a record record from the LanceDB table by label.
@@ -405,6 +878,7 @@ class DatabaseHandler:
         Returns:
             Dict[str, Any]: The record record.
         """
+        self.flush()
         results = self.tbl_records.search().where(f"label = '{label}'").to_list()
         if not results:  # Check if the list is empty
             return None  # Return None if no records are found
@@ -419,7 +893,8 @@ class DatabaseHandler:
         Returns:
             int: The number of samples.
         """
-        return len(self.get_record_by_id(global_id)["samples_json"])
+        self.flush()
+        return self.tbl_samples.count_rows(f"global_id = '{global_id}'")
 
     def get_records_classificaiton_confidence_threshold(self, global_id: str) -> float:
         """Gets the classificaiton confidence threshold associated with a record.
@@ -431,7 +906,7 @@ class DatabaseHandler:
         Returns:
             float: The classificaiton confidence threshold.
         """
-        return self.get_record_by_id(global_id)["classificaiton_confidence_threshold"]
+        return self.get_record_by_id(global_id, with_samples=False)["classificaiton_confidence_threshold"]
 
     def get_records_last_sample_recieved_time(self, global_id: str) -> int:
         """Gets the last sample recieved time associated with a record.
@@ -442,7 +917,7 @@ class DatabaseHandler:
         Returns:
             int: The last sample recieved time.
         """
-        return self.get_record_by_id(global_id)["last_sample_recieved_time"]
+        return self.get_record_by_id(global_id, with_samples=False)["last_sample_recieved_time"]
 
     def delete_record_sample(self, sample: tuple[str, str, str]):
         """Deletes the sample sample file.
@@ -454,50 +929,125 @@ class DatabaseHandler:
         if sample_path and os.path.exists(sample_path):
             os.remove(sample_path)
 
-    def calibrate_classification_confidence_threshold(self):
+    def delete_records_samples(self, global_ids: list[str]) -> None:
+        """Deletes the samples of records, rows and sample files.
+
+        Args:
+            global_ids (List[str]): The global IDs of the records.
+        """
+        if not global_ids:
+            return
+        self.flush()
+        where = "global_id IN (" + ", ".join(f"'{global_id}'" for global_id in global_ids) + ")"
+        for sample in self.tbl_samples.search().where(where).select(["sample_path"]).to_list():
+            self.delete_record_sample(sample)
+        self.tbl_samples.delete(where)
+
+    def migrate_samples_json(self) -> int:
+        """Moves the samples of a table of the previous schema (JSON text in 'samples_json') to the
+        samples table and drops the 'samples_json' column. Called once when such a table is opened;
+        safe to run again if it was interrupted.
+
+        Returns:
+            int: The number of migrated samples.
+        """
+        table = self.tbl_records.to_arrow().select(
+            ["global_id", "last_sample_recieved_time", LEGACY_SAMPLES_JSON_COLUMN]
+        )
+        samples = []
+        for record in table.to_pylist():
+            for sample in json.loads(record[LEGACY_SAMPLES_JSON_COLUMN] or "[]"):
+                samples.append(
+                    {
+                        "id": sample.get("id") or str(uuid.uuid4()),
+                        "global_id": record["global_id"],
+                        "embedding": sample["embedding"],
+                        "sample_path": sample.get("sample_path"),
+                        # The sample times were not stored: keep the JSON order with the record's time
+                        "timestamp": record["last_sample_recieved_time"],
+                    }
+                )
+        if samples:
+            ids = ", ".join(f"'{sample['id']}'" for sample in samples)
+            self.tbl_samples.delete(f"id IN ({ids})")  # rows of an interrupted migration
+            self.tbl_samples.add(samples)
+        self.tbl_records.drop_columns([LEGACY_SAMPLES_JSON_COLUMN])
+        hailo_logger.info(f"Migrated {len(samples)} samples of {table.num_rows} records to the samples table")
+        return len(samples)
+
+    def calibrate_classification_confidence_threshold(self, changed_only=False) -> int:
         """Calibrates the classification confidence threshold based on confidence circles area.
         Smaller areas result in a smaller classification confidence threshold.
-        """
-        records = self.tbl_records.search().to_list()
-        areas = []
-
-        for record in records:
-            # Get embeddings for the record
-            samples = json.loads(record["samples_json"])
-            embeddings = [np.array(sample["embedding"]) for sample in samples]
-
-            if len(embeddings) < 2:
-                # Skip calibration if there are not enough embeddings to calculate variance
-                areas.append(0)
-                continue
-
-            # Perform PCA to reduce embeddings to 2D
-            reduced_embeddings, principal_components, mean = self.perform_pca(
-                embeddings, n_components=2
-            )
 
-            # Calculate standard deviations (semi-major and semi-minor axes)
-            std_dev = np.std(reduced_embeddings, axis=0)
-            semi_major_axis, semi_minor_axis = std_dev[0], std_dev[1]
+        The area of a record is pi times the standard deviations of its samples along their two
+        principal axes, computed for all the records at once (see calibration.spread_areas()).
+        The areas are kept, so with changed_only only the records whose samples changed since the
+        last calibration (through this handler) are recomputed; this is cheap enough to run after
+        each enrollment. The thresholds depend on the smallest and largest areas, so the thresholds
+        of the other records are updated too when they change (in the same commit).
 
-            # Calculate the area of the confidence circle (ellipse)
-            area = np.pi * semi_major_axis * semi_minor_axis
-            areas.append(area)
+        Args:
+            changed_only (bool): Recompute only the areas of the changed records. The first
+                calibration of a handler is always a full one. Defaults to False.
 
-        # Normalize areas for threshold calibration
-        areas = np.array(areas)
-        if len(areas) > 0 and np.max(areas) != np.min(areas):  # Avoid division by zero
-            norm_areas = (areas - np.min(areas)) / (np.max(areas) - np.min(areas))
+        Returns:
+            int: The number of records whose area was computed.
+        """
+        self.flush()
+        records = self.tbl_records.search().select(["global_id", "classificaiton_confidence_threshold"]).to_arrow()
+        global_ids = records.column("global_id").to_pylist()
+        full = not (changed_only and self.calibration.loaded)
+        changed = self.calibration.take_changed()
+        if full:
+            samples = self.tbl_samples.to_arrow().select(["global_id", "embedding"])
+            calibrated = global_ids
         else:
-            norm_areas = np.zeros_like(areas)
-
-        for i, record in enumerate(records):
-            # Calculate the new threshold based on normalized area
-            # Ensure the threshold is between 0.1 and 0.9
-            new_threshold = 0.1 + (0.9 - 0.1) * (1 - norm_areas[i])  # Scale to [0.1, 0.9]
-            self.update_record_classificaiton_confidence_threshold(
-                record["global_id"], new_threshold
-            )
+            calibrated = [global_id for global_id in global_ids if global_id in changed]
+            if not calibrated:
+                return 0
+            where = "global_id IN (" + ", ".join(f"'{global_id}'" for global_id in calibrated) + ")"
+            samples = self.tbl_samples.search().where(where).select(["global_id", "embedding"]).to_arrow()
+        keys, areas = spread_areas(
+            samples.column("global_id").to_numpy(zero_copy_only=False), vectors_to_numpy(samples, "embedding")
+        )
+        # Records without samples have no spread
+        self.calibration.update(calibrated, np.zeros(len(calibrated)), full=full)
+        self.calibration.update(keys, areas)
+
+        new_thresholds = thresholds_from_areas([self.calibration.areas.get(global_id, 0.0) for global_id in global_ids])
+        # Write only the thresholds that changed
+        current = records.column("classificaiton_confidence_threshold").to_numpy()
+        updated = np.flatnonzero(~np.isclose(new_thresholds, current))
+        self.update_records_classificaiton_confidence_thresholds(
+            [global_ids[i] for i in updated], new_thresholds[updated]
+        )
+        return len(calibrated)
+
+    def get_stats(self) -> dict:
+        """Returns the state of the vector index (freshness, builds), of the write-behind queue
+        (pending writes, flushes), of the tables (versions, fragments, compactions), of the
+        sample retention (evictions) and of the embedding cache (size, memory)."""
+        stats = {"vector_index": self.vector_index.get_stats(), "compaction": self.compactor.get_stats()}
+        if self.embedding_cache is not None:
+            stats["embedding_cache"] = {
+                "records": len(self.embedding_cache),
+                "dtype": self.embedding_cache.dtype,
+                "bytes": self.embedding_cache.nbytes,
+            }
+        if self.write_behind is not None:
+            stats["write_behind"] = self.write_behind.get_stats()
+        if self.sample_retention is not None:
+            stats["sample_retention"] = self.sample_retention.get_stats()
+        return stats
+
+    def close(self) -> None:
+        """Writes the queued writes and stops the background maintenance of the database."""
+        if self.sample_retention is not None:
+            self.sample_retention.close()
+        if self.write_behind is not None:
+            self.write_behind.close()
+        self.compactor.close()
+        self.vector_index.close()
 
     def perform_pca(self, embeddings, n_components=2):
         """Perform PCA to reduce the dimensionality of embeddings.
@@ -132,7 +132,7 @@ class DatabaseVisualizer:
         all_embeddings = []
         record_data = {}
         for record in self.db_records:
-            samples = record["samples_json"]
+            samples = record["samples"]
             embeddings = [np.array(sample["embedding"]) for sample in samples]
             images = [sample["sample_path"] for sample in samples]
             all_embeddings.extend(embeddings)
@@ -300,3 +300,15 @@ HAILO_LOGO_PHOTO_NAME = "logo.png"
 
 # Gstreamer pipeline defaults
 GST_VIDEO_SINK = "autovideosink"
+DEFAULT_PIPELINE_LATENCY_MS = 300
+LOW_LATENCY_PIPELINE_LATENCY_MS = 50  # --low-latency, live sources only
+LIVE_SOURCE_TYPES = ("usb", "rpi", "libcamera", "rtsp")
+
+# Inference gating defaults (frames skipped by a gate bypass hailonet inside INFERENCE_PIPELINE_WRAPPER)
+INFERENCE_CROPPERS_POSTPROCESS_SO_FILENAME = "libinference_croppers.so"
+GATED_WHOLE_BUFFER_CROPPER_FUNCTION = "gated_whole_buffer"
+INFERENCE_GATE_CLASSIFICATION_TYPE = "inference_gate"
+INFERENCE_GATE_SKIP_LABEL = "skip"
+# Region-of-interest inference (only the configured regions are cropped and sent to hailonet)
+INFERENCE_REGIONS_CROPPER_FUNCTION = "region_crops"
+INFERENCE_REGION_LABEL = "inference_region"
@@ -0,0 +1,264 @@
+# region imports
+# Standard library imports
+import datetime
+import os
+import queue
+import threading
+import time
+
+# Third-party imports
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+DEFAULT_DETECTION_LOG_BATCH_ROWS = 65536
+DEFAULT_DETECTION_LOG_FLUSH_INTERVAL = 10.0  # seconds
+DEFAULT_DETECTION_LOG_MAX_PENDING_BATCHES = 4
+DEFAULT_DETECTION_LOG_ROWS_PER_FILE = 4_000_000
+# A Parquet file is readable once closed (footer written): the open files are closed this often,
+# which bounds the detections lost on a crash or power loss
+DEFAULT_DETECTION_LOG_FILE_INTERVAL = 300.0  # seconds
+DEFAULT_DETECTION_LOG_STREAM_ID = "default"
+SECONDS_PER_DAY = 86400
+
+# Columns of the Parquet files. The date and the stream id are hive partitions
+# (<root>/date=YYYY-MM-DD/stream_id=<id>/part-*.parquet), not columns.
+DETECTION_LOG_SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("frame", pa.int64()),
+        ("pts", pa.int64()),
+        ("label", pa.string()),
+        ("confidence", pa.float32()),
+        ("xmin", pa.float32()),
+        ("ymin", pa.float32()),
+        ("width", pa.float32()),
+        ("height", pa.float32()),
+        ("track_id", pa.int64()),
+    ]
+)
+
+
+class _ColumnBuffer:
+    """Python lists, one per column, filled row by row and converted to Arrow in the writer thread."""
+
+    __slots__ = ("columns",)
+
+    def __init__(self):
+        self.columns = tuple([] for _ in DETECTION_LOG_SCHEMA)
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def to_record_batch(self):
+        timestamps = [int(value * 1_000_000) for value in self.columns[0]]
+        arrays = [pa.array(timestamps, type=DETECTION_LOG_SCHEMA.field(0).type)]
+        for column, field in zip(self.columns[1:], list(DETECTION_LOG_SCHEMA)[1:], strict=True):
+            arrays.append(pa.array(column, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=DETECTION_LOG_SCHEMA)
+
+
+class DetectionLogWriter:
+    """Logs detections to Parquet files partitioned by date (UTC) and stream id.
+
+    append() only adds values to per-partition Python lists, so it costs a few microseconds per
+    detection. When max_batch_rows rows are buffered, or flush_interval seconds passed, the buffers
+    are handed to a writer thread, which converts them to Arrow record batches and appends them as
+    row groups to one open Parquet file per partition. At most max_pending_batches flushes wait for
+    the writer thread. Beyond that, flushed rows are dropped and counted, which bounds the memory
+    footprint.
+
+    Files are complete (readable) once closed: file_interval seconds after they were opened, on a
+    date change, after rows_per_file rows, or in close(). A crash loses at most the rows of the
+    open files, i.e. about file_interval seconds of detections.
+
+    Args:
+        root_dir (str): Root directory of the partitioned dataset.
+        max_batch_rows (int): Rows buffered before a flush. Defaults to 65536.
+        flush_interval (float): Maximum seconds between flushes. Defaults to 10.
+        max_pending_batches (int): Flushes that may wait for the writer thread. Defaults to 4.
+        rows_per_file (int): Rows after which a partition starts a new file. Defaults to 4M.
+        file_interval (float): Seconds after which an open file is closed, the next rows of its
+            partition going to a new file. Defaults to 300.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        root_dir,
+        max_batch_rows=DEFAULT_DETECTION_LOG_BATCH_ROWS,
+        flush_interval=DEFAULT_DETECTION_LOG_FLUSH_INTERVAL,
+        max_pending_batches=DEFAULT_DETECTION_LOG_MAX_PENDING_BATCHES,
+        rows_per_file=DEFAULT_DETECTION_LOG_ROWS_PER_FILE,
+        file_interval=DEFAULT_DETECTION_LOG_FILE_INTERVAL,
+    ):
+        self.root_dir = root_dir
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval = flush_interval
+        self.rows_per_file = rows_per_file
+        self.file_interval = file_interval
+        self.rows_logged = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.files_written = 0
+        self._buffers = {}  # (day, stream_id) -> _ColumnBuffer
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        self._writers = {}  # (day, stream_id) -> (pq.ParquetWriter, rows in file, opening time)
+        self._file_index = 0
+        os.makedirs(root_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="detection_log", daemon=True)
+        self._thread.start()
+
+    def append(
+        self,
+        label,
+        confidence,
+        xmin,
+        ymin,
+        width,
+        height,
+        track_id=None,
+        frame=None,
+        pts=None,
+        stream_id=None,
+        timestamp=None,
+    ):
+        """Adds one detection. The bbox is in normalized frame coordinates.
+
+        Args:
+            timestamp (float or None): Wall-clock time in seconds (time.time()). Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        key = (int(timestamp // SECONDS_PER_DAY), stream_id or DEFAULT_DETECTION_LOG_STREAM_ID)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = _ColumnBuffer()
+            columns = buffer.columns
+            columns[0].append(timestamp)
+            columns[1].append(frame)
+            columns[2].append(pts)
+            columns[3].append(label)
+            columns[4].append(confidence)
+            columns[5].append(xmin)
+            columns[6].append(ymin)
+            columns[7].append(width)
+            columns[8].append(height)
+            columns[9].append(track_id)
+            self._buffered_rows += 1
+            self.rows_logged += 1
+            if self._buffered_rows >= self.max_batch_rows:
+                self._flush_locked()
+
+    def maybe_flush(self):
+        """Flushes the buffers if flush_interval passed. Call it periodically, e.g. once per frame,
+        so detections are flushed even when few arrive."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            with self._lock:
+                self._flush_locked()
+
+    def flush(self, block=False):
+        """Hands all buffered rows to the writer thread.
+
+        Args:
+            block (bool): Wait for the writer thread instead of dropping the rows when it is behind.
+        """
+        with self._lock:
+            self._flush_locked(block)
+
+    def _flush_locked(self, block=False):
+        self._last_flush = time.monotonic()
+        if not self._buffers:
+            return
+        buffers, rows = self._buffers, self._buffered_rows
+        self._buffers, self._buffered_rows = {}, 0
+        try:
+            self._queue.put(buffers, block=block)
+        except queue.Full:
+            self.rows_dropped += rows
+            hailo_logger.warning(f"Detection log writer is behind; dropped {rows} rows")
+
+    def _run(self):
+        while True:
+            try:
+                # Wake up without rows too, to close the files of idle partitions
+                buffers = self._queue.get(timeout=self.file_interval)
+            except queue.Empty:
+                buffers = {}
+            if buffers is self._STOP:
+                break
+            for key, buffer in buffers.items():
+                try:
+                    self._write(key, buffer)
+                except Exception as e:
+                    self.rows_dropped += len(buffer)
+                    hailo_logger.error(f"Failed to write detection log for {key}: {e}")
+            self._close_expired_writers()
+        self._close_writers()
+
+    def _write(self, key, buffer):
+        day, stream_id = key
+        # A new day: the files of the previous days are complete
+        for old_key in [old_key for old_key in self._writers if old_key[0] < day]:
+            self._close_writer(old_key)
+        writer, rows_in_file, opened = self._writers.get(key, (None, 0, None))
+        if writer is None:
+            writer, opened = self._open_writer(day, stream_id), time.monotonic()
+        batch = buffer.to_record_batch()
+        writer.write_table(pa.Table.from_batches([batch]))
+        rows_in_file += batch.num_rows
+        self.rows_written += batch.num_rows
+        self._writers[key] = (writer, rows_in_file, opened)
+        if rows_in_file >= self.rows_per_file:
+            self._close_writer(key)
+
+    def _open_writer(self, day, stream_id):
+        date = datetime.datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=datetime.timezone.utc)
+        partition_dir = os.path.join(
+            self.root_dir, f"date={date:%Y-%m-%d}", f"stream_id={stream_id}"
+        )
+        os.makedirs(partition_dir, exist_ok=True)
+        self._file_index += 1
+        path = os.path.join(
+            partition_dir,
+            f"part-{datetime.datetime.now(datetime.timezone.utc):%H%M%S}-{os.getpid()}-{self._file_index}.parquet",
+        )
+        return pq.ParquetWriter(path, DETECTION_LOG_SCHEMA, compression="zstd")
+
+    def _close_writer(self, key):
+        writer, _, _ = self._writers.pop(key)
+        writer.close()
+        self.files_written += 1
+
+    def _close_expired_writers(self):
+        now = time.monotonic()
+        for key in [key for key, (_, _, opened) in self._writers.items() if now - opened >= self.file_interval]:
+            self._close_writer(key)
+
+    def _close_writers(self):
+        for key in list(self._writers):
+            self._close_writer(key)
+
+    def close(self, timeout=30.0):
+        """Flushes the remaining rows and closes all the files."""
+        self.flush(block=True)
+        self._queue.put(self._STOP)
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            "rows_logged": self.rows_logged,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "files_written": self.files_written,
+        }
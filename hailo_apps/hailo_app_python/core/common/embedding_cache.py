@@ -0,0 +1,324 @@
+# region imports
+# Standard library imports
+import functools
+import threading
+
+# Third-party imports
+import numpy as np
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+EMBEDDING_CACHE_INITIAL_CAPACITY = 256  # rows
+# Storage types of the cached embeddings: 'int8' is scalar-quantized with a scale per embedding
+EMBEDDING_CACHE_DTYPES = ("float32", "float16", "int8")
+# Rows of a compressed matrix converted to float32 at once by a search (the block stays in the CPU cache)
+EMBEDDING_CACHE_BLOCK_ROWS = 1024
+# Candidates of a compressed search rescored with the exact embeddings, when re-ranking
+EMBEDDING_CACHE_RERANK_CANDIDATES = 16
+
+
+def normalize_embeddings(embeddings):
+    """Returns L2-normalized float32 copies of the rows of embeddings (zero rows stay zero)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+
+def quantize_int8(embeddings):
+    """Scalar-quantizes each row to int8 with its own scale (row ~= quantized * scale).
+
+    Returns:
+        tuple: ((n, dim) int8 array, (n,) float32 scales).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(embeddings).max(axis=-1) / 127
+    scales = np.where(scales > 0, scales, 1).astype(np.float32)
+    quantized = np.rint(embeddings / scales[..., None]).astype(np.int8)
+    return quantized, scales
+
+
+class EmbeddingCache:
+    """In-memory copy of the records' average embeddings for cosine search.
+
+    The embeddings are kept L2-normalized in one contiguous float32 matrix, so a search is a single
+    matrix-vector product plus an argpartition, without a database query. The other fields of each
+    record are kept next to its row.
+
+    With dtype 'float16' or 'int8' (scalar-quantized, one scale per row) the matrix takes half or
+    a quarter of the memory, and a search converts it to float32 block by block. The similarities
+    are then approximate (int8 can swap look-alike records); with a rerank_source, the best
+    rerank_candidates rows of each query are rescored with their exact embeddings, read from
+    rerank_source(global_ids) -> {global_id: embedding} (e.g. from the database).
+
+    The database stays the source of truth: the cache is filled from it with load() and is kept in
+    sync by upsert(), update_fields() and remove() after each mutation. invalidate() drops
+    everything, the owner then loads it again before the next search. All methods are thread safe.
+
+    A snapshot read from the database misses the mutations made while it is read, so a load
+    starts with begin_load(), before reading: the mutations received until load() are kept and
+    replayed on top of the snapshot. Without a pending load, mutations of an unloaded cache are
+    ignored (the next load reads them from the database).
+    """
+
+    def __init__(self, dtype="float32", rerank_source=None, rerank_candidates=EMBEDDING_CACHE_RERANK_CANDIDATES):
+        if dtype not in EMBEDDING_CACHE_DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype '{dtype}', expected one of {EMBEDDING_CACHE_DTYPES}")
+        self.dtype = dtype
+        self.rerank_source = rerank_source
+        self.rerank_candidates = rerank_candidates
+        self._lock = threading.RLock()
+        self._matrix = None  # (capacity, dim) normalized embeddings, rows [0, size) are valid
+        self._scales = None  # int8 only: the scale of each row
+        self._norms = None  # original norm of each row, to return the unnormalized embedding
+        self._records = []  # row -> record fields (without avg_embedding)
+        self._rows = {}  # global_id -> row
+        self._deferred = None  # mutations received during a pending load, replayed by load()
+        self._generation = 0  # incremented by invalidate(), discards the pending load
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def nbytes(self):
+        """The memory of the embeddings (matrix, scales and norms), in bytes."""
+        with self._lock:
+            arrays = (self._matrix, self._scales, self._norms)
+            return sum(array.nbytes for array in arrays if array is not None)
+
+    def begin_load(self):
+        """Starts recording the mutations for the next load(). Call it before reading the snapshot.
+
+        Returns:
+            int: The token to pass to load().
+        """
+        with self._lock:
+            self._deferred = []
+            return self._generation
+
+    def load(self, records, embeddings, token=None):
+        """Replaces the content of the cache, then replays the mutations received since begin_load().
+
+        Args:
+            records (list): Record dicts with at least 'global_id', without 'avg_embedding'.
+            embeddings (np.ndarray): (len(records), dim) average embeddings of the records.
+            token (int or None): The token of begin_load(). Defaults to None (no pending load).
+
+        Returns:
+            bool: False if the cache was invalidated since begin_load() (the snapshot is discarded
+                and the cache must be loaded again), True otherwise.
+        """
+        records = list(records)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if token is not None and token != self._generation:
+                return False
+            deferred, self._deferred = self._deferred or [], None
+            self._records, self._rows = [], {}
+            self._matrix, self._scales, self._norms = None, None, None
+            if records:
+                self._reserve(len(records), embeddings.shape[1])
+                self._norms[: len(records)] = np.linalg.norm(embeddings, axis=1)
+                self._store(slice(0, len(records)), normalize_embeddings(embeddings))
+                for row, record in enumerate(records):
+                    self._records.append(self._fields(record))
+                    self._rows[record["global_id"]] = row
+            self.loaded = True
+            for replay in deferred:
+                replay()
+        hailo_logger.debug(f"Embedding cache loaded with {len(records)} records, {len(deferred)} updates replayed")
+        return True
+
+    def invalidate(self):
+        """Drops the content of the cache; it must be loaded again before the next search."""
+        with self._lock:
+            self._records, self._rows = [], {}
+            self._matrix, self._scales, self._norms = None, None, None
+            self._deferred = None
+            self._generation += 1
+            self.loaded = False
+
+    def upsert(self, record, insert=True):
+        """Adds a record, or updates the row of the record with the same global_id (the fields
+        missing from record keep their cached value).
+
+        Args:
+            record (dict): The record, with at least 'global_id' and 'avg_embedding'.
+            insert (bool): Add the record if it is not cached. If False, a record that is not
+                cached (e.g. deleted meanwhile) is ignored. Defaults to True.
+        """
+        embedding = np.asarray(record["avg_embedding"], dtype=np.float32).ravel()
+        with self._lock:
+            if self._defer(functools.partial(self.upsert, record, insert=insert)):
+                return
+            row = self._rows.get(record["global_id"])
+            if row is None and not insert:
+                return
+            if row is None:
+                row = len(self._records)
+                self._reserve(row + 1, embedding.shape[0])
+                self._records.append({})
+                self._rows[record["global_id"]] = row
+            self._records[row] = {**self._records[row], **self._fields(record)}
+            self._norms[row] = np.linalg.norm(embedding)
+            self._store(slice(row, row + 1), normalize_embeddings(embedding.reshape(1, -1)))
+
+    def update_fields(self, global_id, **fields):
+        """Updates fields other than avg_embedding of a cached record (e.g. label)."""
+        with self._lock:
+            if self._defer(functools.partial(self.update_fields, global_id, **fields)):
+                return
+            row = self._rows.get(global_id)
+            if row is not None:
+                self._records[row].update(fields)
+
+    def update_all_fields(self, **fields):
+        """Updates fields other than avg_embedding of every cached record."""
+        with self._lock:
+            if self._defer(functools.partial(self.update_all_fields, **fields)):
+                return
+            for record in self._records:
+                record.update(fields)
+
+    def remove(self, global_id):
+        """Removes a record. The last row is moved into its place, so the matrix stays contiguous."""
+        with self._lock:
+            if self._defer(functools.partial(self.remove, global_id)):
+                return
+            row = self._rows.pop(global_id, None)
+            if row is None:
+                return
+            last = len(self._records) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._norms[row] = self._norms[last]
+                if self._scales is not None:
+                    self._scales[row] = self._scales[last]
+                self._records[row] = self._records[last]
+                self._rows[self._records[row]["global_id"]] = row
+            self._records.pop()
+
+    def search(self, embedding, top_k=1):
+        """Returns the top_k records by cosine similarity.
+
+        Args:
+            embedding (np.ndarray): The query embedding.
+            top_k (int): The number of results. Defaults to 1.
+
+        Returns:
+            list: Record dicts, closest first, with 'avg_embedding' and '_distance'
+                (1 - cosine similarity), like a LanceDB cosine search.
+        """
+        return self.search_batch(np.asarray(embedding).reshape(1, -1), top_k=top_k)[0]
+
+    def search_batch(self, embeddings, top_k=1):
+        """Returns the top_k records of each query, with a single matrix product for all queries.
+
+        Args:
+            embeddings (np.ndarray): (N, dim) query embeddings.
+            top_k (int): The number of results per query. Defaults to 1.
+
+        Returns:
+            list: For each query, the list of results of search().
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings) == 0:
+            return []
+        queries = normalize_embeddings(embeddings.reshape(len(embeddings), -1))
+        rerank = self.rerank_source is not None and self.dtype != "float32"
+        with self._lock:
+            size = len(self._records)
+            if size == 0 or top_k < 1:
+                return [[] for _ in range(len(queries))]
+            candidates = max(top_k, self.rerank_candidates) if rerank else top_k
+            similarities = self._similarities(queries, size)
+            if candidates < size:
+                best = np.argpartition(-similarities, candidates - 1, axis=1)[:, :candidates]
+                order = np.argsort(-np.take_along_axis(similarities, best, axis=1), axis=1)
+                best = np.take_along_axis(best, order, axis=1)
+            else:
+                best = np.argsort(-similarities, axis=1)
+            results = [
+                [self._result(row, float(query_similarities[row])) for row in query_best]
+                for query_similarities, query_best in zip(similarities, best, strict=True)
+            ]
+        if rerank:  # outside the lock: the source may read the database
+            results = self._rerank(queries, results, top_k)
+        return results
+
+    def _similarities(self, queries, size):
+        """Returns the (n_queries, size) cosine similarities of the queries and the cached rows."""
+        if self.dtype == "float32":
+            return queries @ self._matrix[:size].T
+        similarities = np.empty((len(queries), size), dtype=np.float32)
+        for start in range(0, size, EMBEDDING_CACHE_BLOCK_ROWS):
+            end = min(start + EMBEDDING_CACHE_BLOCK_ROWS, size)
+            similarities[:, start:end] = queries @ self._matrix[start:end].astype(np.float32).T
+        if self._scales is not None:
+            similarities *= self._scales[:size]
+        return similarities
+
+    def _rerank(self, queries, results, top_k):
+        """Rescores the candidates of each query with their exact embeddings and keeps the top_k."""
+        global_ids = list({result["global_id"] for query_results in results for result in query_results})
+        exact = self.rerank_source(global_ids) if global_ids else {}
+        reranked = []
+        for query, query_results in zip(queries, results, strict=True):
+            for result in query_results:
+                embedding = exact.get(result["global_id"])
+                if embedding is not None:  # otherwise keep the approximate similarity
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                    result["avg_embedding"] = embedding.tolist()
+                    result["_distance"] = 1.0 - float(normalize_embeddings(embedding) @ query)
+            reranked.append(sorted(query_results, key=lambda result: result["_distance"])[:top_k])
+        return reranked
+
+    def _defer(self, replay):
+        """Records a mutation for the pending load, if any. Returns True if the cache is not loaded
+        (the mutation has nothing to update). Called with the lock held."""
+        if self._deferred is not None:
+            self._deferred.append(replay)
+        return not self.loaded
+
+    def _result(self, row, similarity):
+        result = dict(self._records[row])
+        result["avg_embedding"] = (self._row(row) * self._norms[row]).tolist()
+        result["_distance"] = 1.0 - similarity
+        return result
+
+    def _store(self, rows, normalized):
+        """Stores normalized embeddings in rows of the matrix, in the cache dtype."""
+        if self.dtype == "int8":
+            self._matrix[rows], self._scales[rows] = quantize_int8(normalized)
+        else:
+            self._matrix[rows] = normalized
+
+    def _row(self, row):
+        """Returns a row of the matrix as float32 (dequantized)."""
+        vector = self._matrix[row].astype(np.float32)
+        return vector * self._scales[row] if self._scales is not None else vector
+
+    def _reserve(self, size, dim):
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding size {dim} does not match the cached size {self._matrix.shape[1]}")
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, 2 * capacity, EMBEDDING_CACHE_INITIAL_CAPACITY)
+        matrix = np.zeros((new_capacity, dim), dtype=self.dtype)
+        norms = np.zeros(new_capacity, dtype=np.float32)
+        scales = np.ones(new_capacity, dtype=np.float32) if self.dtype == "int8" else None
+        if self._matrix is not None:
+            matrix[:capacity] = self._matrix
+            norms[:capacity] = self._norms
+            if scales is not None:
+                scales[:capacity] = self._scales
+        self._matrix, self._scales, self._norms = matrix, scales, norms
+
+    @staticmethod
+    def _fields(record):
+        return {key: value for key, value in record.items() if key not in ("avg_embedding", "_distance")}
@@ -1,6 +1,5 @@
 # region imports
 # Standard library imports
-import json
 import os
 import shutil
 from datetime import datetime
@@ -36,7 +35,7 @@ def visualize_embeddings(db_handler):
     Args:
         db_handler: DatabaseHandler instance for database operations
     """
-    records = db_handler.tbl_records.to_pandas()
+    records = db_handler.get_all_records()
 
     # Create a FiftyOne dataset
     dataset_name = f"embeddings_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -47,8 +46,8 @@ def visualize_embeddings(db_handler):
     os.makedirs(dummy_dir, exist_ok=True)
 
     # Add samples to dataset with embeddings
-    for _idx, record in records.iterrows():
-        pictures = json.loads(record["samples_json"]) if record["samples_json"] else []
+    for record in records:
+        pictures = record["samples"]
         if pictures and len(pictures) > 0:
             # Create a directory for this person
             person_dir = os.path.join(dummy_dir, str(record["global_id"]))
@@ -0,0 +1,248 @@
+# region imports
+# Standard library imports
+import json
+import queue
+import socket
+import threading
+import time
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+DEFAULT_EXPORT_BATCH_SIZE = 32
+DEFAULT_EXPORT_FLUSH_INTERVAL = 0.1  # seconds
+DEFAULT_EXPORT_MAX_PENDING = 1024  # records
+UDP_MAX_DATAGRAM_SIZE = 1472  # Ethernet MTU minus IP/UDP headers, avoids IP fragmentation
+UNIX_MAX_DATAGRAM_SIZE = 65536
+
+
+# -----------------------------------------------------------------------------------------------
+# Sinks: write batches of serialized records (one JSON object per line)
+# -----------------------------------------------------------------------------------------------
+class JsonlFileSink:
+    """Appends records to a JSON Lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def write_batch(self, lines) -> int:
+        """Writes a batch of serialized records.
+
+        Returns:
+            int: The number of records written.
+        """
+        self._file.write(b"".join(line + b"\n" for line in lines))
+        self._file.flush()
+        return len(lines)
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self):
+        return f"jsonl:{self.path}"
+
+
+class DatagramSink:
+    """Sends records over a non-blocking datagram socket, packing as many newline-separated records
+    as fit in each datagram. Records are dropped, never queued, when the receiver is missing or its
+    buffer is full. A record larger than max_datagram_size is sent in a datagram of its own.
+
+    Args:
+        family (int): Socket family (socket.AF_UNIX or socket.AF_INET).
+        address (str or tuple): Destination address.
+        max_datagram_size (int): Maximum payload size of a datagram.
+    """
+
+    def __init__(self, family, address, max_datagram_size):
+        self.address = address
+        self.max_datagram_size = max_datagram_size
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def write_batch(self, lines) -> int:
+        written = 0
+        for datagram, count in self._pack(lines):
+            try:
+                self._socket.sendto(datagram, self.address)
+                written += count
+            except OSError:
+                # No receiver yet, or its buffer is full (BlockingIOError, ConnectionRefusedError...)
+                pass
+        return written
+
+    def _pack(self, lines):
+        datagram, count = [], 0
+        size = 0
+        for line in lines:
+            if datagram and size + len(line) + 1 > self.max_datagram_size:
+                yield b"\n".join(datagram) + b"\n", count
+                datagram, count, size = [], 0, 0
+            datagram.append(line)
+            count += 1
+            size += len(line) + 1
+        if datagram:
+            yield b"\n".join(datagram) + b"\n", count
+
+    def close(self):
+        self._socket.close()
+
+
+class UnixSocketSink(DatagramSink):
+    """Sends records to a Unix domain datagram socket bound by the consumer."""
+
+    def __init__(self, path, max_datagram_size=UNIX_MAX_DATAGRAM_SIZE):
+        super().__init__(socket.AF_UNIX, path, max_datagram_size)
+
+    def __repr__(self):
+        return f"unix:{self.address}"
+
+
+class UdpSink(DatagramSink):
+    """Sends records to a UDP host and port."""
+
+    def __init__(self, host, port, max_datagram_size=UDP_MAX_DATAGRAM_SIZE):
+        super().__init__(socket.AF_INET, (host, int(port)), max_datagram_size)
+
+    def __repr__(self):
+        return f"udp:{self.address[0]}:{self.address[1]}"
+
+
+def create_metadata_sink(spec):
+    """Creates a sink from a destination string.
+
+    Args:
+        spec (str): 'jsonl:<path>' (or a path ending with .jsonl), 'unix:<socket path>' or
+            'udp:<host>:<port>'.
+
+    Returns:
+        A sink with write_batch(lines) and close().
+
+    Raises:
+        ValueError: If the destination is not supported.
+    """
+    if spec.startswith("jsonl:"):
+        return JsonlFileSink(spec[len("jsonl:") :])
+    if spec.endswith(".jsonl"):
+        return JsonlFileSink(spec)
+    if spec.startswith("unix:"):
+        return UnixSocketSink(spec[len("unix:") :])
+    if spec.startswith("udp:"):
+        host, _, port = spec[len("udp:") :].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid UDP destination '{spec}', expected udp:<host>:<port>")
+        return UdpSink(host, int(port))
+    raise ValueError(
+        f"Unsupported metadata destination '{spec}', expected jsonl:<path>, unix:<path> or udp:<host>:<port>"
+    )
+
+
+# -----------------------------------------------------------------------------------------------
+# Background writer
+# -----------------------------------------------------------------------------------------------
+class MetadataExportWorker:
+    """Serializes and writes metadata records from a background thread.
+
+    submit() never blocks: when the pending queue is full (the sink is slower than the pipeline)
+    the record is dropped and counted. The thread writes a batch when batch_size records are
+    pending or flush_interval seconds passed since the first record of the batch.
+
+    Args:
+        sink: The destination (see create_metadata_sink).
+        batch_size (int): Maximum records per batch. Defaults to 32.
+        flush_interval (float): Maximum time a record waits for its batch, in seconds. Defaults to 0.1.
+        max_pending (int): Maximum records waiting for the writer thread. Defaults to 1024.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        sink,
+        batch_size=DEFAULT_EXPORT_BATCH_SIZE,
+        flush_interval=DEFAULT_EXPORT_FLUSH_INTERVAL,
+        max_pending=DEFAULT_EXPORT_MAX_PENDING,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_submitted = 0
+        self.records_written = 0
+        self.records_dropped = 0  # queue full
+        self.records_failed = 0  # rejected by the sink
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metadata_export", daemon=True)
+            self._thread.start()
+
+    def submit(self, record) -> bool:
+        """Queues a record (a JSON-serializable dict) for export without blocking.
+
+        Returns:
+            bool: False if the record was dropped.
+        """
+        self.records_submitted += 1
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.records_dropped += 1
+            return False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is self._STOP:
+                break
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            self._write(batch)
+
+    def _write(self, batch):
+        lines = [json.dumps(record, separators=(",", ":")).encode("utf-8") for record in batch]
+        try:
+            written = self.sink.write_batch(lines)
+        except Exception as e:
+            hailo_logger.error(f"Metadata export to {self.sink!r} failed: {e}")
+            written = 0
+        self.records_written += written
+        self.records_failed += len(batch) - written
+
+    def stop(self, timeout=2.0):
+        """Writes the pending records, stops the thread and closes the sink."""
+        if self._thread is not None:
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                hailo_logger.warning("Metadata export queue is still full; pending records are lost")
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.sink.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "records_submitted": self.records_submitted,
+            "records_written": self.records_written,
+            "records_dropped": self.records_dropped,
+            "records_failed": self.records_failed,
+            "pending": self._queue.qsize(),
+        }
@@ -0,0 +1,85 @@
+# region imports
+# Standard library imports
+import json
+
+# Third-party imports
+import hailo
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+def detection_to_dict(detection):
+    """Serializes a HailoDetection to a JSON-friendly dict in normalized frame coordinates.
+
+    Args:
+        detection (hailo.HailoDetection): The detection to serialize.
+
+    Returns:
+        dict: label, confidence, bbox [xmin, ymin, width, height] and, when present, track_id,
+        classifications and landmarks ([x, y, confidence] points in frame coordinates).
+    """
+    bbox = detection.get_bbox()
+    result = {
+        "label": detection.get_label(),
+        "confidence": round(detection.get_confidence(), 4),
+        "bbox": [round(value, 5) for value in (bbox.xmin(), bbox.ymin(), bbox.width(), bbox.height())],
+    }
+    track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
+    if track:
+        result["track_id"] = track[0].get_id()
+    classifications = detection.get_objects_typed(hailo.HAILO_CLASSIFICATION)
+    if classifications:
+        result["classifications"] = [
+            {
+                "type": classification.get_classification_type(),
+                "label": classification.get_label(),
+                "confidence": round(classification.get_confidence(), 4),
+            }
+            for classification in classifications
+        ]
+    landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
+    if landmarks:
+        # Landmark points are relative to the detection bbox
+        result["landmarks"] = [
+            [
+                round(point.x() * bbox.width() + bbox.xmin(), 5),
+                round(point.y() * bbox.height() + bbox.ymin(), 5),
+                round(point.confidence(), 4),
+            ]
+            for point in landmarks[0].get_points()
+        ]
+    return result
+
+
+def roi_to_dict(roi):
+    """Serializes the detections of a frame ROI to a JSON-friendly dict.
+
+    Args:
+        roi (hailo.HailoROI): The frame ROI (hailo.get_roi_from_buffer).
+
+    Returns:
+        dict: {"detections": [...]} (see detection_to_dict), plus "stream_id" for multi-source
+        pipelines.
+    """
+    result = {
+        "detections": [
+            detection_to_dict(detection)
+            for detection in roi.get_objects_typed(hailo.HAILO_DETECTION)
+        ]
+    }
+    stream_id = roi.get_stream_id()
+    if stream_id:
+        result["stream_id"] = stream_id
+    return result
+
+
+def roi_to_json_bytes(roi, **extra):
+    """Serializes a frame ROI to compact UTF-8 JSON. Extra keyword arguments (e.g. pts, frame
+    index) are added to the top-level object."""
+    metadata = roi_to_dict(roi)
+    metadata.update(extra)
+    return json.dumps(metadata, separators=(",", ":")).encode("utf-8")
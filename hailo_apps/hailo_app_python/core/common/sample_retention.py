@@ -0,0 +1,138 @@
+# region imports
+# Standard library imports
+import threading
+import time
+
+# Third-party imports
+import numpy as np
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+def select_diverse_samples(embeddings: np.ndarray, max_samples: int) -> np.ndarray:
+    """Selects the max_samples most diverse embeddings (greedy farthest-point / k-center).
+
+    The first selected embedding is the most central one (closest to the mean direction); each
+    next one is the embedding farthest (cosine distance) from all those already selected. The
+    selection covers the spread of the samples with the fewest redundant ones: a sample close to
+    a selected one is left out.
+
+    Args:
+        embeddings (np.ndarray): (n_samples, dim) embeddings.
+        max_samples (int): The number of embeddings to keep.
+
+    Returns:
+        np.ndarray: The sorted indices of the kept embeddings (all of them if there are at most
+            max_samples).
+    """
+    count = len(embeddings)
+    if count <= max_samples:
+        return np.arange(count)
+    if max_samples <= 0:
+        return np.arange(0)
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+    selected = [int(np.argmax(vectors @ vectors.mean(axis=0)))]
+    distances = 1 - vectors @ vectors[selected[0]]  # to the nearest selected embedding
+    distances[selected[0]] = -np.inf
+    for _ in range(max_samples - 1):
+        farthest = int(np.argmax(distances))
+        selected.append(farthest)
+        distances = np.minimum(distances, 1 - vectors @ vectors[farthest])
+        distances[selected] = -np.inf
+    return np.sort(selected)
+
+
+class SampleRetentionWorker:
+    """Runs the sample retention of the records that exceeded their sample bound, from a
+    background thread, so the eviction (rows, sample files and average embedding) never runs in
+    the caller's thread (e.g. a streaming thread).
+
+    Args:
+        enforce (callable): enforce(global_id) applies the retention to a record and returns the
+            number of evicted samples (e.g. DatabaseHandler.enforce_sample_retention).
+        background (bool): Start the thread on demand. If False, call run_pending() yourself.
+            Defaults to True.
+    """
+
+    def __init__(self, enforce, background=True):
+        self.enforce = enforce
+        self.background = background
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self.passes = 0
+        self.evicted = 0
+        self.last_pass_time = None
+        self.last_error = None
+
+    def mark(self, global_id):
+        """Queues a record for the next pass."""
+        with self._lock:
+            self._pending.add(global_id)
+        if not self.background:
+            return
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="sample-retention", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def run_pending(self):
+        """Applies the retention to the queued records, in the calling thread.
+
+        Returns:
+            int: The number of evicted samples.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return 0
+        evicted = 0
+        for global_id in pending:
+            try:
+                evicted += self.enforce(global_id)
+            except Exception as e:
+                self.last_error = str(e)
+                hailo_logger.error(f"Sample retention of {global_id} failed: {e}")
+        self.passes += 1
+        self.evicted += evicted
+        self.last_pass_time = time.time()
+        if evicted:
+            hailo_logger.debug(f"Sample retention: {evicted} samples of {len(pending)} records evicted")
+        return evicted
+
+    def _run(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            if self._running:
+                self.run_pending()
+
+    def get_stats(self) -> dict:
+        """Returns the records waiting for a pass and the eviction counters."""
+        with self._lock:
+            stats = {"pending_records": len(self._pending)}
+        stats.update({"passes": self.passes, "evicted_samples": self.evicted})
+        if self.last_pass_time is not None:
+            stats["seconds_since_pass"] = round(time.time() - self.last_pass_time, 1)
+        if self.last_error:
+            stats["last_error"] = self.last_error
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stops the thread (a running pass is completed first) and runs the queued records."""
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.background = False
+        self.run_pending()
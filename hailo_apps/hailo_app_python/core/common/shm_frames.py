@@ -0,0 +1,393 @@
+# region imports
+# Standard library imports
+import json
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# Third-party imports
+import numpy as np
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Shared-memory frame ring layout (all little-endian):
+#   header (64 bytes): magic, version, num_slots, frame_capacity, metadata_capacity, latest_seq,
+#   writer_pid
+#   num_slots x slot: slot header (64 bytes) + frame area (frame_capacity) + metadata area
+# A slot header holds its sequence number, which is 0 while the writer fills the slot. Readers
+# compare it with the sequence they expect to detect frames overwritten while being read.
+SHM_MAGIC = b"HSHM"
+SHM_VERSION = 2
+SHM_HEADER_SIZE = 64
+SHM_SLOT_HEADER_SIZE = 64
+SHM_ALIGNMENT = 64
+_HEADER_FORMAT = "<4sIIQI"
+_LATEST_SEQ_FORMAT = "<Q"
+_LATEST_SEQ_OFFSET = 32
+_WRITER_PID_FORMAT = "<I"
+_WRITER_PID_OFFSET = 40
+_SLOT_HEADER_FORMAT = "<QqIIQI16s"
+
+DEFAULT_SHM_SLOTS = 4
+DEFAULT_SHM_METADATA_CAPACITY = 64 * 1024
+
+# Frame shapes (height, width) -> array shape, per GStreamer video format
+_FORMAT_SHAPES = {
+    "RGB": lambda height, width: (height, width, 3),
+    "BGR": lambda height, width: (height, width, 3),
+    "RGBA": lambda height, width: (height, width, 4),
+    "BGRA": lambda height, width: (height, width, 4),
+    "RGBx": lambda height, width: (height, width, 4),
+    "BGRx": lambda height, width: (height, width, 4),
+    "YUY2": lambda height, width: (height, width, 2),
+    "GRAY8": lambda height, width: (height, width),
+    "NV12": lambda height, width: (height * 3 // 2, width),
+}
+
+
+def _align(size):
+    return (size + SHM_ALIGNMENT - 1) // SHM_ALIGNMENT * SHM_ALIGNMENT
+
+
+def _slot_stride(frame_capacity, metadata_capacity):
+    return _align(SHM_SLOT_HEADER_SIZE + frame_capacity + metadata_capacity)
+
+
+def frame_shape(video_format, width, height, size):
+    """Returns the numpy shape of a frame, or a flat shape for formats without a known layout."""
+    shape_function = _FORMAT_SHAPES.get(video_format)
+    if shape_function is not None:
+        shape = shape_function(height, width)
+        if int(np.prod(shape)) == size:
+            return shape
+    return (size,)
+
+
+class SharedFrame:
+    """A frame read from a SharedMemoryFrameReader.
+
+    Attributes:
+        seq (int): Frame sequence number (starts at 1).
+        pts (int or None): Buffer timestamp in nanoseconds.
+        video_format (str): GStreamer video format, e.g. 'RGB'.
+        width (int), height (int): Frame size.
+        frame (np.ndarray): The frame. A zero-copy view into shared memory unless read with
+            copy=True; it stays valid until the writer wraps around the ring (see is_valid).
+        metadata (dict or None): Per-frame metadata written with the frame.
+    """
+
+    def __init__(self, seq, pts, video_format, width, height, frame, metadata):
+        self.seq = seq
+        self.pts = pts
+        self.video_format = video_format
+        self.width = width
+        self.height = height
+        self.frame = frame
+        self.metadata = metadata
+
+
+class SharedMemoryFrameWriter:
+    """Publishes frames and their metadata to a named shared-memory ring.
+
+    Any number of SharedMemoryFrameReader instances, in any local process, can read the ring
+    concurrently. The writer never waits for readers: slow readers skip frames.
+
+    The segment is created on the first frame, sized for that frame unless frame_capacity is given,
+    so it works with any negotiated caps. Frames larger than the capacity are dropped.
+
+    The writer stores its PID in the ring header. A segment of the same name whose writer process
+    is gone (it did not exit cleanly) is replaced; one whose writer is alive raises
+    FileExistsError, when the writer is created and when the segment is created.
+
+    Args:
+        name (str): Shared-memory segment name (appears under /dev/shm).
+        num_slots (int): Number of frames in the ring. Defaults to 4.
+        metadata_capacity (int): Maximum serialized metadata size per frame. Defaults to 64 KiB.
+        frame_capacity (int or None): Maximum frame size in bytes. Defaults to the first frame size.
+    """
+
+    def __init__(
+        self,
+        name,
+        num_slots=DEFAULT_SHM_SLOTS,
+        metadata_capacity=DEFAULT_SHM_METADATA_CAPACITY,
+        frame_capacity=None,
+    ):
+        if num_slots < 2:
+            raise ValueError(f"At least 2 slots are required, got {num_slots}")
+        _check_no_live_writer(name)
+        self.name = name
+        self.num_slots = num_slots
+        self.metadata_capacity = metadata_capacity
+        self.frame_capacity = frame_capacity
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.metadata_dropped = 0
+        self._shm = None
+        self._seq = 0
+
+    def _create(self, frame_size):
+        if self.frame_capacity is None:
+            self.frame_capacity = frame_size
+        stride = _slot_stride(self.frame_capacity, self.metadata_capacity)
+        size = SHM_HEADER_SIZE + self.num_slots * stride
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left over by a writer that did not exit cleanly, unless its writer is alive
+            _check_no_live_writer(self.name)
+            hailo_logger.warning(f"Replacing stale shared memory segment '{self.name}'")
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        struct.pack_into(
+            _HEADER_FORMAT,
+            self._shm.buf,
+            0,
+            SHM_MAGIC,
+            SHM_VERSION,
+            self.num_slots,
+            self.frame_capacity,
+            self.metadata_capacity,
+        )
+        struct.pack_into(_LATEST_SEQ_FORMAT, self._shm.buf, _LATEST_SEQ_OFFSET, 0)
+        struct.pack_into(_WRITER_PID_FORMAT, self._shm.buf, _WRITER_PID_OFFSET, os.getpid())
+        hailo_logger.info(
+            f"Shared memory frame ring '{self.name}' created: {self.num_slots} slots of "
+            f"{self.frame_capacity} bytes"
+        )
+
+    def write(self, data, video_format, width, height, pts=None, metadata=b""):
+        """Writes a frame to the next slot of the ring.
+
+        Args:
+            data (bytes-like or np.ndarray): The raw frame data (e.g. a mapped Gst.Buffer).
+            video_format (str): GStreamer video format of the frame.
+            width (int), height (int): Frame size.
+            pts (int or None): Buffer timestamp in nanoseconds.
+            metadata (bytes or dict): Serialized (JSON) metadata, or a dict to serialize.
+
+        Returns:
+            bool: True if the frame was written.
+        """
+        if isinstance(data, np.ndarray):
+            source = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+        else:
+            source = np.frombuffer(data, dtype=np.uint8)
+        if self._shm is None:
+            self._create(source.size)
+        if source.size > self.frame_capacity:
+            self.frames_dropped += 1
+            if self.frames_dropped == 1:
+                hailo_logger.warning(
+                    f"Frame of {source.size} bytes exceeds the shared memory slot capacity "
+                    f"({self.frame_capacity} bytes); dropping frames"
+                )
+            return False
+        if isinstance(metadata, dict):
+            metadata = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+        if len(metadata) > self.metadata_capacity:
+            self.metadata_dropped += 1
+            metadata = b""
+
+        seq = self._seq + 1
+        offset = SHM_HEADER_SIZE + (seq % self.num_slots) * _slot_stride(
+            self.frame_capacity, self.metadata_capacity
+        )
+        buf = self._shm.buf
+        # Mark the slot as being written before touching the data
+        struct.pack_into("<Q", buf, offset, 0)
+        frame_offset = offset + SHM_SLOT_HEADER_SIZE
+        np.frombuffer(buf, dtype=np.uint8, count=source.size, offset=frame_offset)[:] = source
+        metadata_offset = frame_offset + self.frame_capacity
+        buf[metadata_offset : metadata_offset + len(metadata)] = metadata
+        struct.pack_into(
+            _SLOT_HEADER_FORMAT,
+            buf,
+            offset,
+            seq,
+            -1 if pts is None else pts,
+            width,
+            height,
+            source.size,
+            len(metadata),
+            video_format.encode("ascii")[:16],
+        )
+        struct.pack_into(_LATEST_SEQ_FORMAT, buf, _LATEST_SEQ_OFFSET, seq)
+        self._seq = seq
+        self.frames_written += 1
+        return True
+
+    def get_stats(self) -> dict:
+        return {
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "metadata_dropped": self.metadata_dropped,
+        }
+
+    def close(self):
+        """Closes and removes the shared-memory segment."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+
+class SharedMemoryFrameReader:
+    """Reads frames and metadata published by a SharedMemoryFrameWriter, without copying them.
+
+    Example:
+        reader = SharedMemoryFrameReader("hailo_frames")
+        while True:
+            shared_frame = reader.wait_for_frame(timeout=1.0)
+            if shared_frame is not None:
+                process(shared_frame.frame, shared_frame.metadata)
+
+    Args:
+        name (str): Shared-memory segment name used by the writer.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._shm = _attach_shared_memory(name)
+        magic, version, num_slots, frame_capacity, metadata_capacity = struct.unpack_from(
+            _HEADER_FORMAT, self._shm.buf, 0
+        )
+        if magic != SHM_MAGIC or version != SHM_VERSION:
+            self._shm.close()
+            raise ValueError(f"Shared memory segment '{name}' is not a frame ring (version {SHM_VERSION})")
+        self.num_slots = num_slots
+        self.frame_capacity = frame_capacity
+        self.metadata_capacity = metadata_capacity
+        self._stride = _slot_stride(frame_capacity, metadata_capacity)
+        self._last_seq = 0
+
+    def _slot_offset(self, seq):
+        return SHM_HEADER_SIZE + (seq % self.num_slots) * self._stride
+
+    def latest_seq(self) -> int:
+        return struct.unpack_from(_LATEST_SEQ_FORMAT, self._shm.buf, _LATEST_SEQ_OFFSET)[0]
+
+    def read_latest(self, copy=False):
+        """Returns the newest frame, or None if there is no frame newer than the last one read.
+
+        Args:
+            copy (bool): Copy the frame out of shared memory instead of returning a view.
+
+        Returns:
+            SharedFrame or None.
+        """
+        seq = self.latest_seq()
+        if seq == 0 or seq == self._last_seq:
+            return None
+        offset = self._slot_offset(seq)
+        slot_seq, pts, width, height, frame_size, metadata_size, video_format = struct.unpack_from(
+            _SLOT_HEADER_FORMAT, self._shm.buf, offset
+        )
+        if slot_seq != seq:
+            # The writer already moved on and is rewriting this slot
+            return None
+        frame_offset = offset + SHM_SLOT_HEADER_SIZE
+        video_format = video_format.rstrip(b"\0").decode("ascii")
+        frame = np.ndarray(
+            shape=frame_shape(video_format, width, height, frame_size),
+            dtype=np.uint8,
+            buffer=self._shm.buf,
+            offset=frame_offset,
+        )
+        if copy:
+            frame = frame.copy()
+        metadata_offset = frame_offset + self.frame_capacity
+        metadata = bytes(self._shm.buf[metadata_offset : metadata_offset + metadata_size])
+        if struct.unpack_from("<Q", self._shm.buf, offset)[0] != seq:
+            return None
+        self._last_seq = seq
+        return SharedFrame(
+            seq=seq,
+            pts=None if pts < 0 else pts,
+            video_format=video_format,
+            width=width,
+            height=height,
+            frame=frame,
+            metadata=json.loads(metadata) if metadata else None,
+        )
+
+    def wait_for_frame(self, timeout=None, poll_interval=0.002, copy=False):
+        """Waits for a new frame. Returns None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            shared_frame = self.read_latest(copy=copy)
+            if shared_frame is not None:
+                return shared_frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def is_valid(self, shared_frame) -> bool:
+        """Returns True if a zero-copy frame was not overwritten by the writer yet."""
+        offset = self._slot_offset(shared_frame.seq)
+        return struct.unpack_from("<Q", self._shm.buf, offset)[0] == shared_frame.seq
+
+    def close(self):
+        """Detaches from the segment. Zero-copy frames must be released before closing."""
+        try:
+            self._shm.close()
+        except BufferError:
+            hailo_logger.warning(
+                f"Frames of '{self.name}' are still referenced; the segment stays mapped until they are released"
+            )
+
+
+def _attach_shared_memory(name):
+    """Attaches to an existing segment without registering it with the resource tracker, which
+    would otherwise remove the writer's segment when the reader process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+def _check_no_live_writer(name):
+    """Raises FileExistsError if a segment named name exists and its writer process is alive."""
+    try:
+        shm = _attach_shared_memory(name)
+    except FileNotFoundError:
+        return
+    try:
+        if shm.size < SHM_HEADER_SIZE:
+            return
+        magic, version = struct.unpack_from("<4sI", shm.buf, 0)
+        if magic != SHM_MAGIC or version != SHM_VERSION:
+            return
+        writer_pid = struct.unpack_from(_WRITER_PID_FORMAT, shm.buf, _WRITER_PID_OFFSET)[0]
+    finally:
+        shm.close()
+    if writer_pid and _process_alive(writer_pid):
+        raise FileExistsError(
+            f"Shared memory segment '{name}' is in use by the frame writer of process {writer_pid}; "
+            f"choose another name"
+        )
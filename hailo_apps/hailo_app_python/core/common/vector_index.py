@@ -0,0 +1,218 @@
+# region imports
+# Standard library imports
+import math
+import threading
+import time
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Below this size a flat scan is as fast as an index
+VECTOR_INDEX_MIN_ROWS = 256
+# From this size the vectors are compressed (IVF_PQ) instead of stored in full (IVF_FLAT)
+VECTOR_INDEX_PQ_MIN_ROWS = 100_000
+# Rebuild (new partitions) once the table grew by this factor since the last build
+VECTOR_INDEX_REBUILD_GROWTH = 2.0
+# Add the new rows to the existing index once they exceed this fraction of the table
+VECTOR_INDEX_MAX_UNINDEXED_FRACTION = 0.1
+VECTOR_INDEX_PQ_SUB_VECTOR_DIM = 16
+
+
+def select_vector_index(num_rows, dim):
+    """Returns the index parameters for a table size, or None when no index is needed.
+
+    Returns:
+        dict: create_index() keyword arguments (index_type, num_partitions and, for IVF_PQ,
+            num_sub_vectors), or None.
+    """
+    if num_rows < VECTOR_INDEX_MIN_ROWS:
+        return None
+    # About sqrt(n) partitions of sqrt(n) rows each
+    parameters = {"num_partitions": max(1, int(math.sqrt(num_rows)))}
+    if num_rows < VECTOR_INDEX_PQ_MIN_ROWS or dim % VECTOR_INDEX_PQ_SUB_VECTOR_DIM:
+        parameters["index_type"] = "IVF_FLAT"
+    else:
+        parameters["index_type"] = "IVF_PQ"
+        parameters["num_sub_vectors"] = dim // VECTOR_INDEX_PQ_SUB_VECTOR_DIM
+    return parameters
+
+
+class VectorIndexManager:
+    """Keeps the vector index of a LanceDB table in step with its size, from a background thread.
+
+    The owner reports the rows it adds and removes (rows_added(), rows_removed()), so the row count
+    is known without reading the table. When the table crosses a threshold the maintenance thread
+    is woken up; a build or an update never runs in the caller's thread (e.g. a streaming thread).
+
+    - Build: when the table reaches VECTOR_INDEX_MIN_ROWS rows, when it grew by
+      VECTOR_INDEX_REBUILD_GROWTH since the last build, or when its size calls for another index
+      type (see select_vector_index()).
+    - Forget: when the table shrinks below VECTOR_INDEX_MIN_ROWS, or by
+      VECTOR_INDEX_REBUILD_GROWTH since the last build (e.g. after clear_table()), the index is
+      trained on removed rows; the next build condition is then that of a table without index.
+    - Update: when the rows added since the last build or update exceed
+      VECTOR_INDEX_MAX_UNINDEXED_FRACTION of the table, they are added to the existing index
+      (table.optimize()). Until then, LanceDB searches scan them in full.
+
+    Args:
+        table (lancedb.Table): The table.
+        vector_column (str): The vector column to index.
+        metric (str): The index distance. Defaults to 'cosine'.
+        background (bool): Start the maintenance thread on demand. If False, call maintain()
+            yourself. Defaults to True.
+    """
+
+    def __init__(self, table, vector_column, metric="cosine", background=True):
+        self.table = table
+        self.vector_column = vector_column
+        self.metric = metric
+        self.background = background
+        self.dim = table.schema.field(vector_column).type.list_size
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._row_count = table.count_rows()
+        self.index_type = None
+        self.indexed_rows = 0  # rows at the last build or update
+        self.built_rows = 0  # rows at the last build
+        self.builds = 0
+        self.updates = 0
+        self.last_maintenance_time = None
+        self.last_maintenance_duration = None
+        self.last_error = None
+        index = self._find_index()
+        if index is not None:
+            self.index_type = index.index_type
+            self.indexed_rows = self.built_rows = getattr(index, "num_indexed_rows", None) or self._row_count
+        self._schedule()
+
+    @property
+    def row_count(self):
+        return self._row_count
+
+    def rows_added(self, count=1):
+        with self._lock:
+            self._row_count += count
+        self._schedule()
+
+    def rows_removed(self):
+        """Recounts the rows after a deletion (from the table metadata, without reading the rows)."""
+        with self._lock:
+            self._row_count = self.table.count_rows()
+            self.indexed_rows = min(self.indexed_rows, self._row_count)
+            if self.index_type is not None and (
+                self._row_count < VECTOR_INDEX_MIN_ROWS
+                or self._row_count * VECTOR_INDEX_REBUILD_GROWTH <= self.built_rows
+            ):
+                # The partitions were trained on rows that are mostly gone: build them again
+                self.index_type = None
+                self.indexed_rows = self.built_rows = 0
+        self._schedule()
+
+    def pending_action(self):
+        """Returns 'build', 'update' or None, the maintenance the table needs now."""
+        with self._lock:
+            rows = self._row_count
+            parameters = select_vector_index(rows, self.dim)
+            if parameters is None:
+                return None
+            if (
+                self.index_type is None
+                or self.index_type.replace("_", "").upper() != parameters["index_type"].replace("_", "")
+                or rows >= VECTOR_INDEX_REBUILD_GROWTH * self.built_rows
+            ):
+                return "build"
+            if rows - self.indexed_rows > VECTOR_INDEX_MAX_UNINDEXED_FRACTION * rows:
+                return "update"
+            return None
+
+    def maintain(self):
+        """Runs the maintenance the table needs, if any, in the calling thread.
+
+        Returns:
+            str: The action run ('build' or 'update'), or None.
+        """
+        action = self.pending_action()
+        if action is None:
+            return None
+        rows = self._row_count
+        start = time.monotonic()
+        try:
+            if action == "build":
+                parameters = select_vector_index(rows, self.dim)
+                self.table.create_index(
+                    metric=self.metric, vector_column_name=self.vector_column, replace=True, **parameters
+                )
+                self.index_type = parameters["index_type"]
+                self.built_rows = rows
+                self.builds += 1
+            else:
+                self.table.optimize()
+                self.updates += 1
+            self.indexed_rows = rows
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            hailo_logger.error(f"Vector index {action} on '{self.vector_column}' failed: {e}")
+            return None
+        finally:
+            self.last_maintenance_time = time.time()
+            self.last_maintenance_duration = time.monotonic() - start
+        hailo_logger.info(
+            f"Vector index {action} on '{self.vector_column}': {self.index_type}, {rows} rows, "
+            f"{self.last_maintenance_duration:.2f} s"
+        )
+        return action
+
+    def _schedule(self):
+        if not self.background or self.pending_action() is None:
+            return
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="vector-index", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            if self._running:
+                self.maintain()
+
+    def _find_index(self):
+        try:
+            indices = self.table.list_indices()
+        except Exception:
+            return None
+        return next((index for index in indices if self.vector_column in index.columns), None)
+
+    def get_stats(self) -> dict:
+        """Returns the index type, the rows of the table and how many of them the index covers."""
+        stats = {
+            "rows": self._row_count,
+            "index_type": self.index_type,
+            "indexed_rows": self.indexed_rows,
+            "unindexed_rows": max(0, self._row_count - self.indexed_rows) if self.index_type else self._row_count,
+            "builds": self.builds,
+            "updates": self.updates,
+            "pending": self.pending_action(),
+        }
+        if self.last_maintenance_time is not None:
+            stats["seconds_since_maintenance"] = round(time.time() - self.last_maintenance_time, 1)
+            stats["last_maintenance_s"] = round(self.last_maintenance_duration, 3)
+        if self.last_error:
+            stats["last_error"] = self.last_error
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stops the maintenance thread (a running build is completed first)."""
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
@@ -0,0 +1,337 @@
+# region imports
+# Standard library imports
+import datetime
+import threading
+import time
+
+# Third-party imports
+import numpy as np
+import pyarrow as pa
+
+# Local application-specific imports
+from .hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Seconds between two flushes of the write-behind queue
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0
+# A flush is started before the interval elapses once this many writes are pending
+WRITE_BEHIND_MAX_PENDING = 256
+# Seconds between two compactions of the tables
+COMPACTION_INTERVAL = 3600.0
+# Table versions younger than this (seconds) are kept by a compaction, for concurrent readers
+COMPACTION_VERSION_RETENTION = 600.0
+
+
+def _to_storable(value):
+    """Returns a value as LanceDB accepts it in a row (arrays as float32 lists)."""
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float32).tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class WriteBehindQueue:
+    """Coalesces the writes of a records table and its samples table, and commits them in batches.
+
+    Every LanceDB add() / update() is a commit creating a new table version (and a data file), so
+    writing from a streaming callback, one row at a time, fragments the tables. The queue keeps the
+    new records, the field updates of records and the new samples in memory, and writes them with
+    one add() per table and one merge_insert() per set of updated fields:
+
+    - Updates of a record are merged (the last value of a field wins); the updates of a record
+      that is not written yet are merged into its row.
+    - flush() runs every flush_interval seconds in a background thread, when more than max_pending
+      writes are queued, and when called (e.g. before reading the tables).
+    - A failed flush is logged and its writes are queued again.
+
+    Until they are flushed, the queued values are only visible through pending_record().
+
+    Args:
+        records_table (lancedb.Table): The records table.
+        samples_table (lancedb.Table): The samples table.
+        key (str): The unique key column of the records table. Defaults to 'global_id'.
+        flush_interval (float): Seconds between two background flushes. If None, no thread is
+            started; call flush() yourself. Defaults to WRITE_BEHIND_FLUSH_INTERVAL.
+        max_pending (int): Pending writes that trigger an early flush. Defaults to
+            WRITE_BEHIND_MAX_PENDING.
+    """
+
+    def __init__(
+        self,
+        records_table,
+        samples_table,
+        key="global_id",
+        flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+        max_pending=WRITE_BEHIND_MAX_PENDING,
+    ):
+        self.records_table = records_table
+        self.samples_table = samples_table
+        self.key = key
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()  # guards the queued writes
+        self.flush_lock = threading.RLock()  # held while writing, one flush at a time
+        self._new_records = {}  # key -> full row
+        self._updates = {}  # key -> {field: value}
+        self._new_samples = []
+        # The batch being written, still visible through pending_record()
+        self._flushing_records = {}
+        self._flushing_updates = {}
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_time = None
+        self.last_flush_duration = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._running = flush_interval is not None
+        self._thread = None
+        if self._running:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def add_record(self, row):
+        with self._lock:
+            self._new_records[row[self.key]] = {field: _to_storable(value) for field, value in row.items()}
+        self._wake_if_full()
+
+    def update_record(self, key_value, values):
+        values = {field: _to_storable(value) for field, value in values.items()}
+        with self._lock:
+            if key_value in self._new_records:
+                self._new_records[key_value].update(values)
+            else:
+                self._updates.setdefault(key_value, {}).update(values)
+        self._wake_if_full()
+
+    def add_sample(self, row):
+        with self._lock:
+            self._new_samples.append({field: _to_storable(value) for field, value in row.items()})
+        self._wake_if_full()
+
+    def pending_record(self, key_value):
+        """Returns the queued values of a record, or None.
+
+        Returns:
+            dict: The full row of a record that is not written yet, or the fields of a written
+                record that are not updated yet. None if nothing is queued for the record.
+        """
+        with self._lock:
+            values = None
+            for records, updates in (
+                (self._flushing_records, self._flushing_updates),
+                (self._new_records, self._updates),
+            ):
+                if key_value in records:
+                    values = dict(records[key_value])
+                elif key_value in updates:
+                    values = {**(values or {}), **updates[key_value]}
+            return values
+
+    @property
+    def pending(self):
+        """The number of queued writes (new records, updated records and new samples)."""
+        with self._lock:
+            return len(self._new_records) + len(self._updates) + len(self._new_samples)
+
+    def flush(self):
+        """Writes the queued writes to the tables, in the calling thread.
+
+        Returns:
+            int: The number of written rows.
+        """
+        with self.flush_lock:
+            with self._lock:
+                new_records, self._new_records = self._new_records, {}
+                updates, self._updates = self._updates, {}
+                new_samples, self._new_samples = self._new_samples, []
+                self._flushing_records, self._flushing_updates = new_records, updates
+            if not (new_records or updates or new_samples):
+                return 0
+            start = time.monotonic()
+            written = 0
+            try:
+                if new_records:
+                    self.records_table.add(list(new_records.values()))
+                    written += len(new_records)
+                    new_records = {}
+                if new_samples:
+                    self.samples_table.add(new_samples)
+                    written += len(new_samples)
+                    new_samples = []
+                for fields, rows in self._group_updates(updates):
+                    self._merge_update(fields, rows)
+                    written += len(rows)
+                    for row in rows:
+                        del updates[row[self.key]]
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                requeued = len(new_records) + len(updates) + len(new_samples)
+                hailo_logger.error(f"Write-behind flush failed, {requeued} writes queued again: {e}")
+                self._requeue(new_records, updates, new_samples)
+            finally:
+                with self._lock:
+                    self._flushing_records, self._flushing_updates = {}, {}
+                self.rows_written += written
+                self.flushes += 1
+                self.last_flush_time = time.time()
+                self.last_flush_duration = time.monotonic() - start
+            return written
+
+    def _group_updates(self, updates):
+        """Groups the updated rows by their set of fields, one merge_insert per group."""
+        groups = {}
+        for key_value, values in updates.items():
+            groups.setdefault(tuple(sorted(values)), []).append({self.key: key_value, **values})
+        return groups.items()
+
+    def _merge_update(self, fields, rows):
+        schema = self.records_table.schema
+        table = pa.Table.from_pylist(rows, schema=pa.schema([schema.field(self.key)] + [schema.field(f) for f in fields]))
+        self.records_table.merge_insert(self.key).when_matched_update_all().execute(table)
+
+    def _requeue(self, new_records, updates, new_samples):
+        """Puts back the writes of a failed flush, before the writes queued since."""
+        with self._lock:
+            for key_value, values in self._updates.items():
+                if key_value in new_records:
+                    new_records[key_value].update(values)
+                else:
+                    updates.setdefault(key_value, {}).update(values)
+            new_records.update(self._new_records)
+            self._new_records, self._updates = new_records, updates
+            self._new_samples = new_samples + self._new_samples
+
+    def _wake_if_full(self):
+        if self._thread is not None and self.pending >= self.max_pending:
+            self._wake.set()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def get_stats(self) -> dict:
+        """Returns the queued writes and the flush counters."""
+        with self._lock:
+            stats = {
+                "pending_records": len(self._new_records),
+                "pending_updates": len(self._updates),
+                "pending_samples": len(self._new_samples),
+            }
+        stats.update({"flushes": self.flushes, "rows_written": self.rows_written})
+        if self.last_flush_time is not None:
+            stats["seconds_since_flush"] = round(time.time() - self.last_flush_time, 1)
+            stats["last_flush_s"] = round(self.last_flush_duration, 3)
+        if self.last_error:
+            stats["last_error"] = self.last_error
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stops the flush thread and writes the queued writes."""
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+
+class TableCompactor:
+    """Compacts LanceDB tables and removes their old versions, periodically from a background thread.
+
+    Each commit adds a version (a manifest and, for writes, small data files) to a table; without
+    compaction, reads slow down as the files accumulate. Every interval seconds, each table whose
+    version changed since its last compaction is optimized: small files are merged, the indices
+    cover the new rows, and the versions older than version_retention seconds are deleted.
+
+    Args:
+        tables (list): The lancedb.Table objects to compact.
+        interval (float): Seconds between two compactions. If None, no thread is started; call
+            compact() yourself. Defaults to COMPACTION_INTERVAL.
+        version_retention (float): Age (seconds) of the oldest version kept. Defaults to
+            COMPACTION_VERSION_RETENTION.
+        lock (threading.Lock): Held during a compaction, e.g. to not compact during a
+            WriteBehindQueue flush. Defaults to None.
+    """
+
+    def __init__(self, tables, interval=COMPACTION_INTERVAL, version_retention=COMPACTION_VERSION_RETENTION, lock=None):
+        self.tables = list(tables)
+        self.interval = interval
+        self.version_retention = version_retention
+        self.lock = lock or threading.Lock()
+        self.compacted_versions = {}  # table name -> version after its last compaction
+        self.compactions = 0
+        self.last_compaction_time = None
+        self.last_compaction_duration = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._running = interval is not None
+        self._thread = None
+        if self._running:
+            self._thread = threading.Thread(target=self._run, name="table-compactor", daemon=True)
+            self._thread.start()
+
+    def compact(self, force=False):
+        """Compacts the tables written since their last compaction (all of them if force), in the
+        calling thread.
+
+        Returns:
+            int: The number of compacted tables.
+        """
+        compacted = 0
+        start = time.monotonic()
+        with self.lock:
+            for table in self.tables:
+                try:
+                    if not force and self.compacted_versions.get(table.name) == table.version:
+                        continue
+                    table.optimize(cleanup_older_than=datetime.timedelta(seconds=self.version_retention))
+                    self.compacted_versions[table.name] = table.version
+                    compacted += 1
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    hailo_logger.error(f"Compaction of table '{table.name}' failed: {e}")
+        if compacted:
+            self.compactions += 1
+            self.last_compaction_time = time.time()
+            self.last_compaction_duration = time.monotonic() - start
+            hailo_logger.info(f"Compacted {compacted} tables in {self.last_compaction_duration:.2f} s")
+        return compacted
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._running:
+                self.compact()
+
+    def get_stats(self) -> dict:
+        """Returns, per table, its version, the versions kept and the data fragments, and the compaction counters."""
+        stats = {"compactions": self.compactions, "tables": {}}
+        for table in self.tables:
+            try:
+                table_stats = {"version": table.version, "versions": len(table.list_versions())}
+                table_stats["fragments"] = table.stats()["fragment_stats"]["num_fragments"]
+            except Exception as e:
+                table_stats = {"error": str(e)}
+            stats["tables"][table.name] = table_stats
+        if self.last_compaction_time is not None:
+            stats["seconds_since_compaction"] = round(time.time() - self.last_compaction_time, 1)
+            stats["last_compaction_s"] = round(self.last_compaction_duration, 3)
+        if self.last_error:
+            stats["last_error"] = self.last_error
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stops the compaction thread (a running compaction is completed first)."""
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
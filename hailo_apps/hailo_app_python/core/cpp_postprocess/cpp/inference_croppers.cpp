@@ -0,0 +1,79 @@
+/**
+* Copyright (c) 2021-2022 Hailo Technologies Ltd. All rights reserved.
+* Distributed under the LGPL license (https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt)
+**/
+#include <vector>
+#include "inference_croppers.hpp"
+
+// Classification type used by the Python gating stages to mark a frame (see inference_gating.py)
+#define INFERENCE_GATE_CLASSIFICATION_TYPE "inference_gate"
+#define INFERENCE_GATE_SKIP_LABEL "skip"
+// Label of the region detections added by the Python region stage (see inference_regions.py)
+#define INFERENCE_REGION_LABEL "inference_region"
+
+/**
+* @brief Returns a boolean indicating if an upstream gating stage asked to skip inference on this frame.
+*
+* @param roi The main ROI of the frame.
+* @return boolean indicating if the frame is marked to be skipped.
+*/
+bool is_inference_skipped(HailoROIPtr roi)
+{
+    for (auto obj : roi->get_objects_typed(HAILO_CLASSIFICATION))
+    {
+        HailoClassificationPtr classification = std::dynamic_pointer_cast<HailoClassification>(obj);
+        if (classification->get_classification_type() == INFERENCE_GATE_CLASSIFICATION_TYPE &&
+            classification->get_label() == INFERENCE_GATE_SKIP_LABEL)
+        {
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * @brief Returns the whole frame as a single crop, like libwhole_buffer's create_crops,
+ *        unless the frame was marked to be skipped. Skipped frames return no crops, so
+ *        hailocropper sends them only through the bypass branch and hailonet is not invoked.
+ *
+ * @param image The original picture (cv::Mat).
+ * @param roi The main ROI of this picture.
+ * @return std::vector<HailoROIPtr> vector of ROI's to crop and resize.
+ */
+std::vector<HailoROIPtr> gated_whole_buffer(std::shared_ptr<HailoMat> image, HailoROIPtr roi)
+{
+    std::vector<HailoROIPtr> crop_rois;
+    if (!is_inference_skipped(roi))
+    {
+        crop_rois.emplace_back(roi);
+    }
+    return crop_rois;
+}
+
+/**
+ * @brief Returns the configured regions of interest as crops. The regions are detections with the
+ *        INFERENCE_REGION_LABEL label, added to the frame by the Python region stage. The inference
+ *        results are attached to these detections and flattened back to frame coordinates after
+ *        hailoaggregator. Frames marked to be skipped by an inference gate return no crops.
+ *
+ * @param image The original picture (cv::Mat).
+ * @param roi The main ROI of this picture.
+ * @return std::vector<HailoROIPtr> vector of ROI's to crop and resize.
+ */
+std::vector<HailoROIPtr> region_crops(std::shared_ptr<HailoMat> image, HailoROIPtr roi)
+{
+    std::vector<HailoROIPtr> crop_rois;
+    if (is_inference_skipped(roi))
+    {
+        return crop_rois;
+    }
+    for (auto obj : roi->get_objects_typed(HAILO_DETECTION))
+    {
+        HailoDetectionPtr detection = std::dynamic_pointer_cast<HailoDetection>(obj);
+        if (detection->get_label() == INFERENCE_REGION_LABEL)
+        {
+            crop_rois.emplace_back(detection);
+        }
+    }
+    return crop_rois;
+}
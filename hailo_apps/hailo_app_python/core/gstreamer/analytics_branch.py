@@ -0,0 +1,146 @@
+# region imports
+# Standard library imports
+import threading
+import time
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+from hailo_apps.hailo_app_python.core.common.metadata_utils import roi_to_dict
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+ANALYTICS_STATS_LOG_INTERVAL = 300  # processed frames
+
+
+class AnalyticsConsumer:
+    """Runs a Python analytics function on the frames of an analytics branch, in its own thread.
+
+    The appsink of ANALYTICS_BRANCH_PIPELINE is connected to GStreamerApp.appsink_callback, which
+    hands each sample to submit(). Only the newest frame is kept: a frame that arrives while the
+    previous one is still waiting replaces it (and is counted as dropped), so the analytics always
+    work on the most recent frame at whatever rate the function sustains.
+
+    Args:
+        callback: Function called as callback(frame, metadata) with an RGB numpy frame and the
+            frame's detections (see metadata_utils.roi_to_dict), plus 'pts' when known.
+        element_name (str): The appsink name. Defaults to 'analytics_sink'.
+        max_fps (float): Maximum frame rate of the branch (videorate). Defaults to None (no limit).
+        frame_size (tuple): (width, height) of the analytics frames. Defaults to None (stream size).
+    """
+
+    def __init__(self, callback, element_name="analytics_sink", max_fps=None, frame_size=None):
+        self.callback = callback
+        self.element_name = element_name
+        self.max_fps = max_fps
+        self.frame_size = frame_size
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.processing_time = 0.0
+        self._pending = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def attach(self, pipeline, appsink_callback) -> bool:
+        """Connects the appsink to appsink_callback and starts the consumer thread.
+        Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if the appsink was found.
+        """
+        appsink = pipeline.get_by_name(self.element_name)
+        if appsink is None:
+            hailo_logger.warning(f"'{self.element_name}' not found; analytics branch disabled")
+            return False
+        appsink.connect("new-sample", appsink_callback)
+        self.start()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="analytics", daemon=True)
+            self._thread.start()
+
+    def submit_buffer(self, buffer, frame):
+        """Queues a frame with the metadata of its buffer. Called from the appsink streaming thread."""
+        metadata = roi_to_dict(hailo.get_roi_from_buffer(buffer))
+        if buffer.pts != Gst.CLOCK_TIME_NONE:
+            metadata["pts"] = buffer.pts
+        self.submit(frame, metadata)
+
+    def submit(self, frame, metadata):
+        """Queues a frame for the analytics thread, replacing the frame still waiting, if any."""
+        with self._condition:
+            self.frames_received += 1
+            if self._pending is not None:
+                self.frames_dropped += 1
+            self._pending = (frame, metadata)
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and self._running:
+                    self._condition.wait()
+                if self._pending is None:
+                    break
+                frame, metadata = self._pending
+                self._pending = None
+            start = time.perf_counter()
+            try:
+                self.callback(frame, metadata)
+            except Exception as e:
+                hailo_logger.error(f"Analytics callback failed: {e}")
+            self.processing_time += time.perf_counter() - start
+            self.frames_processed += 1
+            if self.frames_processed % ANALYTICS_STATS_LOG_INTERVAL == 0:
+                hailo_logger.debug(f"Analytics stats: {self.get_stats()}")
+
+    def stop(self, timeout=2.0):
+        """Processes the frame still waiting, if any, and stops the thread."""
+        if self._thread is not None:
+            with self._condition:
+                self._running = False
+                self._condition.notify()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def get_stats(self) -> dict:
+        stats = {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+        }
+        if self.frames_processed:
+            stats["mean_ms"] = round(1000 * self.processing_time / self.frames_processed, 2)
+        return stats
+
+
+def create_analytics_consumer(options_menu, user_data):
+    """Creates an AnalyticsConsumer when the user data defines analytics_callback(frame, metadata).
+
+    Returns:
+        AnalyticsConsumer or None: None when there is no analytics callback.
+    """
+    callback = getattr(user_data, "analytics_callback", None)
+    if callback is None:
+        return None
+    hailo_logger.info("Running analytics_callback on a decoupled analytics branch")
+    return AnalyticsConsumer(
+        callback,
+        max_fps=getattr(options_menu, "analytics_fps", None),
+        frame_size=getattr(options_menu, "analytics_size", None),
+    )
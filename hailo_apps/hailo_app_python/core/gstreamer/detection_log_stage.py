@@ -0,0 +1,97 @@
+# region imports
+# Standard library imports
+import time
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+class DetectionLogStage:
+    """Logs every detection of the pipeline to a partitioned Parquet dataset.
+
+    A probe on an element's src pad appends the detections of each frame to a DetectionLogWriter
+    (core/common/detection_log.py), which writes them from a background thread.
+
+    Args:
+        writer (DetectionLogWriter): The detection log writer.
+        element_name (str): Element whose src pad is probed. Defaults to 'identity_callback'.
+    """
+
+    def __init__(self, writer, element_name="identity_callback"):
+        self.writer = writer
+        self.element_name = element_name
+        self.frame_index = 0
+
+    def attach(self, pipeline) -> bool:
+        """Adds the logging probe to the pipeline. Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if the probe was attached.
+        """
+        element = pipeline.get_by_name(self.element_name)
+        if element is None:
+            hailo_logger.warning(f"'{self.element_name}' not found; detection log disabled")
+            return False
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._log_probe)
+        return True
+
+    def _log_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        self.frame_index += 1
+        roi = hailo.get_roi_from_buffer(buffer)
+        pts = None if buffer.pts == Gst.CLOCK_TIME_NONE else buffer.pts
+        stream_id = roi.get_stream_id()
+        timestamp = time.time()
+        append = self.writer.append
+        for detection in roi.get_objects_typed(hailo.HAILO_DETECTION):
+            bbox = detection.get_bbox()
+            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
+            append(
+                detection.get_label(),
+                detection.get_confidence(),
+                bbox.xmin(),
+                bbox.ymin(),
+                bbox.width(),
+                bbox.height(),
+                track[0].get_id() if track else None,
+                self.frame_index,
+                pts,
+                stream_id,
+                timestamp,
+            )
+        self.writer.maybe_flush()
+        return Gst.PadProbeReturn.OK
+
+    def get_stats(self) -> dict:
+        return self.writer.get_stats()
+
+    def close(self):
+        self.writer.close()
+
+
+def create_detection_log_stage(options_menu):
+    """Creates a DetectionLogStage from the parsed CLI options (--detection-log).
+
+    Returns:
+        DetectionLogStage or None: None when the detection log is disabled.
+    """
+    log_dir = getattr(options_menu, "detection_log", None)
+    if not log_dir:
+        return None
+    # pyarrow is only loaded when the detection log is used
+    from hailo_apps.hailo_app_python.core.common.detection_log import DetectionLogWriter
+
+    hailo_logger.info(f"Logging detections to Parquet dataset '{log_dir}'")
+    return DetectionLogStage(DetectionLogWriter(log_dir))
@@ -50,9 +50,13 @@ from hailo_apps.hailo_app_python.core.common.installation_utils import detect_ha
 # Absolute imports for your common utilities
 from hailo_apps.hailo_app_python.core.common.defines import (
     BASIC_PIPELINES_VIDEO_EXAMPLE_NAME,
+    DEFAULT_PIPELINE_LATENCY_MS,
     GST_VIDEO_SINK,
     HAILO_ARCH_KEY,
+    HAILO_NV12_VIDEO_FORMAT,
     HAILO_RGB_VIDEO_FORMAT,
+    LIVE_SOURCE_TYPES,
+    LOW_LATENCY_PIPELINE_LATENCY_MS,
     RESOURCES_ROOT_PATH_DEFAULT,
     RESOURCES_VIDEOS_DIR_NAME,
     RPI_NAME_I,
@@ -64,8 +68,24 @@ from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
 # hailo_app_python/core/gstreamer/gstreamer_app.py
 # Absolute import for your local helper
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    FILE_SINK_PIPELINE,
     get_source_type,
 )
+from hailo_apps.hailo_app_python.core.gstreamer.analytics_branch import create_analytics_consumer
+from hailo_apps.hailo_app_python.core.gstreamer.detection_log_stage import create_detection_log_stage
+from hailo_apps.hailo_app_python.core.gstreamer.inference_gating import create_inference_gate
+from hailo_apps.hailo_app_python.core.gstreamer.inference_regions import create_inference_regions
+from hailo_apps.hailo_app_python.core.gstreamer.low_latency import (
+    DeadlineDropStage,
+    LatencyMonitor,
+    apply_low_latency_profile,
+)
+from hailo_apps.hailo_app_python.core.gstreamer.metadata_export_stage import (
+    create_metadata_export_stage,
+)
+from hailo_apps.hailo_app_python.core.gstreamer.pipeline_optimizer import coalesce_queues
+from hailo_apps.hailo_app_python.core.gstreamer.probe_dispatcher import ProbeDispatcher
+from hailo_apps.hailo_app_python.core.gstreamer.shm_publisher import create_shm_publisher
 
 hailo_logger = get_logger(__name__)
 
@@ -78,10 +98,15 @@ except ImportError:
 # User-defined class to be used in the callback function
 # -----------------------------------------------------------------------------------------------
 class app_callback_class:
+    # Override with a method analytics_callback(self, frame, metadata) to run heavy analytics on a
+    # decoupled, rate-limited branch (see ANALYTICS_BRANCH_PIPELINE) instead of in the pad probe
+    analytics_callback = None
+
     def __init__(self):
         hailo_logger.debug("Initializing app_callback_class")
         self.frame_count = 0
         self.use_frame = False
+        self.draw_in_place = False
         self.frame_queue = multiprocessing.Queue(maxsize=3)
         self.running = True
 
@@ -188,16 +213,48 @@ class GStreamerApp:
         self.loop = None
         self.threads = []
         self.error_occurred = False
-        self.pipeline_latency = 300
+        self.pipeline_latency = DEFAULT_PIPELINE_LATENCY_MS
+        # --low-latency: drop frames instead of queueing them when processing slows (live sources)
+        self.low_latency = getattr(self.options_menu, "low_latency", False)
+        if self.low_latency:
+            if self.source_type in LIVE_SOURCE_TYPES:
+                self.pipeline_latency = LOW_LATENCY_PIPELINE_LATENCY_MS
+            else:
+                hailo_logger.warning("--low-latency only applies to live sources; ignored")
+                self.low_latency = False
+        # --measure-latency: draw the running time on the display and log capture-to-display latency
+        self.latency_overlay = getattr(self.options_menu, "measure_latency", False)
+        self.latency_monitor = LatencyMonitor() if self.latency_overlay else None
+        # --preview-size / --preview-fps: downscaled, rate-limited display branch;
+        # --record: full-resolution recording without overlay. Apps pass these to DISPLAY_PIPELINE
+        self.preview_size = getattr(self.options_menu, "preview_size", None)
+        self.preview_fps = getattr(self.options_menu, "preview_fps", None)
+        record_file = getattr(self.options_menu, "record", None)
+        self.full_res_pipeline = (
+            FILE_SINK_PIPELINE(output_file=record_file, name="record") if record_file else None
+        )
+        # --frame-deadline-ms: drop frames that waited too long before reaching inference
+        frame_deadline_ms = getattr(self.options_menu, "frame_deadline_ms", None)
+        self.deadline_drop = DeadlineDropStage(frame_deadline_ms) if frame_deadline_ms else None
+
+        # --coalesce-queues: merge directly linked queues of the composed pipeline string
+        self.coalesce_queues = getattr(self.options_menu, "coalesce_queues", False)
 
         self.batch_size = 1
         self.video_width = 1280
         self.video_height = 720
         self.video_format = HAILO_RGB_VIDEO_FORMAT
+        # --nv12: keep frames in NV12 up to the display, only the model input is converted
+        if getattr(self.options_menu, "nv12", False):
+            if self.source_type == RPI_NAME_I:
+                hailo_logger.warning("--nv12 is not supported with the RPi camera (RGB frames); ignored")
+            else:
+                self.video_format = HAILO_NV12_VIDEO_FORMAT
         self.hef_path = None
         self.app_callback = None
 
         user_data.use_frame = self.options_menu.use_frame
+        user_data.draw_in_place = getattr(self.options_menu, "draw_in_place", False)
 
         self.sync = (
             "true" if (self.source_type == "file" and not self.options_menu.disable_sync) else "false"
@@ -210,6 +267,27 @@ class GStreamerApp:
 
         self.webrtc_frames_queue = None
 
+        # Python pad-probe handlers (app_callback and app-internal handlers) all run from a single
+        # probe on identity_callback; apps register theirs with self.probe_dispatcher.register()
+        self.probe_dispatcher = ProbeDispatcher()
+
+        # Inference decimation (--inference-stride / --inference-fps); apps that support it build
+        # their INFERENCE_PIPELINE_WRAPPER with gated=self.inference_gate is not None
+        self.inference_gate = create_inference_gate(self.options_menu)
+        # Region-of-interest inference (--roi); apps that support it build their
+        # INFERENCE_PIPELINE_WRAPPER with crop_regions=self.inference_regions is not None
+        self.inference_regions = create_inference_regions(self.options_menu)
+        # Shared-memory output of frames and detections for other local processes (--shm-output)
+        self.shm_publisher = create_shm_publisher(self.options_menu)
+        # Streaming export of detections (--metadata-export); uses the METADATA_EXPORT_PIPELINE
+        # element when the app adds one, identity_callback otherwise
+        self.metadata_export = create_metadata_export_stage(self.options_menu)
+        # Columnar detection log for offline analytics (--detection-log)
+        self.detection_log = create_detection_log_stage(self.options_menu)
+        # Decoupled analytics branch (user_data.analytics_callback); apps that support it append
+        # ANALYTICS_BRANCH_PIPELINE after their user callback when self.analytics is not None
+        self.analytics = create_analytics_consumer(self.options_menu, user_data)
+
     def appsink_callback(self, appsink):
         hailo_logger.debug("appsink_callback triggered")
         sample = appsink.emit("pull-sample")
@@ -219,6 +297,9 @@ class GStreamerApp:
                 format, width, height = get_caps_from_pad(appsink.get_static_pad("sink"))
                 hailo_logger.debug(f"Buffer received: format={format}, size={width}x{height}")
                 frame = get_numpy_from_buffer(buffer, format, width, height)
+                if self.analytics is not None and appsink.get_name() == self.analytics.element_name:
+                    self.analytics.submit_buffer(buffer, frame)
+                    return Gst.FlowReturn.OK
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 try:
                     self.webrtc_frames_queue.put(frame)
@@ -235,7 +316,7 @@ class GStreamerApp:
     def create_pipeline(self):
         hailo_logger.debug("Creating pipeline...")
         Gst.init(None)
-        pipeline_string = self.get_pipeline_string()
+        pipeline_string = self._build_pipeline_string()
         hailo_logger.debug(f"Pipeline string: {pipeline_string}")
         try:
             self.pipeline = Gst.parse_launch(pipeline_string)
@@ -252,6 +333,17 @@ class GStreamerApp:
 
         self.loop = GLib.MainLoop()
 
+    def _build_pipeline_string(self):
+        """Returns the app's pipeline string, with the optimization passes enabled on the command line."""
+        pipeline_string = self.get_pipeline_string()
+        if self.coalesce_queues:
+            pipeline_string, report = coalesce_queues(pipeline_string)
+            hailo_logger.info(
+                f"Coalesced {report['queues_removed']} queues {report['removed']}: streaming threads "
+                f"{report['threads_before']} -> {report['threads_after']}"
+            )
+        return pipeline_string
+
     def bus_call(self, bus, message, loop):
         t = message.type
         hailo_logger.debug(f"Bus message received: {t}")
@@ -288,6 +380,29 @@ class GStreamerApp:
             hailo_logger.debug("Non-file source detected; shutting down")
             self.shutdown()
 
+    def _attach_pipeline_stages(self):
+        """Attaches the optional stages (probes, profile) to the current pipeline, on start and
+        after each rebuild."""
+        # Regions first: the gate's carry-forward must see the flattened detections
+        if self.inference_regions is not None:
+            self.inference_regions.attach(self.pipeline)
+        if self.inference_gate is not None:
+            self.inference_gate.attach(self.pipeline)
+        if self.shm_publisher is not None:
+            self.shm_publisher.attach(self.pipeline)
+        if self.metadata_export is not None:
+            self.metadata_export.attach(self.pipeline)
+        if self.detection_log is not None:
+            self.detection_log.attach(self.pipeline)
+        if self.analytics is not None:
+            self.analytics.attach(self.pipeline, self.appsink_callback)
+        if self.low_latency:
+            apply_low_latency_profile(self.pipeline)
+        if self.latency_monitor is not None:
+            self.latency_monitor.attach(self.pipeline)
+        if self.deadline_drop is not None:
+            self.deadline_drop.attach(self.pipeline)
+
     def _rebuild_pipeline(self):
         """
         Completely rebuild the pipeline from scratch for clean looping.
@@ -321,7 +436,7 @@ class GStreamerApp:
 
             # Step 2: Rebuild the pipeline from scratch
             hailo_logger.debug("Creating new pipeline")
-            pipeline_string = self.get_pipeline_string()
+            pipeline_string = self._build_pipeline_string()
             hailo_logger.debug(f"New pipeline string: {pipeline_string}")
 
             self.pipeline = Gst.parse_launch(pipeline_string)
@@ -333,13 +448,10 @@ class GStreamerApp:
             bus.connect("message", self.bus_call, self.loop)
 
             # Step 4: Reattach pad probe if needed
-            if not self.options_menu.disable_callback:
-                identity = self.pipeline.get_by_name("identity_callback")
-                if identity:
-                    hailo_logger.debug("Reattaching pad probe to identity_callback")
-                    identity.get_static_pad("src").add_probe(
-                        Gst.PadProbeType.BUFFER, self.app_callback, self.user_data
-                    )
+            if len(self.probe_dispatcher):
+                hailo_logger.debug("Reattaching pad probe to identity_callback")
+                self.probe_dispatcher.attach(self.pipeline)
+            self._attach_pipeline_stages()
 
             # Step 5: Start the new pipeline
             hailo_logger.debug("Starting new pipeline")
@@ -421,15 +533,16 @@ class GStreamerApp:
         bus.connect("message", self.bus_call, self.loop)
 
         if not self.options_menu.disable_callback:
-            identity = self.pipeline.get_by_name("identity_callback")
-            if identity is None:
+            self.probe_dispatcher.register("app_callback", self.app_callback, self.user_data)
+        if len(self.probe_dispatcher):
+            if self.pipeline.get_by_name("identity_callback") is None:
                 hailo_logger.warning("identity_callback not found in pipeline")
                 print("Warning: identity_callback element not found...")
             else:
                 hailo_logger.debug("Adding pad probe to identity_callback")
-                identity.get_static_pad("src").add_probe(
-                    Gst.PadProbeType.BUFFER, self.app_callback, self.user_data
-                )
+                self.probe_dispatcher.attach(self.pipeline)
+
+        self._attach_pipeline_stages()
 
         hailo_display = self.pipeline.get_by_name("hailo_display")
         if hailo_display is None and not getattr(self.options_menu, "ui", False):
@@ -466,7 +579,27 @@ class GStreamerApp:
         try:
             hailo_logger.debug("Cleaning up after loop exit")
             self.user_data.running = False
+            if len(self.probe_dispatcher):
+                hailo_logger.info(f"Probe handler stats: {self.probe_dispatcher.get_stats()}")
+            if self.inference_gate is not None:
+                hailo_logger.info(f"Inference gate stats: {self.inference_gate.get_stats()}")
+            if self.latency_monitor is not None:
+                hailo_logger.info(f"Capture-to-display latency: {self.latency_monitor.get_stats()}")
+            if self.deadline_drop is not None:
+                hailo_logger.info(f"Frame deadline stats: {self.deadline_drop.get_stats()}")
             self.pipeline.set_state(Gst.State.NULL)
+            if self.shm_publisher is not None:
+                hailo_logger.info(f"Shared memory output stats: {self.shm_publisher.get_stats()}")
+                self.shm_publisher.close()
+            if self.metadata_export is not None:
+                self.metadata_export.close()
+                hailo_logger.info(f"Metadata export stats: {self.metadata_export.get_stats()}")
+            if self.detection_log is not None:
+                self.detection_log.close()
+                hailo_logger.info(f"Detection log stats: {self.detection_log.get_stats()}")
+            if self.analytics is not None:
+                self.analytics.close()
+                hailo_logger.info(f"Analytics stats: {self.analytics.get_stats()}")
             if self.options_menu.use_frame:
                 display_process.terminate()
                 display_process.join()
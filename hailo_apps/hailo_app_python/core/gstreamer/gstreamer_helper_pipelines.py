@@ -1,7 +1,12 @@
 import os
 
 from hailo_apps.hailo_app_python.core.common.defines import (
+    GATED_WHOLE_BUFFER_CROPPER_FUNCTION,
     GST_VIDEO_SINK,
+    INFERENCE_CROPPERS_POSTPROCESS_SO_FILENAME,
+    INFERENCE_REGIONS_CROPPER_FUNCTION,
+    RESOURCES_ROOT_PATH_DEFAULT,
+    RESOURCES_SO_DIR_NAME,
     TAPPAS_POSTPROC_PATH_DEFAULT,
     TAPPAS_POSTPROC_PATH_KEY,
 )
@@ -235,7 +240,11 @@ def INFERENCE_PIPELINE(
 
 
 def INFERENCE_PIPELINE_WRAPPER(
-    inner_pipeline, bypass_max_size_buffers=20, name="inference_wrapper"
+    inner_pipeline,
+    bypass_max_size_buffers=20,
+    name="inference_wrapper",
+    gated=False,
+    crop_regions=False,
 ):
     """Creates a GStreamer pipeline string that wraps an inner pipeline with a hailocropper and hailoaggregator.
     This allows to keep the original video resolution and color-space (format) of the input frame.
@@ -245,20 +254,36 @@ def INFERENCE_PIPELINE_WRAPPER(
         inner_pipeline (str): The inner pipeline string to be wrapped.
         bypass_max_size_buffers (int, optional): The maximum number of buffers for the bypass queue. Defaults to 20.
         name (str, optional): The prefix name for the pipeline elements. Defaults to 'inference_wrapper'.
+        gated (bool, optional): If True, use the gated whole-buffer cropper. Frames marked by an
+            inference gate (see inference_gating.py) then bypass the inner pipeline. Defaults to False.
+        crop_regions (bool, optional): If True, only the regions of interest added by an
+            InferenceRegionsController (see inference_regions.py) are cropped and sent to the inner
+            pipeline instead of the whole frame. Also honors inference gates. Defaults to False.
 
     Returns:
         str: A string representing the GStreamer pipeline for the inference wrapper.
     """
-    # Get the directory for post-processing shared objects
-    tappas_post_process_dir = os.environ.get(TAPPAS_POSTPROC_PATH_KEY, TAPPAS_POSTPROC_PATH_DEFAULT)
-    whole_buffer_crop_so = os.path.join(
-        tappas_post_process_dir, "cropping_algorithms/libwhole_buffer.so"
-    )
+    if gated or crop_regions:
+        crop_so = os.path.join(
+            RESOURCES_ROOT_PATH_DEFAULT,
+            RESOURCES_SO_DIR_NAME,
+            INFERENCE_CROPPERS_POSTPROCESS_SO_FILENAME,
+        )
+        crop_function_name = (
+            INFERENCE_REGIONS_CROPPER_FUNCTION if crop_regions else GATED_WHOLE_BUFFER_CROPPER_FUNCTION
+        )
+    else:
+        # Get the directory for post-processing shared objects
+        tappas_post_process_dir = os.environ.get(
+            TAPPAS_POSTPROC_PATH_KEY, TAPPAS_POSTPROC_PATH_DEFAULT
+        )
+        crop_so = os.path.join(tappas_post_process_dir, "cropping_algorithms/libwhole_buffer.so")
+        crop_function_name = "create_crops"
 
     # Construct the inference wrapper pipeline string
     inference_wrapper_pipeline = (
         f"{QUEUE(name=f'{name}_input_q')} ! "
-        f"hailocropper name={name}_crop so-path={whole_buffer_crop_so} function-name=create_crops use-letterbox=true resize-method=inter-area internal-offset=true "
+        f"hailocropper name={name}_crop so-path={crop_so} function-name={crop_function_name} use-letterbox=true resize-method=inter-area internal-offset=true "
         f"hailoaggregator name={name}_agg "
         f"{name}_crop. ! {QUEUE(max_size_buffers=bypass_max_size_buffers, name=f'{name}_bypass_q')} ! {name}_agg.sink_0 "
         f"{name}_crop. ! {inner_pipeline} ! {name}_agg.sink_1 "
@@ -268,6 +293,55 @@ def INFERENCE_PIPELINE_WRAPPER(
     return inference_wrapper_pipeline
 
 
+def PARALLEL_INFERENCE_PIPELINE(
+    inner_pipelines, bypass_max_size_buffers=20, name="parallel_inference"
+):
+    """Creates a GStreamer pipeline string that runs several models on the same decoded frame.
+    The input is split with a tee into one INFERENCE_PIPELINE_WRAPPER branch per inner pipeline,
+    and the metadata of all branches is merged back into a single ROI by chained hailomuxer elements.
+    Decoding, scaling and color conversion of the source are therefore paid once per frame
+    regardless of the number of models.
+
+    Args:
+        inner_pipelines (list[str]): Inner pipeline strings (e.g. from INFERENCE_PIPELINE), one per model.
+            Each inner pipeline must use a unique name prefix.
+        bypass_max_size_buffers (int, optional): The maximum number of buffers for each wrapper bypass queue. Defaults to 20.
+        name (str, optional): The prefix name for the pipeline elements. Defaults to 'parallel_inference'.
+
+    Returns:
+        str: A string representing the GStreamer pipeline for the parallel inference.
+    """
+    if not inner_pipelines:
+        raise ValueError("At least one inner pipeline is required.")
+
+    wrappers = [
+        INFERENCE_PIPELINE_WRAPPER(
+            inner_pipeline,
+            bypass_max_size_buffers=bypass_max_size_buffers,
+            name=f"{name}_wrapper_{i}",
+        )
+        for i, inner_pipeline in enumerate(inner_pipelines)
+    ]
+    if len(wrappers) == 1:
+        return wrappers[0]
+
+    # hailomuxer merges the metadata of sink_1 into the frame arriving on sink_0.
+    # Muxer i combines the result of muxer i-1 (or branch 0) with branch i.
+    parallel_pipeline = f"{QUEUE(name=f'{name}_input_q')} ! tee name={name}_tee "
+    for i in range(1, len(wrappers)):
+        parallel_pipeline += f"hailomuxer name={name}_mux_{i} "
+    parallel_pipeline += f"{name}_tee. ! {wrappers[0]} ! {name}_mux_1.sink_0 "
+    for i in range(1, len(wrappers)):
+        parallel_pipeline += f"{name}_tee. ! {wrappers[i]} ! {name}_mux_{i}.sink_1 "
+    for i in range(1, len(wrappers) - 1):
+        parallel_pipeline += (
+            f"{name}_mux_{i}. ! {QUEUE(name=f'{name}_mux_{i}_q')} ! {name}_mux_{i + 1}.sink_0 "
+        )
+    parallel_pipeline += f"{name}_mux_{len(wrappers) - 1}. ! {QUEUE(name=f'{name}_output_q')} "
+
+    return parallel_pipeline
+
+
 def OVERLAY_PIPELINE(name="hailo_overlay"):
     """Creates a GStreamer pipeline string for the hailooverlay element.
     This pipeline is used to draw bounding boxes and labels on the video.
@@ -285,25 +359,71 @@ def OVERLAY_PIPELINE(name="hailo_overlay"):
 
 
 def DISPLAY_PIPELINE(
-    video_sink=GST_VIDEO_SINK, sync="true", show_fps="false", name="hailo_display"
+    video_sink=GST_VIDEO_SINK,
+    sync="true",
+    show_fps="false",
+    name="hailo_display",
+    latency_overlay=False,
+    preview_size=None,
+    preview_fps=None,
+    full_res_pipeline=None,
 ):
     """Creates a GStreamer pipeline string for displaying the video.
     It includes the hailooverlay plugin to draw bounding boxes and labels on the video.
 
+    With preview_size and/or preview_fps, the frame is downscaled and rate-limited before the
+    overlay, so the display cost scales with the preview and not with the source resolution.
+    With full_res_pipeline, the stream is split by a tee first: the full-resolution frames, without
+    overlay, go to full_res_pipeline (e.g. FILE_SINK_PIPELINE) and the display branch leaks (drops
+    frames) rather than slowing the full-resolution branch down.
+
     Args:
         video_sink (str, optional): The video sink element to use. Defaults to 'autovideosink'.
         sync (str, optional): The sync property for the video sink. Defaults to 'true'.
         show_fps (str, optional): Whether to show the FPS on the video sink. Should be 'true' or 'false'. Defaults to 'false'.
         name (str, optional): The prefix name for the pipeline elements. Defaults to 'hailo_display'.
+        latency_overlay (bool, optional): Draw the running time of each frame (its capture time
+            for live sources), to measure glass-to-glass latency by filming the display. Defaults to False.
+        preview_size (tuple, optional): (width, height) of the displayed frames. Defaults to None (source size).
+        preview_fps (int, optional): Maximum displayed frame rate, >= 1. Defaults to None (no limit).
+        full_res_pipeline (str, optional): Pipeline fed with the full-resolution frames, without
+            overlay. Defaults to None (no split).
 
     Returns:
         str: A string representing the GStreamer pipeline for displaying the video.
     """
+    time_overlay = ""
+    if latency_overlay:
+        time_overlay = (
+            f'timeoverlay name={name}_timeoverlay time-mode=running-time halignment=right valignment=top font-desc="Sans, 32" ! '
+        )
+    preview = ""
+    if preview_fps:
+        if int(preview_fps) != preview_fps or preview_fps < 1:
+            raise ValueError(f"preview_fps must be a whole number >= 1 (videorate max-rate), got {preview_fps}")
+        preview += f"videorate name={name}_videorate drop-only=true max-rate={int(preview_fps)} ! "
+    if preview_size:
+        preview_width, preview_height = preview_size
+        preview += (
+            f"{QUEUE(name=f'{name}_videoscale_q')} ! "
+            f"videoscale name={name}_videoscale n-threads=2 ! "
+            f"video/x-raw, width={preview_width}, height={preview_height} ! "
+        )
+    split = ""
+    if full_res_pipeline:
+        split = (
+            f"tee name={name}_tee "
+            f"{name}_tee. ! {QUEUE(name=f'{name}_full_res_q')} ! {full_res_pipeline} "
+            f"{name}_tee. ! {QUEUE(name=f'{name}_preview_q', leaky='downstream')} ! "
+        )
     # Construct the display pipeline string
     display_pipeline = (
+        f"{split}"
+        f"{preview}"
         f"{OVERLAY_PIPELINE(name=f'{name}_overlay')} ! "
         f"{QUEUE(name=f'{name}_videoconvert_q')} ! "
         f"videoconvert name={name}_videoconvert n-threads=2 qos=false ! "
+        f"{time_overlay}"
         f"{QUEUE(name=f'{name}_q')} ! "
         f"fpsdisplaysink name={name} video-sink={video_sink} sync={sync} text-overlay={show_fps} signal-fps-measurements=true "
     )
@@ -353,6 +473,23 @@ def USER_CALLBACK_PIPELINE(name="identity_callback"):
     return user_callback_pipeline
 
 
+def METADATA_EXPORT_PIPELINE(name="metadata_export"):
+    """Creates a GStreamer pipeline string for the metadata export element.
+    The element is a pass-through identity; MetadataExportStage (see metadata_export_stage.py)
+    probes it to export the detections of each frame (--metadata-export).
+
+    Args:
+        name (str, optional): The name of the identity element. Defaults to 'metadata_export'.
+
+    Returns:
+        str: A string representing the GStreamer pipeline for the metadata export element.
+    """
+    # Construct the metadata export pipeline string
+    metadata_export_pipeline = f"{QUEUE(name=f'{name}_q')} ! identity name={name} "
+
+    return metadata_export_pipeline
+
+
 def TRACKER_PIPELINE(
     class_id,
     kalman_dist_thr=0.8,
@@ -555,30 +692,80 @@ def VIDEO_STREAM_PIPELINE(port=5004, host="127.0.0.1", bitrate=2048):
     )
 
 
-def VIDEO_SHMSINK_PIPELINE(socket_path=None):
+def VIDEO_CAPS(video_format=None, width=None, height=None, frame_rate=None):
+    """Creates a raw video caps string with only the given fields.
+
+    Returns:
+        str: e.g. 'video/x-raw,format=RGB,width=640,height=480,framerate=30/1'.
+    """
+    caps = "video/x-raw"
+    if video_format is not None:
+        caps += f",format={video_format}"
+    if width is not None:
+        caps += f",width={width}"
+    if height is not None:
+        caps += f",height={height}"
+    if frame_rate is not None:
+        caps += f",framerate={frame_rate}/1"
+    return caps
+
+
+def VIDEO_SHMSINK_PIPELINE(
+    socket_path=None,
+    video_format=None,
+    width=None,
+    height=None,
+    frame_rate=None,
+    shm_size=67108864,
+    name="shm_sink",
+):
     """Creates a GStreamer pipeline string portion for shared memory video transfer using the shm plugins.
-    Shmsink creates a shared memory segment and socket.
+    Shmsink creates a shared memory segment and socket. Any number of shmsrc readers can connect.
+    Caps fields left as None are not forced, so the negotiated caps are kept. Readers must use the
+    same caps (shm carries no caps). To also share the detections, use --shm-output instead.
 
     Args:
         socket_path (str): socket path.
+        video_format (str, optional): Video format to convert to, e.g. 'RGB'. Defaults to None.
+        width (int, optional): Frame width to scale to. Defaults to None.
+        height (int, optional): Frame height to scale to. Defaults to None.
+        frame_rate (int, optional): Frame rate to convert to. Defaults to None.
+        shm_size (int, optional): Shared memory segment size in bytes. Defaults to 64 MiB.
+        name (str, optional): The prefix name for the pipeline elements. Defaults to 'shm_sink'.
 
     Returns:
         str: GStreamer pipeline string fragment.
     """
-    return f"videoconvert ! video/x-raw,format=RGB,width=640,height=480,framerate=30/1 ! shmsink socket-path={socket_path}"
+    caps = VIDEO_CAPS(video_format, width, height, frame_rate)
+    conversion = ""
+    if width is not None or height is not None:
+        conversion += f"videoscale name={name}_videoscale n-threads=2 ! "
+    if frame_rate is not None:
+        conversion += f"videorate name={name}_videorate ! "
+    return (
+        f"{QUEUE(name=f'{name}_q', leaky='downstream')} ! "
+        f"videoconvert name={name}_videoconvert n-threads=2 qos=false ! {conversion}{caps} ! "
+        f"shmsink name={name} socket-path={socket_path} shm-size={shm_size} wait-for-connection=false sync=false async=false"
+    )
 
 
-def VIDEO_SHMSRC_PIPELINE(socket_path=None):
+def VIDEO_SHMSRC_PIPELINE(socket_path=None, video_format="RGB", width=640, height=480, frame_rate=30):
     """Creates a GStreamer pipeline string portion for shared memory video transfer using the shm plugins.
     Shmsrc connects to that segment and reads video frames.
+    The caps must match the caps written by the VIDEO_SHMSINK_PIPELINE.
 
     Args:
         socket_path (str): socket path.
+        video_format (str, optional): Video format of the shared frames. Defaults to 'RGB'.
+        width (int, optional): Frame width. Defaults to 640.
+        height (int, optional): Frame height. Defaults to 480.
+        frame_rate (int, optional): Frame rate. Defaults to 30.
 
     Returns:
         str: GStreamer pipeline string fragment.
     """
-    return f"shmsrc socket-path={socket_path} do-timestamp=true ! video/x-raw,format=RGB,width=640,height=480,framerate=30/1 ! videoconvert ! autovideosink"
+    caps = VIDEO_CAPS(video_format, width, height, frame_rate)
+    return f"shmsrc socket-path={socket_path} do-timestamp=true is-live=true ! {caps} ! videoconvert ! autovideosink"
 
 
 def UI_APPSINK_PIPELINE(name="ui_sink", sync="true", show_fps="false"):
@@ -607,3 +794,40 @@ def UI_APPSINK_PIPELINE(name="ui_sink", sync="true", show_fps="false"):
         f"appsink name={name} sync={sync} drop=true emit-signals=true "
     )
     return ui_appsink_pipeline
+
+
+def ANALYTICS_BRANCH_PIPELINE(name="analytics_sink", max_fps=None, frame_size=None):
+    """Creates a GStreamer pipeline string that tees the stream into a decoupled analytics branch.
+    The branch starts with a leaky single-buffer queue and ends with an appsink that keeps only the
+    newest frame, so slow Python analytics never slow down the main branch (display, recording).
+    The main branch continues after the returned string, so it can be linked to the next element.
+
+    Args:
+        name (str, optional): The name of the appsink; the other elements are prefixed with it.
+            Defaults to 'analytics_sink'.
+        max_fps (int, optional): Maximum frame rate of the analytics branch, >= 1. Defaults to None (no limit).
+        frame_size (tuple, optional): (width, height) of the analytics frames. Defaults to None (stream size).
+
+    Returns:
+        str: A string representing the tee, the analytics branch and the main branch queue.
+    """
+    rate = ""
+    if max_fps:
+        if int(max_fps) != max_fps or max_fps < 1:
+            raise ValueError(f"max_fps must be a whole number >= 1 (videorate max-rate), got {max_fps}")
+        rate = f"videorate name={name}_videorate drop-only=true max-rate={int(max_fps)} ! "
+    scale, caps = "", "video/x-raw, format=RGB"
+    if frame_size:
+        scale = f"videoscale name={name}_videoscale n-threads=2 ! "
+        caps += f", width={frame_size[0]}, height={frame_size[1]}"
+    analytics_branch_pipeline = (
+        f"tee name={name}_tee "
+        f"{name}_tee. ! {QUEUE(name=f'{name}_q', max_size_buffers=1, leaky='downstream')} ! "
+        f"{rate}"
+        f"{scale}"
+        f"videoconvert name={name}_videoconvert n-threads=2 qos=false ! "
+        f"{caps} ! "
+        f"appsink name={name} emit-signals=true drop=true max-buffers=1 sync=false async=false "
+        f"{name}_tee. ! {QUEUE(name=f'{name}_main_q')}"
+    )
+    return analytics_branch_pipeline
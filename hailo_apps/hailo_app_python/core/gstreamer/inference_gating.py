@@ -0,0 +1,484 @@
+# region imports
+# Standard library imports
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+import numpy as np
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_pad
+from hailo_apps.hailo_app_python.core.common.defines import (
+    GATED_WHOLE_BUFFER_CROPPER_FUNCTION,
+    HAILO_NV12_VIDEO_FORMAT,
+    HAILO_RGB_VIDEO_FORMAT,
+    HAILO_YUYV_VIDEO_FORMAT,
+    INFERENCE_GATE_CLASSIFICATION_TYPE,
+    INFERENCE_GATE_SKIP_LABEL,
+    INFERENCE_REGIONS_CROPPER_FUNCTION,
+)
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# How often (in frames) the gate statistics are written to the debug log
+STATS_LOG_INTERVAL = 300
+
+# Cropper functions that honor the skip mark of a gate
+GATED_CROPPER_FUNCTIONS = (GATED_WHOLE_BUFFER_CROPPER_FUNCTION, INFERENCE_REGIONS_CROPPER_FUNCTION)
+
+
+# -----------------------------------------------------------------------------------------------
+# Gates: decide per frame whether inference should run
+# -----------------------------------------------------------------------------------------------
+class InferenceGate:
+    """Base class for inference gates.
+
+    A gate is evaluated on every frame entering a gated INFERENCE_PIPELINE_WRAPPER.
+    Subclasses implement should_infer(); the base class keeps the frame counters. A gate whose
+    state depends on whether inference actually ran (e.g. a keyframe counter) updates it in
+    on_decision(), which receives the final decision of the frame: the gate's own one, or the
+    combined one when the gate is part of a CombinedGate.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.gated_frames = 0
+
+    def should_infer(self, buffer, pad) -> bool:
+        return True
+
+    def on_decision(self, infer):
+        """Called with the final decision of each frame."""
+
+    def vote(self, buffer, pad) -> bool:
+        """Evaluates the gate on a buffer and updates the counters, without applying the decision
+        (see CombinedGate).
+
+        Returns:
+            bool: True if the gate votes to run inference on this frame.
+        """
+        self.frames += 1
+        infer = self.should_infer(buffer, pad)
+        if not infer:
+            self.gated_frames += 1
+        return infer
+
+    def evaluate(self, buffer, pad) -> bool:
+        """Evaluates the gate on a buffer, updates the counters and applies the decision.
+
+        Returns:
+            bool: True if inference should run on this frame.
+        """
+        infer = self.vote(buffer, pad)
+        self.on_decision(infer)
+        return infer
+
+    def get_gated_ratio(self) -> float:
+        return self.gated_frames / self.frames if self.frames else 0.0
+
+    def get_stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "gated_frames": self.gated_frames,
+            "gated_ratio": self.get_gated_ratio(),
+        }
+
+
+class InferenceStrideGate(InferenceGate):
+    """Runs inference on every Nth frame, or at a target inference rate.
+
+    Args:
+        stride (int): Run inference on one frame out of every `stride` frames. Defaults to 1.
+        target_fps (float or None): Target inference rate. When set, it overrides `stride` and the
+            decision is based on the buffer timestamps, so it holds for any source frame rate.
+    """
+
+    def __init__(self, stride=1, target_fps=None):
+        super().__init__()
+        if stride < 1:
+            raise ValueError(f"Inference stride must be >= 1, got {stride}")
+        if target_fps is not None and target_fps <= 0:
+            raise ValueError(f"Inference FPS must be > 0, got {target_fps}")
+        self.stride = stride
+        self.period_ns = int(Gst.SECOND / target_fps) if target_fps else None
+        self._last_inference_pts = None
+
+    def should_infer(self, buffer, pad) -> bool:
+        return self.decide(buffer.pts)
+
+    def decide(self, pts) -> bool:
+        """Decides based on the frame index (stride) or the timestamp (target fps)."""
+        if self.period_ns is None or pts is None or pts == Gst.CLOCK_TIME_NONE:
+            return (self.frames - 1) % self.stride == 0
+        if self._last_inference_pts is None or pts < self._last_inference_pts:
+            # First frame, or the stream restarted
+            self._last_inference_pts = pts
+            return True
+        if pts - self._last_inference_pts >= self.period_ns:
+            self._last_inference_pts += self.period_ns * ((pts - self._last_inference_pts) // self.period_ns)
+            return True
+        return False
+
+
+class MotionGate(InferenceGate):
+    """Skips inference while the scene is static, using downscaled frame differencing.
+
+    Each frame is subsampled to a small luma image and compared with the previous one. A frame
+    has motion when the fraction of pixels whose luma changed by more than `pixel_threshold`
+    exceeds `motion_threshold`. Inference keeps running for `hold_frames` frames after the last
+    motion (hysteresis), and a keyframe is inferred at least every `keyframe_interval` frames so
+    the metadata of a static scene is refreshed.
+
+    Args:
+        motion_threshold (float): Fraction of changed pixels that counts as motion. Defaults to 0.01.
+        pixel_threshold (int): Minimum luma difference (0-255) of a changed pixel. Defaults to 25.
+        hold_frames (int): Frames to keep inferring after motion stops. Defaults to 15.
+        keyframe_interval (int or None): Force inference at least every N frames. None disables it. Defaults to 60.
+        downscale (int): Subsampling step of the compared image. Defaults to 8.
+    """
+
+    def __init__(
+        self,
+        motion_threshold=0.01,
+        pixel_threshold=25,
+        hold_frames=15,
+        keyframe_interval=60,
+        downscale=8,
+    ):
+        super().__init__()
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.hold_frames = hold_frames
+        self.keyframe_interval = keyframe_interval
+        self.downscale = max(1, int(downscale))
+        self.motion_frames = 0
+        self.keyframes = 0
+        self._previous = None
+        self._frames_since_motion = None
+        self._frames_since_inference = 0
+        self._caps = None
+
+    def should_infer(self, buffer, pad) -> bool:
+        luma = self._get_downscaled_luma(buffer, pad)
+        if luma is None:
+            return True
+        return self._vote_luma(luma)
+
+    def update(self, luma) -> bool:
+        """Updates the gate with a downscaled luma image (2D uint8 array) and applies its own
+        decision, as a standalone gate.
+
+        Returns:
+            bool: True if inference should run on this frame.
+        """
+        infer = self._vote_luma(luma)
+        self.on_decision(infer)
+        return infer
+
+    def on_decision(self, infer):
+        # The keyframe interval counts the frames actually inferred, so a frame vetoed by another
+        # gate does not restart it
+        self._frames_since_inference = 0 if infer else self._frames_since_inference + 1
+
+    def _vote_luma(self, luma) -> bool:
+        luma = luma.astype(np.int16)
+        if self._previous is None or self._previous.shape != luma.shape:
+            motion = True
+        else:
+            changed = np.count_nonzero(np.abs(luma - self._previous) > self.pixel_threshold)
+            motion = changed > self.motion_threshold * luma.size
+        self._previous = luma
+
+        if motion:
+            self.motion_frames += 1
+            self._frames_since_motion = 0
+        elif self._frames_since_motion is not None:
+            self._frames_since_motion += 1
+
+        infer = self._frames_since_motion is not None and self._frames_since_motion <= self.hold_frames
+        if (
+            not infer
+            and self.keyframe_interval
+            and self._frames_since_inference + 1 >= self.keyframe_interval
+        ):
+            infer = True
+            self.keyframes += 1
+        return infer
+
+    def _get_downscaled_luma(self, buffer, pad):
+        if self._caps is None:
+            self._caps = get_caps_from_pad(pad)
+        format, width, height = self._caps
+        if format is None:
+            return None
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            return None
+        try:
+            step = self.downscale
+            if format == HAILO_RGB_VIDEO_FORMAT:
+                frame = np.ndarray(shape=(height, width, 3), dtype=np.uint8, buffer=map_info.data)
+                # The green channel is a good enough approximation of the luma for differencing
+                return frame[::step, ::step, 1].copy()
+            if format == HAILO_NV12_VIDEO_FORMAT:
+                y_plane = np.ndarray(
+                    shape=(height, width), dtype=np.uint8, buffer=map_info.data[: width * height]
+                )
+                return y_plane[::step, ::step].copy()
+            if format == HAILO_YUYV_VIDEO_FORMAT:
+                frame = np.ndarray(shape=(height, width, 2), dtype=np.uint8, buffer=map_info.data)
+                return frame[::step, ::step, 0].copy()
+            hailo_logger.warning(f"Motion gate does not support format {format}; gate disabled")
+            self._caps = (None, None, None)
+            return None
+        finally:
+            buffer.unmap(map_info)
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats.update({"motion_frames": self.motion_frames, "keyframes": self.keyframes})
+        return stats
+
+
+class CombinedGate(InferenceGate):
+    """Runs inference only when all the given gates agree. Every gate votes on every frame, so
+    each keeps consistent internal state and counters, and receives the combined decision."""
+
+    def __init__(self, gates):
+        super().__init__()
+        self.gates = gates
+
+    def should_infer(self, buffer, pad) -> bool:
+        decisions = [gate.vote(buffer, pad) for gate in self.gates]
+        return all(decisions)
+
+    def on_decision(self, infer):
+        for gate in self.gates:
+            gate.on_decision(infer)
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats["gates"] = [gate.get_stats() for gate in self.gates]
+        return stats
+
+
+# -----------------------------------------------------------------------------------------------
+# Metadata carry-forward for frames that skipped inference
+# -----------------------------------------------------------------------------------------------
+class MetadataCarryForward:
+    """Re-attaches the detections of the last inferred frame to frames that skipped inference.
+
+    Carried detections keep their sub-objects (landmarks, masks, classifications) but not their
+    tracking IDs, so a downstream hailotracker keeps matching them to the existing tracks.
+
+    Args:
+        extrapolate (bool): If True, each carried detection is moved with the velocity estimated
+            between the last two inferred frames (constant-velocity motion model).
+        max_carry_frames (int or None): Stop carrying detections after this many consecutive
+            skipped frames. None means no limit.
+    """
+
+    def __init__(self, extrapolate=False, max_carry_frames=None):
+        self.extrapolate = extrapolate
+        self.max_carry_frames = max_carry_frames
+        self.reset()
+
+    def reset(self):
+        self._last_detections = []  # list of (detection, (vx, vy)) with velocity per frame
+        self._frames_since_inference = 0
+
+    def store(self, roi):
+        """Stores the detections of an inferred frame."""
+        detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+        previous = [detection for detection, _ in self._last_detections]
+        frames_between = self._frames_since_inference + 1
+        self._last_detections = [
+            (
+                detection,
+                _estimate_velocity(detection, previous, frames_between)
+                if self.extrapolate
+                else (0.0, 0.0),
+            )
+            for detection in detections
+        ]
+        self._frames_since_inference = 0
+
+    def apply(self, roi):
+        """Adds the carried detections to the ROI of a frame that skipped inference."""
+        self._frames_since_inference += 1
+        if self.max_carry_frames is not None and self._frames_since_inference > self.max_carry_frames:
+            return
+        for detection, (vx, vy) in self._last_detections:
+            bbox = detection.get_bbox()
+            dx = vx * self._frames_since_inference
+            dy = vy * self._frames_since_inference
+            xmin = min(max(bbox.xmin() + dx, 0.0), max(1.0 - bbox.width(), 0.0))
+            ymin = min(max(bbox.ymin() + dy, 0.0), max(1.0 - bbox.height(), 0.0))
+            carried = hailo.HailoDetection(
+                bbox=hailo.HailoBBox(xmin, ymin, bbox.width(), bbox.height()),
+                label=detection.get_label(),
+                confidence=detection.get_confidence(),
+            )
+            for obj in detection.get_objects():
+                if obj.get_type() != hailo.HAILO_UNIQUE_ID:
+                    carried.add_object(obj)
+            roi.add_object(carried)
+
+
+def _bbox_center(detection):
+    bbox = detection.get_bbox()
+    return bbox.xmin() + bbox.width() / 2, bbox.ymin() + bbox.height() / 2
+
+
+def _estimate_velocity(detection, previous, frames_between):
+    """Estimates the per-frame velocity of a detection from the closest previous detection
+    with the same label. Matches farther than the detection size are ignored."""
+    cx, cy = _bbox_center(detection)
+    bbox = detection.get_bbox()
+    max_distance = max(bbox.width(), bbox.height())
+    best, best_distance = None, max_distance
+    for candidate in previous:
+        if candidate.get_label() != detection.get_label():
+            continue
+        px, py = _bbox_center(candidate)
+        distance = ((cx - px) ** 2 + (cy - py) ** 2) ** 0.5
+        if distance < best_distance:
+            best, best_distance = (px, py), distance
+    if best is None:
+        return 0.0, 0.0
+    return (cx - best[0]) / frames_between, (cy - best[1]) / frames_between
+
+
+# -----------------------------------------------------------------------------------------------
+# Controller: connects a gate and the carry-forward to a gated INFERENCE_PIPELINE_WRAPPER
+# -----------------------------------------------------------------------------------------------
+class InferenceGateController:
+    """Connects an InferenceGate to a gated INFERENCE_PIPELINE_WRAPPER.
+
+    A probe on the wrapper's hailocropper sink pad evaluates the gate and marks frames that should
+    skip inference; the gated cropper then sends them through the bypass branch only. A probe on
+    the aggregator src pad removes the mark and, if enabled, carries the last metadata forward.
+
+    Args:
+        gate (InferenceGate): The gate deciding which frames are inferred.
+        carry_forward (MetadataCarryForward or None): Metadata carry-forward for skipped frames.
+            None passes skipped frames with empty metadata.
+        name (str): The name prefix of the INFERENCE_PIPELINE_WRAPPER. Defaults to 'inference_wrapper'.
+    """
+
+    def __init__(self, gate, carry_forward=None, name="inference_wrapper"):
+        self.gate = gate
+        self.carry_forward = carry_forward
+        self.name = name
+
+    def attach(self, pipeline) -> bool:
+        """Adds the gating probes to the pipeline. Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if the probes were attached.
+        """
+        cropper = pipeline.get_by_name(f"{self.name}_crop")
+        aggregator = pipeline.get_by_name(f"{self.name}_agg")
+        if cropper is None or aggregator is None:
+            hailo_logger.warning(f"Inference wrapper '{self.name}' not found; gating disabled")
+            return False
+        if cropper.get_property("function-name") not in GATED_CROPPER_FUNCTIONS:
+            hailo_logger.warning(
+                f"Inference wrapper '{self.name}' is not gated (use gated=True); gating disabled"
+            )
+            return False
+        if self.carry_forward is not None:
+            self.carry_forward.reset()
+        cropper.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._gate_probe)
+        aggregator.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._output_probe)
+        hailo_logger.debug(f"Inference gate attached to '{self.name}'")
+        return True
+
+    def _gate_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        if not self.gate.evaluate(buffer, pad):
+            roi = hailo.get_roi_from_buffer(buffer)
+            roi.add_object(
+                hailo.HailoClassification(
+                    type=INFERENCE_GATE_CLASSIFICATION_TYPE,
+                    label=INFERENCE_GATE_SKIP_LABEL,
+                    confidence=1.0,
+                )
+            )
+        if self.gate.frames % STATS_LOG_INTERVAL == 0:
+            hailo_logger.debug(f"Inference gate '{self.name}': {self.gate.get_stats()}")
+        return Gst.PadProbeReturn.OK
+
+    def _output_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        roi = hailo.get_roi_from_buffer(buffer)
+        markers = [
+            classification
+            for classification in roi.get_objects_typed(hailo.HAILO_CLASSIFICATION)
+            if classification.get_classification_type() == INFERENCE_GATE_CLASSIFICATION_TYPE
+        ]
+        for marker in markers:
+            roi.remove_object(marker)
+        if self.carry_forward is not None:
+            if markers:
+                self.carry_forward.apply(roi)
+            else:
+                self.carry_forward.store(roi)
+        return Gst.PadProbeReturn.OK
+
+    def get_stats(self) -> dict:
+        return self.gate.get_stats()
+
+
+def create_inference_gate(options_menu, name="inference_wrapper"):
+    """Creates an InferenceGateController from the parsed CLI options.
+
+    Args:
+        options_menu (argparse.Namespace): The parsed CLI options (see get_default_parser).
+        name (str): The name prefix of the INFERENCE_PIPELINE_WRAPPER to gate.
+
+    Returns:
+        InferenceGateController or None: None when every frame should be inferred.
+    """
+    gates = []
+    stride = getattr(options_menu, "inference_stride", 1) or 1
+    target_fps = getattr(options_menu, "inference_fps", None)
+    if stride > 1 or target_fps is not None:
+        gates.append(InferenceStrideGate(stride=stride, target_fps=target_fps))
+        hailo_logger.info(
+            f"Inference decimation enabled: stride={stride}, target_fps={target_fps}"
+        )
+    if getattr(options_menu, "motion_gate", False):
+        gates.append(
+            MotionGate(
+                motion_threshold=options_menu.motion_threshold,
+                pixel_threshold=options_menu.motion_pixel_threshold,
+                hold_frames=options_menu.motion_hold_frames,
+                keyframe_interval=options_menu.motion_keyframe_interval,
+            )
+        )
+        hailo_logger.info(
+            f"Motion gate enabled: threshold={options_menu.motion_threshold}, "
+            f"pixel_threshold={options_menu.motion_pixel_threshold}, "
+            f"hold_frames={options_menu.motion_hold_frames}, "
+            f"keyframe_interval={options_menu.motion_keyframe_interval}"
+        )
+    if not gates:
+        return None
+
+    gate = gates[0] if len(gates) == 1 else CombinedGate(gates)
+    carry_forward = None
+    if getattr(options_menu, "gated_metadata", "last") == "last":
+        carry_forward = MetadataCarryForward(
+            extrapolate=getattr(options_menu, "extrapolate_metadata", False)
+        )
+    return InferenceGateController(gate, carry_forward=carry_forward, name=name)
@@ -0,0 +1,141 @@
+# region imports
+# Standard library imports
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.core import parse_region
+from hailo_apps.hailo_app_python.core.common.defines import (
+    INFERENCE_REGION_LABEL,
+    INFERENCE_REGIONS_CROPPER_FUNCTION,
+)
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+def map_bbox_to_frame(region, xmin, ymin, width, height):
+    """Maps a bbox relative to a region back to full-frame coordinates.
+
+    Args:
+        region (tuple): The region (xmin, ymin, width, height) in frame coordinates.
+        xmin, ymin, width, height (float): The bbox in region coordinates.
+
+    Returns:
+        tuple: The bbox (xmin, ymin, width, height) in frame coordinates.
+    """
+    region_xmin, region_ymin, region_width, region_height = region
+    return (
+        region_xmin + xmin * region_width,
+        region_ymin + ymin * region_height,
+        width * region_width,
+        height * region_height,
+    )
+
+
+class InferenceRegionsController:
+    """Restricts inference to static regions of interest of the frame.
+
+    A probe on the wrapper's hailocropper sink pad adds one region detection per configured region;
+    the region cropper crops and scales only these regions into the model, so small objects get
+    more model pixels. A probe on the aggregator src pad moves the detections found in each region
+    to the frame ROI, in full-frame coordinates, and removes the region detections.
+
+    Overlapping regions may report the same object twice.
+
+    Args:
+        regions (list): Regions (xmin, ymin, width, height) in normalized frame coordinates.
+        name (str): The name prefix of the INFERENCE_PIPELINE_WRAPPER. Defaults to 'inference_wrapper'.
+    """
+
+    def __init__(self, regions, name="inference_wrapper"):
+        if not regions:
+            raise ValueError("At least one region is required")
+        self.regions = [tuple(region) for region in regions]
+        self.name = name
+
+    def attach(self, pipeline) -> bool:
+        """Adds the region probes to the pipeline. Must be called again after a pipeline rebuild,
+        and before any other probe on the wrapper aggregator that reads the detections.
+
+        Returns:
+            bool: True if the probes were attached.
+        """
+        cropper = pipeline.get_by_name(f"{self.name}_crop")
+        aggregator = pipeline.get_by_name(f"{self.name}_agg")
+        if cropper is None or aggregator is None:
+            hailo_logger.warning(f"Inference wrapper '{self.name}' not found; regions disabled")
+            return False
+        if cropper.get_property("function-name") != INFERENCE_REGIONS_CROPPER_FUNCTION:
+            hailo_logger.warning(
+                f"Inference wrapper '{self.name}' does not crop regions (use crop_regions=True); regions disabled"
+            )
+            return False
+        cropper.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._regions_probe)
+        aggregator.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._flatten_probe)
+        hailo_logger.debug(f"Inference regions {self.regions} attached to '{self.name}'")
+        return True
+
+    def _regions_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        roi = hailo.get_roi_from_buffer(buffer)
+        for region in self.regions:
+            roi.add_object(
+                hailo.HailoDetection(
+                    bbox=hailo.HailoBBox(*region), label=INFERENCE_REGION_LABEL, confidence=1.0
+                )
+            )
+        return Gst.PadProbeReturn.OK
+
+    def _flatten_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        roi = hailo.get_roi_from_buffer(buffer)
+        for region_detection in roi.get_objects_typed(hailo.HAILO_DETECTION):
+            if region_detection.get_label() != INFERENCE_REGION_LABEL:
+                continue
+            region_bbox = region_detection.get_bbox()
+            region = (region_bbox.xmin(), region_bbox.ymin(), region_bbox.width(), region_bbox.height())
+            for detection in region_detection.get_objects_typed(hailo.HAILO_DETECTION):
+                bbox = detection.get_bbox()
+                flattened = hailo.HailoDetection(
+                    bbox=hailo.HailoBBox(
+                        *map_bbox_to_frame(region, bbox.xmin(), bbox.ymin(), bbox.width(), bbox.height())
+                    ),
+                    label=detection.get_label(),
+                    confidence=detection.get_confidence(),
+                )
+                # Landmarks and masks are relative to their detection, so they stay valid as-is
+                for obj in detection.get_objects():
+                    flattened.add_object(obj)
+                roi.add_object(flattened)
+            roi.remove_object(region_detection)
+        return Gst.PadProbeReturn.OK
+
+
+def create_inference_regions(options_menu, name="inference_wrapper"):
+    """Creates an InferenceRegionsController from the parsed CLI options (--roi).
+
+    Args:
+        options_menu (argparse.Namespace): The parsed CLI options (see get_default_parser).
+        name (str): The name prefix of the INFERENCE_PIPELINE_WRAPPER.
+
+    Returns:
+        InferenceRegionsController or None: None when the whole frame should be inferred.
+    """
+    roi = getattr(options_menu, "roi", None)
+    if not roi:
+        return None
+    # Regions parsed by the --roi option are tuples; strings (e.g. from another parser) are parsed here
+    regions = [parse_region(region) if isinstance(region, str) else tuple(region) for region in roi]
+    hailo_logger.info(f"Inference restricted to regions: {regions}")
+    return InferenceRegionsController(regions, name=name)
@@ -0,0 +1,276 @@
+# region imports
+# Standard library imports
+import fnmatch
+from collections import deque
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+import numpy as np
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Queues that may drop frames in the low-latency profile: the raw-video source queues, the input
+# queue of every wrapper (cropper, tile cropper, inference) and the display queues. Queues inside a
+# wrapper must never drop, or the aggregator would wait forever for the missing frame.
+LOW_LATENCY_LEAKY_QUEUE_PATTERNS = ("source_scale_q", "source_convert_q", "*_input_q", "hailo_display*")
+LOW_LATENCY_QUEUE_MAX_BUFFERS = 2
+QUEUE_LEAKY_DOWNSTREAM = 2
+LATENCY_WINDOW_SIZE = 300  # frames
+LATENCY_LOG_INTERVAL = 300  # frames
+DEADLINE_STATS_LOG_INTERVAL = 300  # frames per source
+# Elements that split a frame into crops; frames must not be dropped between them and their aggregator
+CROPPER_FACTORIES = ("hailocropper", "hailotilecropper")
+AGGREGATOR_FACTORIES = ("hailoaggregator", "hailotileaggregator")
+MAX_UPSTREAM_WALK = 64
+
+
+def _iterate_elements(pipeline):
+    iterator = pipeline.iterate_recurse()
+    while True:
+        result, element = iterator.next()
+        if result == Gst.IteratorResult.RESYNC:
+            iterator.resync()
+            continue
+        if result != Gst.IteratorResult.OK:
+            break
+        yield element
+
+
+def _is_tee_branch(queue):
+    """Returns True if the queue is fed directly by a tee. Dropping in one tee branch only would
+    stall a downstream muxer that waits for the same frame on every branch."""
+    peer = queue.get_static_pad("sink").get_peer()
+    if peer is None:
+        return False
+    parent = peer.get_parent_element()
+    return parent is not None and parent.get_factory().get_name() == "tee"
+
+
+def apply_low_latency_profile(pipeline) -> dict:
+    """Configures a parsed pipeline for live sources: frames are dropped instead of queued when
+    processing momentarily slows, so latency cannot accumulate.
+
+    - Source, wrapper input and display queues become leaky (downstream) and shorter.
+    - Display sinks render immediately (sync=false) and appsinks keep only the newest frame.
+
+    Returns:
+        dict: The number of changed queues, display sinks and appsinks.
+    """
+    changes = {"queues": 0, "display_sinks": 0, "appsinks": 0}
+    for element in _iterate_elements(pipeline):
+        factory_name = element.get_factory().get_name() if element.get_factory() else None
+        name = element.get_name()
+        if factory_name == "queue":
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in LOW_LATENCY_LEAKY_QUEUE_PATTERNS):
+                continue
+            if _is_tee_branch(element):
+                continue
+            element.set_property("leaky", QUEUE_LEAKY_DOWNSTREAM)
+            element.set_property("max-size-buffers", LOW_LATENCY_QUEUE_MAX_BUFFERS)
+            changes["queues"] += 1
+        elif factory_name == "fpsdisplaysink":
+            element.set_property("sync", False)
+            changes["display_sinks"] += 1
+        elif factory_name == "appsink":
+            element.set_property("drop", True)
+            element.set_property("max-buffers", 1)
+            changes["appsinks"] += 1
+    hailo_logger.info(f"Low-latency profile applied: {changes}")
+    return changes
+
+
+def get_buffer_age_ns(element, pad, buffer):
+    """Returns how long ago (in pipeline running time) a buffer was timestamped, or None if unknown.
+    For live sources this is the time since capture."""
+    clock = element.get_clock()
+    if clock is None or buffer.pts == Gst.CLOCK_TIME_NONE:
+        return None
+    segment_event = pad.get_sticky_event(Gst.EventType.SEGMENT, 0)
+    if segment_event is None:
+        return None
+    buffer_running_time = segment_event.parse_segment().to_running_time(Gst.Format.TIME, buffer.pts)
+    return clock.get_time() - element.get_base_time() - buffer_running_time
+
+
+class LatencyMonitor:
+    """Measures the capture-to-display latency of each frame at a display sink.
+
+    The latency is the pipeline running time when the frame reaches the sink minus the running
+    time of its timestamp (set at capture by live sources). It covers everything but the sensor
+    exposure and the display scan-out. For a full glass-to-glass measurement, run with
+    --measure-latency and point the camera at the display: the difference between the running time
+    drawn on the live frame and the one visible in the filmed screen is the glass-to-glass latency.
+
+    Args:
+        element_name (str): The display sink element. Defaults to 'hailo_display'.
+    """
+
+    def __init__(self, element_name="hailo_display"):
+        self.element_name = element_name
+        self.samples = deque(maxlen=LATENCY_WINDOW_SIZE)
+        self.frames = 0
+        self._element = None
+
+    def attach(self, pipeline) -> bool:
+        """Adds the measurement probe to the display sink.
+
+        Returns:
+            bool: True if the probe was attached.
+        """
+        self._element = pipeline.get_by_name(self.element_name)
+        if self._element is None:
+            hailo_logger.warning(f"'{self.element_name}' not found; latency measurement disabled")
+            return False
+        self._element.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._latency_probe)
+        return True
+
+    def _latency_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        age_ns = get_buffer_age_ns(self._element, pad, buffer)
+        if age_ns is not None:
+            self.add_sample(age_ns / Gst.MSECOND)
+        return Gst.PadProbeReturn.OK
+
+    def add_sample(self, latency_ms):
+        self.samples.append(latency_ms)
+        self.frames += 1
+        if self.frames % LATENCY_LOG_INTERVAL == 0:
+            hailo_logger.info(f"Capture-to-display latency: {self.get_stats()}")
+
+    def get_stats(self) -> dict:
+        """Returns the mean, median, 95th percentile and maximum latency (ms) of the recent frames."""
+        if not self.samples:
+            return {"frames": self.frames}
+        samples = np.asarray(self.samples)
+        return {
+            "frames": self.frames,
+            "mean_ms": round(float(samples.mean()), 1),
+            "p50_ms": round(float(np.percentile(samples, 50)), 1),
+            "p95_ms": round(float(np.percentile(samples, 95)), 1),
+            "max_ms": round(float(samples.max()), 1),
+        }
+
+
+def _upstream_element(element):
+    """Returns the element feeding the first sink pad of an element, or None."""
+    for pad in element.sinkpads:
+        peer = pad.get_peer()
+        if peer is None:
+            return None
+        return peer.get_parent_element()
+    return None
+
+
+def _is_inside_cropper(element):
+    """Returns True if the element is between a cropper and its aggregator."""
+    current = element
+    for _ in range(MAX_UPSTREAM_WALK):
+        current = _upstream_element(current)
+        if current is None:
+            return False
+        factory = current.get_factory()
+        if factory is None:
+            continue
+        if factory.get_name() in CROPPER_FACTORIES:
+            return True
+        if factory.get_name() in AGGREGATOR_FACTORIES:
+            # Downstream of a complete wrapper
+            return False
+    return False
+
+
+def find_deadline_drop_points(pipeline):
+    """Returns the queues where frames can be dropped safely right before inference.
+
+    - '*_hailonet_q' queues of INFERENCE_PIPELINEs that are not inside a wrapper.
+    - Queues feeding a cropper (e.g. '{name}_input_q' of INFERENCE_PIPELINE_WRAPPER): the whole
+      frame is dropped before it is split, so the aggregator never waits for it.
+    """
+    drop_points = []
+    for element in _iterate_elements(pipeline):
+        factory = element.get_factory()
+        if factory is None:
+            continue
+        if factory.get_name() == "queue" and fnmatch.fnmatch(element.get_name(), "*_hailonet_q"):
+            if not _is_inside_cropper(element):
+                drop_points.append(element)
+        elif factory.get_name() in CROPPER_FACTORIES:
+            upstream = _upstream_element(element)
+            if (
+                upstream is not None
+                and upstream.get_factory() is not None
+                and upstream.get_factory().get_name() == "queue"
+                and not _is_inside_cropper(upstream)
+            ):
+                drop_points.append(upstream)
+    return drop_points
+
+
+class DeadlineDropStage:
+    """Drops frames that waited longer than a latency budget before reaching inference.
+
+    Probes on the queues returned by find_deadline_drop_points() compare each buffer's running
+    time with the pipeline clock and drop it when its age exceeds the budget, so a momentary
+    slowdown does not make every following frame late. Counters are kept per source (stream id),
+    so in multi-camera round-robin pipelines each stream's drops are visible.
+
+    Args:
+        budget_ms (float): Maximum age of a frame entering inference, in milliseconds.
+    """
+
+    def __init__(self, budget_ms):
+        if budget_ms <= 0:
+            raise ValueError(f"Frame deadline must be > 0 ms, got {budget_ms}")
+        self.budget_ns = int(budget_ms * Gst.MSECOND)
+        self.stats = {}  # stream id -> {"frames": n, "dropped": n}
+
+    def attach(self, pipeline) -> bool:
+        """Adds the deadline probes to the pipeline. Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if at least one drop point was found.
+        """
+        drop_points = find_deadline_drop_points(pipeline)
+        if not drop_points:
+            hailo_logger.warning("No inference input queue found; frame deadline disabled")
+            return False
+        for queue in drop_points:
+            queue.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._deadline_probe, queue)
+        hailo_logger.info(
+            f"Frame deadline of {self.budget_ns / Gst.MSECOND:.0f} ms applied at "
+            f"{[queue.get_name() for queue in drop_points]}"
+        )
+        return True
+
+    def _deadline_probe(self, pad, info, queue):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        age_ns = get_buffer_age_ns(queue, pad, buffer)
+        late = age_ns is not None and age_ns > self.budget_ns
+        self.count(hailo.get_roi_from_buffer(buffer).get_stream_id(), late)
+        return Gst.PadProbeReturn.DROP if late else Gst.PadProbeReturn.OK
+
+    def count(self, stream_id, dropped):
+        stream_stats = self.stats.get(stream_id)
+        if stream_stats is None:
+            stream_stats = self.stats[stream_id] = {"frames": 0, "dropped": 0}
+        stream_stats["frames"] += 1
+        if dropped:
+            stream_stats["dropped"] += 1
+        if stream_stats["frames"] % DEADLINE_STATS_LOG_INTERVAL == 0:
+            hailo_logger.debug(f"Frame deadline stats: {self.get_stats()}")
+
+    def get_stats(self) -> dict:
+        """Returns the frames and dropped frames per source ('' for single-source pipelines)."""
+        return {stream_id: dict(stream_stats) for stream_id, stream_stats in self.stats.items()}
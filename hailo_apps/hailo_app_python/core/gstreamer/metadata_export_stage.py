@@ -0,0 +1,92 @@
+# region imports
+# Standard library imports
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+from hailo_apps.hailo_app_python.core.common.metadata_export import (
+    DEFAULT_EXPORT_BATCH_SIZE,
+    MetadataExportWorker,
+    create_metadata_sink,
+)
+from hailo_apps.hailo_app_python.core.common.metadata_utils import roi_to_dict
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+class MetadataExportStage:
+    """Exports the detections of every frame to a JSONL file, a Unix socket or UDP.
+
+    A probe on the export element (see METADATA_EXPORT_PIPELINE) reads the HailoROI into a compact
+    record: frame index, pts, stream_id and detections with classifications, track ids and
+    landmarks. Serialization and I/O run in a MetadataExportWorker thread; records are dropped and
+    counted rather than stalling the pipeline when the destination cannot keep up.
+
+    Args:
+        sink: The destination (see create_metadata_sink).
+        element_name (str): Element whose src pad is probed. Falls back to 'identity_callback' when
+            the pipeline has no such element. Defaults to 'metadata_export'.
+        batch_size (int): Maximum records written per batch. Defaults to 32.
+    """
+
+    def __init__(self, sink, element_name="metadata_export", batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+        self.worker = MetadataExportWorker(sink, batch_size=batch_size)
+        self.element_name = element_name
+        self.frame_index = 0
+
+    def attach(self, pipeline) -> bool:
+        """Adds the export probe to the pipeline and starts the writer thread.
+        Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if the probe was attached.
+        """
+        element = pipeline.get_by_name(self.element_name)
+        if element is None:
+            element = pipeline.get_by_name("identity_callback")
+        if element is None:
+            hailo_logger.warning(f"'{self.element_name}' not found; metadata export disabled")
+            return False
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._export_probe)
+        self.worker.start()
+        hailo_logger.debug(f"Metadata export to {self.worker.sink!r} attached to '{element.get_name()}'")
+        return True
+
+    def _export_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        self.frame_index += 1
+        record = {"frame": self.frame_index}
+        if buffer.pts != Gst.CLOCK_TIME_NONE:
+            record["pts"] = buffer.pts
+        record.update(roi_to_dict(hailo.get_roi_from_buffer(buffer)))
+        self.worker.submit(record)
+        return Gst.PadProbeReturn.OK
+
+    def get_stats(self) -> dict:
+        return self.worker.get_stats()
+
+    def close(self):
+        self.worker.stop()
+
+
+def create_metadata_export_stage(options_menu):
+    """Creates a MetadataExportStage from the parsed CLI options (--metadata-export).
+
+    Returns:
+        MetadataExportStage or None: None when metadata export is disabled.
+    """
+    spec = getattr(options_menu, "metadata_export", None)
+    if not spec:
+        return None
+    sink = create_metadata_sink(spec)
+    hailo_logger.info(f"Exporting detection metadata to {sink!r}")
+    return MetadataExportStage(sink)
@@ -0,0 +1,123 @@
+# region imports
+# Standard library imports
+import re
+import shlex
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+# Queue properties that are combined when two queues are merged; any other property (e.g. leaky)
+# must be equal in both queues
+QUEUE_SIZE_PROPERTIES = ("max-size-buffers", "max-size-bytes", "max-size-time")
+# A source element (filesrc, v4l2src, appsrc, rtspsrc...) runs its own streaming thread
+_SOURCE_ELEMENT_RE = re.compile(r"(?:^|\s)[a-z0-9]+src(?=\s|$)")
+
+
+def split_pipeline_string(pipeline_string):
+    """Splits a gst-launch pipeline description on the links ('!') outside quoted values.
+
+    Returns:
+        list: The segments between links, unstripped.
+    """
+    segments, current, quote = [], [], None
+    for char in pipeline_string:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "!":
+            segments.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    segments.append("".join(current))
+    return segments
+
+
+def _parse_queue(segment):
+    """Returns the properties of a segment made of a single queue element, or None."""
+    try:
+        words = shlex.split(segment)
+    except ValueError:
+        return None
+    if not words or words[0] != "queue" or not all("=" in word for word in words[1:]):
+        # Not a queue, or more than a queue (e.g. a pad reference starting a new branch)
+        return None
+    return dict(word.split("=", 1) for word in words[1:])
+
+
+def _is_referenced(pipeline_string, name):
+    """Returns True if an element name is used as a pad reference ('name.' or 'name.pad')."""
+    return re.search(rf"(?<![\w.=-]){re.escape(name)}\.", pipeline_string) is not None
+
+
+def _merge_queues(upstream, downstream):
+    """Returns the properties of a queue replacing two adjacent queues, or None if they differ in
+    behaviour. The downstream queue (the one owned by the helper it feeds) keeps its name; the sizes
+    are the largest of the two (0 is unlimited)."""
+    other_keys = (set(upstream) | set(downstream)) - {"name", *QUEUE_SIZE_PROPERTIES}
+    if any(upstream.get(key) != downstream.get(key) for key in other_keys):
+        return None
+    merged = dict(downstream)
+    for key in QUEUE_SIZE_PROPERTIES:
+        values = [int(properties[key]) for properties in (upstream, downstream) if key in properties]
+        if values:
+            merged[key] = str(0 if 0 in values else max(values))
+    return merged
+
+
+def count_streaming_threads(pipeline_string):
+    """Estimates the streaming threads of a pipeline description: one per queue and one per source
+    element."""
+    segments = split_pipeline_string(pipeline_string)
+    queues = sum(1 for segment in segments if segment.split()[:1] == ["queue"])
+    sources = sum(len(_SOURCE_ELEMENT_RE.findall(segment)) for segment in segments)
+    return queues + sources
+
+
+def coalesce_queues(pipeline_string):
+    """Collapses runs of directly linked queues into a single queue.
+
+    Composed helpers often link a helper's output queue straight into the next helper's input queue
+    (e.g. TRACKER_PIPELINE's 'hailo_tracker_q' into USER_CALLBACK_PIPELINE's 'identity_callback_q').
+    Every queue is a streaming thread and a buffering point, so the second one only adds a context
+    switch and latency. Queues are not merged when their properties other than the sizes differ
+    (e.g. a leaky queue) or when one of them is referenced as a pad ('name.').
+
+    Args:
+        pipeline_string (str): A gst-launch pipeline description.
+
+    Returns:
+        tuple: (optimized pipeline string, report dict with the queues and streaming threads before
+            and after, and the names of the removed queues).
+    """
+    segments = split_pipeline_string(pipeline_string)
+    output, removed = [], []
+    previous_queue = None  # properties of the last output segment if it is a queue
+    for segment in segments:
+        queue = _parse_queue(segment)
+        merged = None
+        if queue is not None and previous_queue is not None:
+            if not any(
+                _is_referenced(pipeline_string, q["name"]) for q in (previous_queue, queue) if "name" in q
+            ):
+                merged = _merge_queues(previous_queue, queue)
+        if merged is not None:
+            removed.append(previous_queue.get("name"))
+            output[-1] = " queue " + " ".join(f"{key}={value}" for key, value in merged.items()) + " "
+            previous_queue = merged
+            continue
+        output.append(segment)
+        previous_queue = queue
+    optimized = "!".join(output)
+    report = {
+        "queues_removed": len(removed),
+        "threads_before": count_streaming_threads(pipeline_string),
+        "threads_after": count_streaming_threads(optimized),
+        "removed": removed,
+    }
+    return optimized, report
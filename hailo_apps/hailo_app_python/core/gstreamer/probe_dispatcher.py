@@ -0,0 +1,151 @@
+# region imports
+# Standard library imports
+import time
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+PROBE_STATS_LOG_INTERVAL = 300  # frames
+# Handlers run by increasing order: app-internal handlers that add metadata the user callback reads
+# (e.g. face recognition) use a negative order, per-source handlers a positive one
+APP_CALLBACK_ORDER = 0
+
+
+class ProbeHandler:
+    """A Python function called by a ProbeDispatcher, with its timing statistics."""
+
+    __slots__ = ("name", "callback", "user_data", "stream_id", "order", "enabled", "calls", "total_ns", "max_ns")
+
+    def __init__(self, name, callback, user_data, stream_id, order):
+        self.name = name
+        self.callback = callback
+        self.user_data = user_data
+        self.stream_id = stream_id
+        self.order = order
+        self.enabled = True
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def get_stats(self) -> dict:
+        stats = {"enabled": self.enabled, "calls": self.calls}
+        if self.calls:
+            stats["mean_ms"] = round(self.total_ns / self.calls / 1e6, 3)
+            stats["max_ms"] = round(self.max_ns / 1e6, 3)
+        return stats
+
+
+class ProbeDispatcher:
+    """Runs several Python pad-probe handlers from a single probe on one identity element.
+
+    Every identity element used as a callback point costs a queue (a thread, a context switch and
+    buffering). With a dispatcher, all the handlers share the 'identity_callback' element and run in
+    order on each buffer. Handlers keep the pad-probe signature callback(pad, info, user_data); one
+    that returns Gst.PadProbeReturn.DROP drops the buffer and stops the chain. A handler registered
+    with a stream_id only runs on the buffers of that source (multi-source pipelines).
+
+    The time spent in each handler is measured, and handlers can be enabled or disabled at runtime
+    (set_enabled), e.g. to find which one eats the frame budget.
+    """
+
+    def __init__(self):
+        self._handlers = ()  # replaced, never mutated, so the streaming thread can iterate safely
+        self._filter_streams = False
+        self.frames = 0
+
+    def register(self, name, callback, user_data=None, stream_id=None, order=APP_CALLBACK_ORDER):
+        """Adds a handler, or replaces the handler of the same name (its statistics are kept).
+
+        Args:
+            name (str): Handler name, used in the statistics and by set_enabled().
+            callback: Function called as callback(pad, info, user_data).
+            user_data: Passed to the callback. Defaults to None.
+            stream_id (str): Only run on the buffers of this stream id. Defaults to None (all buffers).
+            order (int): Handlers run by increasing order, then by registration order. Defaults to 0.
+        """
+        handler = ProbeHandler(name, callback, user_data, stream_id, order)
+        previous = self.get_handler(name)
+        if previous is not None:
+            handler.enabled = previous.enabled
+            handler.calls, handler.total_ns, handler.max_ns = previous.calls, previous.total_ns, previous.max_ns
+        handlers = [existing for existing in self._handlers if existing.name != name]
+        handlers.append(handler)
+        # sorted() is stable: registration order is kept within the same order
+        self._handlers = tuple(sorted(handlers, key=lambda existing: existing.order))
+        self._filter_streams = any(existing.stream_id is not None for existing in self._handlers)
+
+    def unregister(self, name):
+        self._handlers = tuple(handler for handler in self._handlers if handler.name != name)
+        self._filter_streams = any(handler.stream_id is not None for handler in self._handlers)
+
+    def get_handler(self, name):
+        for handler in self._handlers:
+            if handler.name == name:
+                return handler
+        return None
+
+    def set_enabled(self, name, enabled=True):
+        """Enables or disables a handler. Can be called from any thread while the pipeline runs."""
+        handler = self.get_handler(name)
+        if handler is None:
+            raise KeyError(f"No probe handler named '{name}'")
+        handler.enabled = enabled
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def attach(self, pipeline, element_name="identity_callback") -> bool:
+        """Adds the dispatching probe to the element's src pad. Must be called again after a
+        pipeline rebuild.
+
+        Returns:
+            bool: True if the probe was attached.
+        """
+        element = pipeline.get_by_name(element_name)
+        if element is None:
+            hailo_logger.warning(f"'{element_name}' not found; probe handlers disabled")
+            return False
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self.dispatch)
+        hailo_logger.debug(f"Probe handlers {[handler.name for handler in self._handlers]} attached to '{element_name}'")
+        return True
+
+    def dispatch(self, pad, info):
+        """The pad probe: runs the enabled handlers in order."""
+        stream_id = None
+        if self._filter_streams:
+            buffer = info.get_buffer()
+            if buffer is not None:
+                # Quotes of a quoted config-path (e.g. config-path='src_0') may remain in the stream id
+                stream_id = hailo.get_roi_from_buffer(buffer).get_stream_id().strip("'\"")
+        result = Gst.PadProbeReturn.OK
+        for handler in self._handlers:
+            if not handler.enabled or (handler.stream_id is not None and handler.stream_id != stream_id):
+                continue
+            start = time.perf_counter_ns()
+            handler_result = handler.callback(pad, info, handler.user_data)
+            elapsed = time.perf_counter_ns() - start
+            handler.calls += 1
+            handler.total_ns += elapsed
+            if elapsed > handler.max_ns:
+                handler.max_ns = elapsed
+            if handler_result == Gst.PadProbeReturn.DROP:
+                result = Gst.PadProbeReturn.DROP
+                break
+        self.frames += 1
+        if self.frames % PROBE_STATS_LOG_INTERVAL == 0:
+            hailo_logger.debug(f"Probe handler stats: {self.get_stats()}")
+        return result
+
+    def get_stats(self) -> dict:
+        """Returns the calls and the mean and maximum time (ms) of each handler."""
+        return {handler.name: handler.get_stats() for handler in self._handlers}
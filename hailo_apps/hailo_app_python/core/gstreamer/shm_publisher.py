@@ -0,0 +1,91 @@
+# region imports
+# Standard library imports
+
+# Third-party imports
+import gi
+
+gi.require_version("Gst", "1.0")
+import hailo
+from gi.repository import Gst
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_pad
+from hailo_apps.hailo_app_python.core.common.hailo_logger import get_logger
+from hailo_apps.hailo_app_python.core.common.metadata_utils import roi_to_json_bytes
+from hailo_apps.hailo_app_python.core.common.shm_frames import (
+    DEFAULT_SHM_SLOTS,
+    SharedMemoryFrameWriter,
+)
+
+hailo_logger = get_logger(__name__)
+# endregion imports
+
+
+class SharedMemoryPublisher:
+    """Publishes the frames of a pipeline, with their detections, to a shared-memory frame ring.
+
+    A probe on an element's src pad copies each frame into the ring together with its detections
+    serialized from the HailoROI. Other local processes read them with SharedMemoryFrameReader
+    (core/common/shm_frames.py) as zero-copy numpy arrays. The frames keep the negotiated caps.
+
+    Args:
+        shm_name (str): Shared-memory segment name.
+        num_slots (int): Number of frames in the ring. Defaults to 4.
+        element_name (str): Element whose src pad is probed. Defaults to 'identity_callback', so the
+            published metadata includes what the user callback added.
+    """
+
+    def __init__(self, shm_name, num_slots=DEFAULT_SHM_SLOTS, element_name="identity_callback"):
+        self.writer = SharedMemoryFrameWriter(shm_name, num_slots=num_slots)
+        self.element_name = element_name
+
+    def attach(self, pipeline) -> bool:
+        """Adds the publishing probe to the pipeline. Must be called again after a pipeline rebuild.
+
+        Returns:
+            bool: True if the probe was attached.
+        """
+        element = pipeline.get_by_name(self.element_name)
+        if element is None:
+            hailo_logger.warning(f"'{self.element_name}' not found; shared memory output disabled")
+            return False
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._publish_probe)
+        hailo_logger.debug(f"Shared memory publisher attached to '{self.element_name}'")
+        return True
+
+    def _publish_probe(self, pad, info):
+        buffer = info.get_buffer()
+        if buffer is None:
+            return Gst.PadProbeReturn.OK
+        format, width, height = get_caps_from_pad(pad)
+        if format is None:
+            return Gst.PadProbeReturn.OK
+        pts = None if buffer.pts == Gst.CLOCK_TIME_NONE else buffer.pts
+        metadata = roi_to_json_bytes(hailo.get_roi_from_buffer(buffer), pts=pts)
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            return Gst.PadProbeReturn.OK
+        try:
+            self.writer.write(map_info.data, format, width, height, pts=pts, metadata=metadata)
+        finally:
+            buffer.unmap(map_info)
+        return Gst.PadProbeReturn.OK
+
+    def get_stats(self) -> dict:
+        return self.writer.get_stats()
+
+    def close(self):
+        self.writer.close()
+
+
+def create_shm_publisher(options_menu):
+    """Creates a SharedMemoryPublisher from the parsed CLI options (--shm-output).
+
+    Returns:
+        SharedMemoryPublisher or None: None when shared memory output is disabled.
+    """
+    shm_name = getattr(options_menu, "shm_output", None)
+    if not shm_name:
+        return None
+    hailo_logger.info(f"Publishing frames and detections to shared memory '{shm_name}'")
+    return SharedMemoryPublisher(shm_name, num_slots=getattr(options_menu, "shm_slots", DEFAULT_SHM_SLOTS))
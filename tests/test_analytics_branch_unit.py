@@ -0,0 +1,92 @@
+# region imports
+# Standard library imports
+import threading
+
+# Third-party imports
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer.analytics_branch import AnalyticsConsumer
+from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    ANALYTICS_BRANCH_PIPELINE,
+)
+# endregion imports
+
+
+class TestAnalyticsBranchPipeline:
+    """Test cases for the analytics branch helper."""
+
+    def test_branch_is_leaky_and_keeps_newest_frame(self):
+        pipeline = ANALYTICS_BRANCH_PIPELINE()
+        assert pipeline.startswith("tee name=analytics_sink_tee ")
+        analytics_branch, main_branch = pipeline.split("analytics_sink_tee. ! ")[1:]
+        assert "leaky=downstream max-size-buffers=1" in analytics_branch
+        assert "appsink name=analytics_sink emit-signals=true drop=true max-buffers=1" in analytics_branch
+        # The main branch is a plain queue the next element is linked to
+        assert main_branch.startswith("queue name=analytics_sink_main_q leaky=no")
+
+    def test_rate_and_size(self):
+        pipeline = ANALYTICS_BRANCH_PIPELINE(max_fps=5, frame_size=(320, 240))
+        assert "max-rate=5" in pipeline
+        assert "video/x-raw, format=RGB, width=320, height=240" in pipeline
+        assert "videorate" not in ANALYTICS_BRANCH_PIPELINE()
+
+    @pytest.mark.parametrize("fps", [0.5, 2.5, -1])
+    def test_rate_must_be_whole_max_rate(self, fps):
+        # videorate max-rate is an integer >= 1: 0.5 would become the invalid max-rate=0
+        with pytest.raises(ValueError):
+            ANALYTICS_BRANCH_PIPELINE(max_fps=fps)
+
+    def test_analytics_fps_option(self):
+        from hailo_apps.hailo_app_python.core.common.core import get_default_parser
+
+        parser = get_default_parser()
+        assert parser.parse_args(["--analytics-fps", "5"]).analytics_fps == 5
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--analytics-fps", "0.5"])
+
+
+class TestAnalyticsConsumer:
+    """Test cases for the analytics consumer thread."""
+
+    def test_only_newest_frame_is_processed(self):
+        started, release = threading.Event(), threading.Event()
+        processed = []
+
+        def callback(frame, metadata):
+            processed.append(frame)
+            if frame == 0:
+                started.set()
+                release.wait(timeout=2.0)
+
+        consumer = AnalyticsConsumer(callback)
+        consumer.start()
+        consumer.submit(0, {})
+        assert started.wait(timeout=2.0)
+        # Frames 1 and 2 arrive while frame 0 is processed: 1 is replaced by 2
+        consumer.submit(1, {})
+        consumer.submit(2, {})
+        release.set()
+        consumer.stop()
+        assert processed == [0, 2]
+        stats = consumer.get_stats()
+        assert stats["frames_received"] == 3
+        assert stats["frames_processed"] == 2
+        assert stats["frames_dropped"] == 1
+
+    def test_callback_errors_do_not_stop_the_thread(self):
+        processed = []
+
+        def callback(frame, metadata):
+            if frame == 0:
+                raise RuntimeError("analytics failed")
+            processed.append(frame)
+
+        consumer = AnalyticsConsumer(callback)
+        consumer.start()
+        consumer.submit(0, {})
+        consumer.stop()
+        consumer.start()
+        consumer.submit(1, {})
+        consumer.stop()
+        assert processed == [1]
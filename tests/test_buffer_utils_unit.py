@@ -0,0 +1,171 @@
+# region imports
+# Standard library imports
+from types import SimpleNamespace
+
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common import buffer_utils
+from hailo_apps.hailo_app_python.core.common.buffer_utils import (
+    NV12_DRAW_LUMA,
+    draw_color,
+    map_writable_frame,
+    nv12_to_rgb,
+)
+# endregion imports
+
+
+class FakeMapInfo:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeBuffer:
+    """A buffer whose memory is a Python object (bytearray: writable, bytes: read-only copy), with
+    an optional video meta (per-plane offset and stride lists)."""
+
+    def __init__(self, data, writable=True, meta=None):
+        self.data = data
+        self.writable = writable
+        self.meta = meta
+        self.unmapped = False
+
+    def map(self, flags):
+        return self.writable, FakeMapInfo(self.data)
+
+    def unmap(self, map_info):
+        self.unmapped = True
+
+
+class FakeVideoInfo:
+    """GStreamer's default layout for the formats map_writable_frame supports: rows aligned to 4 bytes."""
+
+    @classmethod
+    def new(cls):
+        return cls()
+
+    def set_format(self, format, width, height):
+        pixel_bytes = 3 if format == "RGB" else 1
+        self.offset = [0]
+        self.stride = [(width * pixel_bytes + 3) // 4 * 4]
+        return True
+
+
+FakeGstVideo = SimpleNamespace(
+    buffer_get_video_meta=lambda buffer: buffer.meta,
+    VideoInfo=FakeVideoInfo,
+    VideoFormat=SimpleNamespace(from_string=lambda format: format),
+)
+
+
+def make_nv12(y, u, v, height=4, width=6):
+    y_plane = np.full((height, width), y, dtype=np.uint8)
+    uv_plane = np.empty((height // 2, width // 2, 2), dtype=np.uint8)
+    uv_plane[..., 0] = u
+    uv_plane[..., 1] = v
+    return y_plane, uv_plane
+
+
+class TestNv12ToRgb:
+    """Test cases for the NV12 to RGB frame helper."""
+
+    @pytest.mark.parametrize(
+        "yuv, expected",
+        [
+            ((16, 128, 128), (0, 0, 0)),
+            ((235, 128, 128), (255, 255, 255)),
+            ((126, 128, 128), (128, 128, 128)),
+            ((82, 90, 240), (255, 0, 0)),
+            ((41, 240, 110), (0, 0, 255)),
+        ],
+    )
+    def test_bt601_colors(self, yuv, expected):
+        rgb = nv12_to_rgb(*make_nv12(*yuv))
+        assert rgb.shape == (4, 6, 3)
+        assert rgb.dtype == np.uint8
+        assert np.all(np.abs(rgb.astype(int) - expected) <= 2)
+
+    def test_chroma_covers_2x2_blocks(self):
+        y_plane, uv_plane = make_nv12(126, 128, 128)
+        uv_plane[0, 1] = (90, 240)  # reddish chroma for rows 0-1, columns 2-3
+        rgb = nv12_to_rgb(y_plane, uv_plane)
+        assert np.all(rgb[:2, 2:4, 0] > rgb[:2, 2:4, 2])
+        assert np.all(rgb[:, :2] == rgb[0, 0])
+        assert np.all(rgb[2:, 2:4] == rgb[0, 0])
+
+
+class TestMapWritableFrame:
+    """Test cases for in-place drawing on buffer memory."""
+
+    @pytest.fixture(autouse=True)
+    def fake_gst_video(self, monkeypatch):
+        monkeypatch.setattr(buffer_utils, "GstVideo", FakeGstVideo)
+
+    def test_rgb_view_writes_into_buffer_with_row_padding(self):
+        # 5 pixels * 3 bytes = 15, padded to 16 bytes per row
+        buffer = FakeBuffer(bytearray(16 * 2))
+        with map_writable_frame(buffer, "RGB", 5, 2) as frame:
+            assert frame.shape == (2, 5, 3)
+            frame[1, 0] = (1, 2, 3)
+        assert buffer.data[16:19] == bytearray([1, 2, 3])
+        assert buffer.unmapped
+
+    def test_rgb_view_uses_video_meta_stride(self):
+        # 4 pixels * 3 bytes = 12 (already 4-byte aligned), padded to 32 bytes per row by the producer
+        meta = SimpleNamespace(offset=[0], stride=[32])
+        buffer = FakeBuffer(bytearray(32 * 3), meta=meta)
+        with map_writable_frame(buffer, "RGB", 4, 3) as frame:
+            assert frame.shape == (3, 4, 3)
+            frame[2, 1] = (1, 2, 3)
+        assert buffer.data[2 * 32 + 3 : 2 * 32 + 6] == bytearray([1, 2, 3])
+        assert sum(buffer.data) == 6
+
+    def test_nv12_luma_plane_uses_video_meta_stride_and_offset(self):
+        # 6x4 NV12 frame with 16-byte rows after an 8-byte header; the UV plane follows the Y plane
+        meta = SimpleNamespace(offset=[8, 8 + 16 * 4], stride=[16, 16])
+        buffer = FakeBuffer(bytearray(8 + 16 * 4 + 16 * 2), meta=meta)
+        with map_writable_frame(buffer, "NV12", 6, 4) as frame:
+            assert frame.shape == (4, 6)
+            frame[:] = 200
+        for row in range(4):
+            start = 8 + row * 16
+            assert all(value == 200 for value in buffer.data[start : start + 6])
+            assert all(value == 0 for value in buffer.data[start + 6 : start + 16])  # row padding
+        assert all(value == 0 for value in buffer.data[:8])
+        assert all(value == 0 for value in buffer.data[8 + 16 * 4 :])  # chroma untouched
+
+    def test_nv12_yields_luma_plane(self):
+        buffer = FakeBuffer(bytearray(4 * 2 * 3 // 2))
+        with map_writable_frame(buffer, "NV12", 4, 2) as frame:
+            assert frame.shape == (2, 4)
+            frame[:] = 200
+        assert all(value == 200 for value in buffer.data[:8])
+        assert all(value == 0 for value in buffer.data[8:])
+
+    def test_draw_color_on_nv12_luma_plane(self):
+        buffer = FakeBuffer(bytearray(16 * 8 * 3 // 2))
+        with map_writable_frame(buffer, "NV12", 16, 8) as frame:
+            assert draw_color(frame, (0, 255, 0)) == NV12_DRAW_LUMA
+            cv2 = pytest.importorskip("cv2")
+            cv2.circle(frame, (8, 4), 2, draw_color(frame, (0, 255, 0)), -1)
+        assert buffer.data[4 * 16 + 8] == NV12_DRAW_LUMA
+        assert max(buffer.data[16 * 8 :]) == 0  # chroma untouched
+
+    def test_draw_color_on_rgb(self):
+        buffer = FakeBuffer(bytearray(16 * 2))
+        with map_writable_frame(buffer, "RGB", 5, 2) as frame:
+            assert draw_color(frame, (0, 255, 0)) == (0, 255, 0)
+
+    @pytest.mark.parametrize(
+        "buffer, format",
+        [
+            (FakeBuffer(bytearray(16), writable=False), "RGB"),
+            (FakeBuffer(bytes(16)), "RGB"),
+            (FakeBuffer(bytearray(16)), "YUYV"),
+        ],
+    )
+    def test_unavailable(self, buffer, format):
+        with map_writable_frame(buffer, format, 4, 1) as frame:
+            assert frame is None
@@ -0,0 +1,617 @@
+# region imports
+# Standard library imports
+import json
+import time
+
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.embedding_cache import EmbeddingCache
+# endregion imports
+
+DIM = 8
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_record(global_id, embedding, label="person"):
+    return {
+        "global_id": global_id,
+        "label": label,
+        "avg_embedding": embedding,
+        "classificaiton_confidence_threshold": 0.5,
+    }
+
+
+def open_db_handler(database_dir, **kwargs):
+    pytest.importorskip("lancedb")
+    from hailo_apps.hailo_app_python.core.common.db_handler import DatabaseHandler, Record
+
+    return DatabaseHandler(
+        db_name="test.db",
+        table_name="persons",
+        schema=Record,
+        threshold=0.5,
+        database_dir=str(database_dir),
+        samples_dir=str(database_dir),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    return open_db_handler(tmp_path)
+
+
+class TestEmbeddingCache:
+    """Test cases for the in-memory cosine search cache."""
+
+    def test_search_orders_by_cosine_similarity(self):
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((50, DIM)).astype(np.float32)
+        cache = EmbeddingCache()
+        cache.load([make_record(str(i), None) for i in range(50)], embeddings)
+        query = embeddings[7] * 3.0 + 0.01
+        results = cache.search(query, top_k=5)
+        expected = np.argsort(-(np.stack([unit(e) for e in embeddings]) @ unit(query)))[:5]
+        assert [result["global_id"] for result in results] == [str(i) for i in expected]
+        assert results[0]["_distance"] == pytest.approx(0.0, abs=1e-3)
+        assert np.allclose(results[0]["avg_embedding"], embeddings[7], atol=1e-5)
+
+    def test_incremental_updates(self):
+        cache = EmbeddingCache()
+        cache.load([], np.zeros((0, DIM)))
+        basis = np.eye(DIM, dtype=np.float32)
+        for i in range(3):
+            cache.upsert(make_record(str(i), basis[i]))
+        assert cache.search(basis[1])[0]["global_id"] == "1"
+
+        cache.upsert(make_record("1", basis[5]))
+        assert len(cache) == 3
+        assert cache.search(basis[5])[0]["global_id"] == "1"
+
+        cache.remove("0")
+        assert len(cache) == 2
+        assert cache.search(basis[2])[0]["global_id"] == "2"
+        assert {result["global_id"] for result in cache.search(basis[0], top_k=5)} == {"1", "2"}
+
+        cache.update_fields("2", label="Bob")
+        assert cache.search(basis[2])[0]["label"] == "Bob"
+
+    def test_batch_matches_single_searches(self):
+        rng = np.random.default_rng(2)
+        embeddings = rng.standard_normal((30, DIM)).astype(np.float32)
+        cache = EmbeddingCache()
+        cache.load([make_record(str(i), None) for i in range(30)], embeddings)
+        queries = rng.standard_normal((4, DIM)).astype(np.float32)
+        batch = cache.search_batch(queries, top_k=3)
+        assert len(batch) == 4
+        for query, results in zip(queries, batch):
+            single = cache.search(query, top_k=3)
+            assert [r["global_id"] for r in results] == [r["global_id"] for r in single]
+            assert [r["_distance"] for r in results] == pytest.approx([r["_distance"] for r in single])
+
+    def test_updates_ignored_until_loaded(self):
+        cache = EmbeddingCache()
+        cache.upsert(make_record("0", np.ones(DIM)))
+        assert len(cache) == 0 and not cache.loaded
+
+    def test_updates_during_load_are_replayed(self):
+        basis = np.eye(DIM, dtype=np.float32)
+        cache = EmbeddingCache()
+        token = cache.begin_load()
+        # Mutations made while the snapshot (records 0 and 1) is read
+        cache.upsert(make_record("2", basis[2]))
+        cache.update_fields("0", label="Alice")
+        cache.remove("1")
+        assert cache.load([make_record("0", None), make_record("1", None)], basis[:2], token=token)
+        assert len(cache) == 2
+        assert cache.search(basis[2])[0]["global_id"] == "2"
+        assert cache.search(basis[0])[0]["label"] == "Alice"
+
+        token = cache.begin_load()
+        cache.invalidate()
+        assert not cache.load([make_record("0", None)], basis[:1], token=token)
+        assert not cache.loaded
+
+    @pytest.mark.parametrize("dtype", ["float16", "int8"])
+    def test_compact_storage_matches_float32(self, dtype):
+        rng = np.random.default_rng(3)
+        embeddings = rng.standard_normal((200, 64)).astype(np.float32)
+        records = [make_record(str(i), None) for i in range(200)]
+        exact, compact = EmbeddingCache(), EmbeddingCache(dtype=dtype)
+        exact.load(records, embeddings)
+        compact.load(records, embeddings)
+        # About 1/2 (float16) or 1/4 (int8) of float32, plus a float32 norm (and scale) per row
+        assert compact.nbytes < exact.nbytes / (3 if dtype == "int8" else 1.9)
+        queries = embeddings[:20] + 0.1 * rng.standard_normal((20, 64)).astype(np.float32)
+        for expected, found in zip(exact.search_batch(queries), compact.search_batch(queries)):
+            assert found[0]["global_id"] == expected[0]["global_id"]
+            assert found[0]["_distance"] == pytest.approx(expected[0]["_distance"], abs=0.02)
+
+    def test_rerank_restores_exact_distances(self):
+        rng = np.random.default_rng(4)
+        # Look-alike records, closer than the int8 quantization error
+        embeddings = rng.standard_normal((1, DIM)).astype(np.float32) + 0.002 * rng.standard_normal((20, DIM)).astype(np.float32)
+        source = {str(i): embedding for i, embedding in enumerate(embeddings)}
+        cache = EmbeddingCache(dtype="int8", rerank_source=lambda global_ids: {g: source[g] for g in global_ids}, rerank_candidates=20)
+        cache.load([make_record(str(i), None) for i in range(20)], embeddings)
+        for i in range(20):
+            result = cache.search(embeddings[i])[0]
+            assert result["global_id"] == str(i)
+            assert result["_distance"] == pytest.approx(0.0, abs=1e-6)
+            assert np.allclose(result["avg_embedding"], embeddings[i])
+
+
+class TestDatabaseHandlerSearch:
+    """Test cases for DatabaseHandler.search_record with the embedding cache."""
+
+    def test_cache_follows_mutations(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        alice = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1, label="Alice")
+        assert db_handler.search_record(basis[0])["label"] == "Alice"
+        assert db_handler.embedding_cache.loaded
+
+        bob = db_handler.create_record(embedding=basis[1], sample=None, timestamp=2, label="Bob")
+        assert db_handler.search_record(basis[1])["global_id"] == bob["global_id"]
+
+        db_handler.insert_new_sample(
+            record=db_handler.get_record_by_id(bob["global_id"]), embedding=basis[2], sample=None, timestamp=3
+        )
+        match = db_handler.search_record(basis[1] + basis[2])
+        assert match["label"] == "Bob"
+        assert db_handler.get_records_num_samples(bob["global_id"]) == 2
+
+        db_handler.delete_record(alice["global_id"])
+        assert db_handler.search_record(basis[0])["label"] == "Unknown"
+
+    def test_matches_lancedb_search(self, db_handler):
+        rng = np.random.default_rng(1)
+        embeddings = rng.standard_normal((20, 512)).astype(np.float32)
+        for i, embedding in enumerate(embeddings):
+            db_handler.create_record(embedding=embedding, sample=None, timestamp=i, label=f"p{i}")
+        for embedding in embeddings[:5] + 0.2 * rng.standard_normal((5, 512)).astype(np.float32):
+            cached = db_handler.search_record(embedding)
+            cache, db_handler.embedding_cache = db_handler.embedding_cache, None
+            direct = db_handler.search_record(embedding)
+            db_handler.embedding_cache = cache
+            assert cached["global_id"] == direct["global_id"]
+            assert cached["_distance"] == pytest.approx(direct["_distance"], abs=1e-4)
+
+    def test_record_created_during_cache_load(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        db_handler.create_record(embedding=basis[0], sample=None, timestamp=1, label="Alice")
+        read_table = db_handler.tbl_records.to_arrow
+
+        def read_then_create():
+            table = read_table()
+            # Another thread creates a record after the snapshot is read
+            db_handler.create_record(embedding=basis[1], sample=None, timestamp=2, label="Bob")
+            return table
+
+        db_handler.tbl_records.to_arrow = read_then_create
+        db_handler.load_embedding_cache()
+        db_handler.tbl_records.to_arrow = read_table
+        assert db_handler.search_record(basis[1])["label"] == "Bob"
+
+    def test_search_records_applies_thresholds(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        alice = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1, label="Alice")
+        db_handler.create_record(embedding=basis[1], sample=None, timestamp=2, label="Bob")
+        results = db_handler.search_records(np.stack([basis[1], basis[3], basis[0] + 0.1 * basis[3]]))
+        assert [result["label"] for result in results] == ["Bob", "Unknown", "Alice"]
+        assert results[2]["global_id"] == alice["global_id"]
+        assert results[1]["global_id"] not in (alice["global_id"], results[0]["global_id"])
+        # A frame without faces
+        assert db_handler.search_records(np.zeros((0, 512), dtype=np.float32)) == []
+        assert db_handler.embedding_cache.search_batch(np.zeros((0, 512), dtype=np.float32)) == []
+
+
+    def test_float16_storage_and_int8_cache(self, tmp_path):
+        handler = open_db_handler(tmp_path, embedding_storage="float16", embedding_cache_dtype="int8", rerank_embeddings=True)
+        assert str(handler.tbl_records.schema.field("avg_embedding").type.value_type) == "halffloat"
+        assert str(handler.tbl_samples.schema.field("embedding").type.value_type) == "halffloat"
+        rng = np.random.default_rng(5)
+        embeddings = rng.standard_normal((10, 512)).astype(np.float32)
+        records = [handler.create_record(embedding=e, sample=None, timestamp=i) for i, e in enumerate(embeddings)]
+        for record, embedding in zip(records, embeddings):
+            match = handler.search_record(embedding + 0.01)
+            assert match["global_id"] == record["global_id"]
+            assert np.allclose(match["avg_embedding"], embedding, atol=1e-2)
+        assert handler.get_stats()["embedding_cache"]["dtype"] == "int8"
+        handler.close()
+        with pytest.raises(ValueError):
+            open_db_handler(tmp_path, embedding_storage="int8")
+
+
+class TestDatabaseHandlerSamples:
+    """Test cases for the samples table."""
+
+    def test_samples_and_average_embedding(self, db_handler, tmp_path):
+        basis = np.eye(512, dtype=np.float32)
+        sample_file = tmp_path / "first.jpeg"
+        sample_file.write_bytes(b"jpeg")
+        record = db_handler.create_record(embedding=basis[0], sample=str(sample_file), timestamp=1, label="Alice")
+        db_handler.insert_new_sample(record=record, embedding=basis[1], sample=None, timestamp=2)
+
+        stored = db_handler.get_record_by_id(record["global_id"])
+        assert [sample["timestamp"] for sample in stored["samples"]] == [1, 2]
+        assert np.allclose(stored["avg_embedding"], (basis[0] + basis[1]) / 2)
+        assert "samples" not in db_handler.get_record_by_id(record["global_id"], with_samples=False)
+
+        assert db_handler.remove_sample_by_id(record["global_id"], stored["samples"][0]["id"]) is False
+        assert not sample_file.exists()
+        assert np.allclose(db_handler.get_record_by_id(record["global_id"])["avg_embedding"], basis[1])
+        assert db_handler.search_record(basis[1])["label"] == "Alice"
+
+        assert db_handler.remove_sample_by_id(record["global_id"], stored["samples"][1]["id"]) is True
+        assert db_handler.get_record_by_id(record["global_id"]) is None
+        assert db_handler.search_record(basis[1])["label"] == "Unknown"
+
+    def test_running_mean(self, tmp_path):
+        rng = np.random.default_rng(3)
+        embeddings = rng.standard_normal((10, 512)).astype(np.float32)
+        for interval in (0, 4):
+            db_handler = open_db_handler(tmp_path / str(interval))
+            db_handler.avg_recompute_interval = interval
+            record = db_handler.create_record(embedding=embeddings[0], sample=None, timestamp=0)
+            for i, embedding in enumerate(embeddings[1:], start=1):
+                db_handler.insert_new_sample(record=record, embedding=embedding, sample=None, timestamp=i)
+            stored = db_handler.get_record_by_id(record["global_id"])
+            assert stored["num_samples"] == 10
+            assert np.allclose(stored["avg_embedding"], embeddings.mean(axis=0), atol=1e-5)
+
+            db_handler.remove_sample_by_id(record["global_id"], stored["samples"][3]["id"])
+            stored = db_handler.get_record_by_id(record["global_id"])
+            assert stored["num_samples"] == 9
+            assert np.allclose(stored["avg_embedding"], np.delete(embeddings, 3, axis=0).mean(axis=0), atol=1e-5)
+
+    def test_adds_sample_count_to_older_tables(self, tmp_path):
+        db_handler = open_db_handler(tmp_path)
+        basis = np.eye(512, dtype=np.float32)
+        record = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1)
+        db_handler.insert_new_sample(record=record, embedding=basis[1], sample=None, timestamp=2)
+        db_handler.tbl_records.drop_columns(["num_samples"])
+
+        db_handler = open_db_handler(tmp_path)
+        assert db_handler.get_record_by_id(record["global_id"])["num_samples"] == 2
+
+    def test_migrates_samples_json(self, tmp_path):
+        lancedb = pytest.importorskip("lancedb")
+        pa = pytest.importorskip("pyarrow")
+        basis = np.eye(512, dtype=np.float32)
+        samples = [
+            {"embedding": basis[0].tolist(), "sample_path": None, "id": "s0"},
+            {"embedding": basis[1].tolist(), "sample_path": "/tmp/missing.jpeg", "id": "s1"},
+        ]
+        legacy = pa.table(
+            {
+                "global_id": ["g0"],
+                "label": ["Alice"],
+                "avg_embedding": pa.FixedSizeListArray.from_arrays(pa.array((basis[0] + basis[1]) / 2), 512),
+                "last_sample_recieved_time": [5],
+                "samples_json": [json.dumps(samples)],
+                "classificaiton_confidence_threshold": [0.5],
+                "value": [0.0],
+            }
+        )
+        lancedb.connect(str(tmp_path / "test.db")).create_table("persons", data=legacy)
+
+        db_handler = open_db_handler(tmp_path)
+        assert "samples_json" not in db_handler.tbl_records.schema.names
+        record = db_handler.get_record_by_id("g0")
+        assert [sample["id"] for sample in record["samples"]] == ["s0", "s1"]
+        assert np.allclose(record["samples"][1]["embedding"], basis[1])
+        assert db_handler.search_record(basis[0] + basis[1])["label"] == "Alice"
+
+        # Opening the migrated table again does not migrate twice
+        assert open_db_handler(tmp_path).get_records_num_samples("g0") == 2
+
+
+class TestDatabaseHandlerBulk:
+    """Test cases for the set-based maintenance operations."""
+
+    def test_clear_unknown_labels_keep_latest(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        now = int(time.time())
+        old = db_handler.create_record(embedding=basis[0], sample=None, timestamp=now - 100)
+        latest = db_handler.create_record(embedding=basis[1], sample=None, timestamp=now - 2)
+        for i, embedding in enumerate(basis[2:4]):
+            db_handler.insert_new_sample(record=latest, embedding=embedding, sample=None, timestamp=now - 1 + i)
+        alice = db_handler.create_record(embedding=basis[4], sample=None, timestamp=now - 100, label="Alice")
+        records_version = db_handler.tbl_records.version
+
+        db_handler.clear_unknown_labels_keep_latest()
+        assert db_handler.get_record_by_id(old["global_id"]) is None
+        kept = db_handler.get_record_by_id(latest["global_id"])
+        assert (kept["num_samples"], len(kept["samples"])) == (1, 1)
+        assert np.allclose(kept["avg_embedding"], basis[3])
+        assert db_handler.get_record_by_id(alice["global_id"]) is not None
+        assert db_handler.tbl_records.version == records_version + 2  # one delete, one update
+
+    def test_keep_only_last_sample_updates_cached_records_only(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        record = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1)
+        db_handler.insert_new_sample(record=record, embedding=basis[1], sample=None, timestamp=2)
+        db_handler.load_embedding_cache()
+        # Deleted from the cache by another thread
+        db_handler.embedding_cache.remove(record["global_id"])
+        db_handler.keep_only_last_sample(record["global_id"])
+        assert len(db_handler.embedding_cache) == 0
+
+    def test_thresholds_updated_in_one_commit(self, db_handler):
+        rng = np.random.default_rng(4)
+        records = [
+            db_handler.create_record(embedding=embedding, sample=None, timestamp=0)
+            for embedding in rng.standard_normal((5, 512)).astype(np.float32)
+        ]
+        global_ids = [record["global_id"] for record in records]
+        for record, embedding in zip(records[:3], rng.standard_normal((3, 512)).astype(np.float32)):
+            db_handler.insert_new_sample(record=record, embedding=embedding, sample=None, timestamp=1)
+        db_handler.load_embedding_cache()
+
+        records_version = db_handler.tbl_records.version
+        db_handler.update_classification_confidence_threshold_for_all(0.7)
+        assert db_handler.tbl_records.version == records_version + 1
+        assert {record["classificaiton_confidence_threshold"] for record in db_handler.get_all_records()} == {0.7}
+
+        db_handler.update_records_classificaiton_confidence_thresholds(global_ids, np.linspace(0.1, 0.5, 5))
+        assert db_handler.tbl_records.version == records_version + 2
+        for global_id, threshold in zip(global_ids, np.linspace(0.1, 0.5, 5)):
+            assert db_handler.get_records_classificaiton_confidence_threshold(global_id) == pytest.approx(threshold)
+        # The cached records follow: a match needs a similarity above the record's new threshold
+        assert db_handler.search_record(records[0]["avg_embedding"])["global_id"] == global_ids[0]
+
+        db_handler.calibrate_classification_confidence_threshold()
+        thresholds = [db_handler.get_records_classificaiton_confidence_threshold(global_id) for global_id in global_ids]
+        assert all(0.1 <= threshold <= 0.9 for threshold in thresholds)
+        assert thresholds[3] == thresholds[4] == pytest.approx(0.9)  # a single sample: no spread
+
+
+class TestCalibration:
+    """Test cases for the vectorized threshold calibration."""
+
+    def test_areas_match_per_record_pca(self, monkeypatch):
+        pytest.importorskip("lancedb")
+        from hailo_apps.hailo_app_python.core.common import calibration
+        from hailo_apps.hailo_app_python.core.common.db_handler import DatabaseHandler
+
+        rng = np.random.default_rng(5)
+        sizes = [1, 2, 3, 7, 7, 20, 40]
+        keys = np.repeat([f"id{i}" for i in range(len(sizes))], sizes)
+        vectors = rng.standard_normal((len(keys), 64)).astype(np.float32)
+        shuffle = rng.permutation(len(keys))
+        keys, vectors = keys[shuffle], vectors[shuffle]
+
+        expected = []
+        for key in np.unique(keys):
+            embeddings = vectors[keys == key]
+            if len(embeddings) < 2:
+                expected.append(0.0)
+                continue
+            reduced, _, _ = DatabaseHandler.perform_pca(None, embeddings, n_components=2)
+            std_dev = np.std(reduced, axis=0)
+            expected.append(np.pi * std_dev[0] * std_dev[1])
+        # Small chunks: several batched decompositions
+        monkeypatch.setattr(calibration, "CALIBRATION_CHUNK_ELEMENTS", 20 * 64)
+        unique_keys, areas = calibration.spread_areas(keys, vectors)
+        assert list(unique_keys) == sorted(set(keys))
+        assert np.allclose(areas, expected, rtol=1e-4, atol=1e-6)
+
+    def test_changed_only_calibration(self, tmp_path):
+        rng = np.random.default_rng(6)
+        db_handler = open_db_handler(tmp_path)
+        records = []
+        for scale in (0.1, 0.5, 1.0):
+            embeddings = rng.standard_normal((4, 512)).astype(np.float32) * scale
+            record = db_handler.create_record(embedding=embeddings[0], sample=None, timestamp=0)
+            for embedding in embeddings[1:]:
+                db_handler.insert_new_sample(record=record, embedding=embedding, sample=None, timestamp=1)
+            records.append(record)
+        assert db_handler.calibrate_classification_confidence_threshold(changed_only=True) == 3  # first: full
+        assert db_handler.calibrate_classification_confidence_threshold(changed_only=True) == 0
+        before = db_handler.get_records_classificaiton_confidence_threshold(records[0]["global_id"])
+        assert before == pytest.approx(0.9)  # the least spread
+
+        db_handler.insert_new_sample(
+            record=records[0], embedding=rng.standard_normal(512).astype(np.float32) * 5, sample=None, timestamp=2
+        )
+        assert db_handler.calibrate_classification_confidence_threshold(changed_only=True) == 1
+        incremental = {record["global_id"]: record["classificaiton_confidence_threshold"] for record in db_handler.get_all_records()}
+
+        full_handler = open_db_handler(tmp_path)
+        assert full_handler.calibrate_classification_confidence_threshold(changed_only=True) == 3
+        full = {record["global_id"]: record["classificaiton_confidence_threshold"] for record in full_handler.get_all_records()}
+        assert incremental == pytest.approx(full)
+        assert incremental[records[0]["global_id"]] < before
+
+
+class TestSampleRetention:
+    """Test cases for the bounded, diversity-based sample retention."""
+
+    def test_selection_skips_redundant_samples(self):
+        from hailo_apps.hailo_app_python.core.common.sample_retention import select_diverse_samples
+
+        basis = np.eye(DIM, dtype=np.float32)
+        # Three directions, the first one sampled four times
+        embeddings = np.stack([basis[0], basis[0] + 0.01 * basis[3], basis[1], basis[0] + 0.02 * basis[4], basis[2], basis[0]])
+        assert list(select_diverse_samples(embeddings, 3)) == [0, 2, 4]
+        assert list(select_diverse_samples(embeddings, 10)) == list(range(6))
+
+    def test_evicts_samples_and_files(self, tmp_path):
+        rng = np.random.default_rng(7)
+        db_handler = open_db_handler(tmp_path, max_samples_per_record=4)
+        db_handler.sample_retention.background = False
+        embeddings = rng.standard_normal((7, 512)).astype(np.float32)
+        paths = []
+        for i in range(7):
+            paths.append(tmp_path / f"sample_{i}.jpeg")
+            paths[-1].write_bytes(b"jpeg")
+        record = db_handler.create_record(embedding=embeddings[0], sample=str(paths[0]), timestamp=0)
+        for i in range(1, 7):
+            db_handler.insert_new_sample(record=record, embedding=embeddings[i], sample=str(paths[i]), timestamp=i)
+        assert db_handler.get_stats()["sample_retention"]["pending_records"] == 1
+
+        assert db_handler.sample_retention.run_pending() == 3
+        stored = db_handler.get_record_by_id(record["global_id"])
+        kept = [sample["sample_path"] for sample in stored["samples"]]
+        assert stored["num_samples"] == len(kept) == 4
+        assert sorted(str(path) for path in paths if path.exists()) == sorted(kept)
+        kept_embeddings = np.stack([sample["embedding"] for sample in stored["samples"]])
+        assert np.allclose(stored["avg_embedding"], kept_embeddings.mean(axis=0), atol=1e-6)
+
+        # A record deleted during a pass is not added back to the cache
+        db_handler.load_embedding_cache()
+        db_handler.insert_new_sample(record=record, embedding=embeddings[0], sample=None, timestamp=7)
+        db_handler.embedding_cache.remove(record["global_id"])
+        assert db_handler.sample_retention.run_pending() == 1
+        assert len(db_handler.embedding_cache) == 0
+
+        # Records above the bound when the database is opened are queued too
+        db_handler = open_db_handler(tmp_path, max_samples_per_record=2)
+        db_handler.close()
+        assert db_handler.get_stats()["sample_retention"]["evicted_samples"] == 2
+        assert db_handler.get_records_num_samples(record["global_id"]) == 2
+
+
+def vector_table(tmp_path, rows, dim=16, seed=0):
+    lancedb = pytest.importorskip("lancedb")
+    pa = pytest.importorskip("pyarrow")
+    return lancedb.connect(str(tmp_path / "index.db")).create_table("vectors", data=vector_rows(pa, rows, dim, seed))
+
+
+def vector_rows(pa, rows, dim, seed):
+    vectors = np.random.default_rng(seed).standard_normal(rows * dim).astype(np.float32)
+    return pa.table({"vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors), dim)})
+
+
+class TestVectorIndexManager:
+    """Test cases for the background vector index maintenance."""
+
+    def test_index_selection_by_size(self):
+        from hailo_apps.hailo_app_python.core.common.vector_index import select_vector_index
+
+        assert select_vector_index(100, 512) is None
+        assert select_vector_index(10_000, 512) == {"num_partitions": 100, "index_type": "IVF_FLAT"}
+        assert select_vector_index(250_000, 512) == {"num_partitions": 500, "index_type": "IVF_PQ", "num_sub_vectors": 32}
+
+    def test_build_then_update(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        from hailo_apps.hailo_app_python.core.common.vector_index import VectorIndexManager
+
+        table = vector_table(tmp_path, 300)
+        manager = VectorIndexManager(table, "vector", background=False)
+        assert manager.row_count == 300
+        assert manager.pending_action() == "build"
+        assert manager.maintain() == "build"
+        assert manager.get_stats()["unindexed_rows"] == 0
+        assert any("vector" in index.columns for index in table.list_indices())
+
+        table.add(vector_rows(pa, 20, 16, seed=1))
+        manager.rows_added(20)
+        assert manager.pending_action() is None  # a small fraction is scanned in full
+        assert manager.get_stats()["unindexed_rows"] == 20
+
+        table.add(vector_rows(pa, 40, 16, seed=2))
+        manager.rows_added(40)
+        assert manager.maintain() == "update"
+        assert manager.get_stats()["unindexed_rows"] == 0
+
+        table.add(vector_rows(pa, 400, 16, seed=3))
+        manager.rows_added(400)
+        assert manager.pending_action() == "build"
+
+    def test_rebuild_after_table_shrinks(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        from hailo_apps.hailo_app_python.core.common.vector_index import VectorIndexManager
+
+        table = vector_table(tmp_path, 600)
+        manager = VectorIndexManager(table, "vector", background=False)
+        assert manager.maintain() == "build"
+
+        table.delete("true")
+        manager.rows_removed()
+        assert manager.pending_action() is None
+        table.add(vector_rows(pa, 300, 16, seed=1))
+        manager.rows_added(300)
+        # Not an update of the partitions trained on the deleted rows
+        assert manager.pending_action() == "build"
+
+    def test_handler_counts_rows_without_reading_them(self, db_handler):
+        basis = np.eye(512, dtype=np.float32)
+        first = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1)
+        db_handler.create_record(embedding=basis[1], sample=None, timestamp=2)
+        assert db_handler.vector_index.row_count == 2
+        db_handler.delete_record(first["global_id"])
+        assert db_handler.get_stats()["vector_index"]["rows"] == 1
+        db_handler.close()
+
+
+class TestWriteBehind:
+    """Test cases for the write-behind queue and the table compaction."""
+
+    def test_writes_are_batched_until_flushed(self, tmp_path):
+        db_handler = open_db_handler(tmp_path, write_behind_interval=3600)
+        basis = np.eye(512, dtype=np.float32)
+        records_version = db_handler.tbl_records.version
+        record = db_handler.create_record(embedding=basis[0], sample=None, timestamp=1)
+        db_handler.insert_new_sample(record=record, embedding=basis[1], sample=None, timestamp=2)
+        db_handler.update_record_label(record["global_id"], "Alice")
+        assert db_handler.tbl_records.count_rows() == 0
+        pending = db_handler.get_record_by_id(record["global_id"], with_samples=False)
+        assert (pending["label"], pending["num_samples"]) == ("Alice", 2)
+        assert db_handler.get_stats()["write_behind"]["pending_samples"] == 2
+
+        db_handler.flush()
+        assert db_handler.search_record(basis[0] + basis[1])["label"] == "Alice"
+        assert db_handler.tbl_records.version == records_version + 1
+        stored = db_handler.get_record_by_id(record["global_id"])
+        assert (stored["label"], stored["num_samples"], len(stored["samples"])) == ("Alice", 2, 2)
+
+        # Updates of a written record are merged, then written by one merge_insert
+        db_handler.insert_new_sample(record=record, embedding=basis[2], sample=None, timestamp=3)
+        db_handler.update_record_label(record["global_id"], "Bob")
+        assert db_handler.get_record_by_id(record["global_id"], with_samples=False)["label"] == "Bob"
+        assert db_handler.get_stats()["write_behind"]["pending_updates"] == 1
+        db_handler.close()
+        stored = open_db_handler(tmp_path).get_record_by_id(record["global_id"])
+        assert (stored["label"], stored["num_samples"], len(stored["samples"])) == ("Bob", 3, 3)
+        assert np.allclose(stored["avg_embedding"], basis[:3].mean(axis=0), atol=1e-6)
+
+    def test_failed_flush_is_queued_again(self, tmp_path, monkeypatch):
+        db_handler = open_db_handler(tmp_path, write_behind_interval=3600)
+        queue = db_handler.write_behind
+        record = db_handler.create_record(embedding=np.eye(512)[0], sample=None, timestamp=1)
+
+        def failing_add(rows):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(queue.samples_table, "add", failing_add)
+        queue.flush()
+        assert queue.get_stats()["last_error"] == "disk full"
+        assert (queue.get_stats()["pending_records"], queue.get_stats()["pending_samples"]) == (0, 1)
+        monkeypatch.undo()
+        queue.flush()
+        assert db_handler.get_records_num_samples(record["global_id"]) == 1
+        assert "last_error" not in queue.get_stats()
+        db_handler.close()
+
+    def test_compaction_merges_fragments(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        from hailo_apps.hailo_app_python.core.common.write_behind import TableCompactor
+
+        table = vector_table(tmp_path, 10)
+        for seed in range(5):
+            table.add(vector_rows(pa, 10, 16, seed))
+        compactor = TableCompactor([table], interval=None, version_retention=0)
+        assert compactor.get_stats()["tables"]["vectors"]["fragments"] == 6
+        assert compactor.compact() == 1
+        stats = compactor.get_stats()["tables"]["vectors"]
+        assert (stats["fragments"], stats["versions"]) == (1, 1)
+        assert compactor.compact() == 0  # nothing written since
+        assert table.count_rows() == 60
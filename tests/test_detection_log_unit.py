@@ -0,0 +1,75 @@
+# region imports
+# Standard library imports
+import time
+
+# Third-party imports
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.detection_log import DetectionLogWriter
+# endregion imports
+
+DAY = 86400
+
+
+def read_dataset(path):
+    return ds.dataset(str(path), format="parquet", partitioning="hive").to_table()
+
+
+class TestDetectionLogWriter:
+    """Test cases for the Parquet detection log."""
+
+    def test_partitioned_by_date_and_stream(self, tmp_path):
+        writer = DetectionLogWriter(str(tmp_path), max_batch_rows=3)
+        day_one = 20000 * DAY + 100.0
+        for i in range(5):
+            writer.append("person", 0.9, 0.1, 0.2, 0.3, 0.4, track_id=i, frame=i, stream_id="src_0", timestamp=day_one)
+            writer.append("car", 0.8, 0.5, 0.5, 0.1, 0.1, frame=i, stream_id="src_1", timestamp=day_one)
+        writer.append("person", 0.7, 0.1, 0.1, 0.1, 0.1, stream_id="src_0", timestamp=day_one + DAY)
+        writer.close()
+
+        partitions = sorted(str(path.relative_to(tmp_path).parent) for path in tmp_path.rglob("*.parquet"))
+        assert partitions == [
+            "date=2024-10-04/stream_id=src_0",
+            "date=2024-10-04/stream_id=src_1",
+            "date=2024-10-05/stream_id=src_0",
+        ]
+        table = read_dataset(tmp_path)
+        assert table.num_rows == 11
+        assert writer.get_stats()["rows_written"] == 11
+        persons = table.filter(ds.field("label") == "person").to_pydict()
+        assert sorted(track for track in persons["track_id"] if track is not None) == list(range(5))
+
+    def test_time_based_flush(self, tmp_path):
+        writer = DetectionLogWriter(str(tmp_path), flush_interval=0.0)
+        writer.append("person", 0.9, 0.1, 0.2, 0.3, 0.4)
+        writer.maybe_flush()
+        writer.close()
+        assert read_dataset(tmp_path).num_rows == 1
+
+    def test_files_closed_periodically(self, tmp_path):
+        writer = DetectionLogWriter(str(tmp_path), flush_interval=0.0, file_interval=0.05)
+        writer.append("person", 0.9, 0.1, 0.2, 0.3, 0.4)
+        writer.maybe_flush()
+        # Readable before close(), e.g. after a crash
+        deadline = time.monotonic() + 5
+        while writer.get_stats()["files_written"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert read_dataset(tmp_path).num_rows == 1
+        writer.append("car", 0.8, 0.5, 0.5, 0.1, 0.1)
+        writer.close()
+        assert read_dataset(tmp_path).num_rows == 2
+        assert writer.get_stats()["files_written"] == 2
+
+    def test_append_cost(self, tmp_path):
+        writer = DetectionLogWriter(str(tmp_path), max_batch_rows=1_000_000)
+        count = 20000
+        start = time.perf_counter()
+        for i in range(count):
+            writer.append("person", 0.9, 0.1, 0.2, 0.3, 0.4, i, i, i * 1000, "src_0", 1.0e9)
+        per_detection_us = (time.perf_counter() - start) / count * 1e6
+        writer.close()
+        assert per_detection_us < 20
@@ -0,0 +1,121 @@
+# region imports
+# Standard library imports
+import argparse
+
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.core import get_default_parser, parse_frame_rate
+from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    DISPLAY_PIPELINE,
+    FILE_SINK_PIPELINE,
+    INFERENCE_PIPELINE,
+    INFERENCE_PIPELINE_WRAPPER,
+    PARALLEL_INFERENCE_PIPELINE,
+    VIDEO_SHMSINK_PIPELINE,
+    VIDEO_SHMSRC_PIPELINE,
+)
+# endregion imports
+
+
+class TestParallelInferencePipeline:
+    """Test cases for the multi-model fan-out helper."""
+
+    def test_single_model_is_plain_wrapper(self):
+        """A single inner pipeline should not add a tee or a muxer."""
+        inner = INFERENCE_PIPELINE(hef_path="model.hef", name="det")
+        pipeline = PARALLEL_INFERENCE_PIPELINE([inner])
+        assert pipeline == INFERENCE_PIPELINE_WRAPPER(inner, name="parallel_inference_wrapper_0")
+        assert "tee" not in pipeline
+        assert "hailomuxer" not in pipeline
+
+    def test_three_models_single_tee_chained_muxers(self):
+        """N models should share one tee and be merged by N-1 muxers."""
+        inners = [INFERENCE_PIPELINE(hef_path=f"model{i}.hef", name=f"net{i}") for i in range(3)]
+        pipeline = PARALLEL_INFERENCE_PIPELINE(inners, name="par")
+
+        assert pipeline.count("tee name=par_tee") == 1
+        assert pipeline.count("par_tee. !") == 3
+        assert pipeline.count("hailomuxer name=") == 2
+        assert "par_mux_1.sink_0" in pipeline
+        assert "par_mux_1.sink_1" in pipeline
+        assert "par_mux_2.sink_0" in pipeline
+        assert "par_mux_2.sink_1" in pipeline
+        # The merged stream leaves through the last muxer
+        assert pipeline.rstrip().endswith(
+            "par_mux_2. ! queue name=par_output_q leaky=no max-size-buffers=3 max-size-bytes=0 max-size-time=0"
+        )
+        for i in range(3):
+            assert f"hailonet name=net{i}_hailonet" in pipeline
+            assert f"hailocropper name=par_wrapper_{i}_crop" in pipeline
+
+    def test_empty_list_raises(self):
+        with pytest.raises(ValueError):
+            PARALLEL_INFERENCE_PIPELINE([])
+
+
+class TestSharedMemoryPipelines:
+    """Test cases for the shm sink/source helpers."""
+
+    def test_shmsink_keeps_negotiated_caps_by_default(self):
+        pipeline = VIDEO_SHMSINK_PIPELINE(socket_path="/tmp/hailo.sock")
+        assert "video/x-raw !" in pipeline
+        assert "width=" not in pipeline
+        assert "wait-for-connection=false" in pipeline
+
+    def test_shmsink_and_shmsrc_caps_match(self):
+        sink = VIDEO_SHMSINK_PIPELINE(socket_path="/tmp/hailo.sock", video_format="NV12", width=1280, height=720)
+        src = VIDEO_SHMSRC_PIPELINE(socket_path="/tmp/hailo.sock", video_format="NV12", width=1280, height=720, frame_rate=None)
+        caps = "video/x-raw,format=NV12,width=1280,height=720"
+        assert f"{caps} ! shmsink" in sink
+        assert f"{caps} ! videoconvert" in src
+
+
+class TestDisplayPipeline:
+    """Test cases for the display helper."""
+
+    def test_latency_overlay(self):
+        assert "timeoverlay" not in DISPLAY_PIPELINE()
+        pipeline = DISPLAY_PIPELINE(latency_overlay=True)
+        assert "timeoverlay name=hailo_display_timeoverlay time-mode=running-time" in pipeline
+        # The overlay is drawn after the conversion, right before the sink queue
+        assert pipeline.index("hailo_display_videoconvert ") < pipeline.index("timeoverlay") < pipeline.index(
+            "queue name=hailo_display_q "
+        )
+
+    def test_default_has_no_preview_branch(self):
+        pipeline = DISPLAY_PIPELINE()
+        assert "tee" not in pipeline
+        assert "videoscale" not in pipeline
+        assert "videorate" not in pipeline
+
+    def test_preview_downscaled_before_overlay(self):
+        pipeline = DISPLAY_PIPELINE(preview_size=(640, 360), preview_fps=15)
+        assert "video/x-raw, width=640, height=360" in pipeline
+        assert "max-rate=15" in pipeline
+        # Rate limiting first, so dropped frames are not scaled; scaling before the overlay
+        assert pipeline.index("hailo_display_videorate") < pipeline.index("hailo_display_videoscale ")
+        assert pipeline.index("width=640") < pipeline.index("hailooverlay")
+
+    @pytest.mark.parametrize("fps", [0.5, 2.5, -1])
+    def test_preview_fps_must_be_whole_max_rate(self, fps):
+        # videorate max-rate is an integer >= 1: 0.5 would become the invalid max-rate=0
+        with pytest.raises(ValueError):
+            DISPLAY_PIPELINE(preview_fps=fps)
+
+    def test_parse_frame_rate(self):
+        assert parse_frame_rate("15") == 15
+        for text in ["0.5", "2.5", "0", "-3", "fast"]:
+            with pytest.raises(argparse.ArgumentTypeError):
+                parse_frame_rate(text)
+        assert get_default_parser().parse_args(["--preview-fps", "2"]).preview_fps == 2
+
+    def test_full_res_branch_split_before_preview(self):
+        record = FILE_SINK_PIPELINE(output_file="out.mkv", name="record")
+        pipeline = DISPLAY_PIPELINE(preview_size=(640, 360), full_res_pipeline=record)
+        assert pipeline.startswith("tee name=hailo_display_tee ")
+        full_res_branch, preview_branch = pipeline.split("hailo_display_tee. ! ")[1:]
+        assert "filesink location=out.mkv" in full_res_branch
+        assert "hailooverlay" not in full_res_branch
+        assert preview_branch.startswith("queue name=hailo_display_preview_q leaky=downstream")
+        assert "hailooverlay" in preview_branch
@@ -0,0 +1,121 @@
+# region imports
+# Standard library imports
+from types import SimpleNamespace
+
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer.inference_gating import (
+    CombinedGate,
+    InferenceStrideGate,
+    MotionGate,
+    create_inference_gate,
+)
+# endregion imports
+
+FRAME_NS = 33_333_333  # 30 FPS
+
+
+def run_stride_gate(gate, num_frames, frame_ns=FRAME_NS):
+    """Feeds timestamps to a gate and returns the per-frame decisions."""
+    return [gate.evaluate(SimpleNamespace(pts=i * frame_ns), None) for i in range(num_frames)]
+
+
+class TestInferenceStrideGate:
+    """Test cases for the inference decimation gate."""
+
+    def test_stride_one_infers_every_frame(self):
+        gate = InferenceStrideGate(stride=1)
+        assert all(run_stride_gate(gate, 10))
+        assert gate.get_gated_ratio() == 0.0
+
+    def test_stride_three(self):
+        gate = InferenceStrideGate(stride=3)
+        decisions = run_stride_gate(gate, 9)
+        assert decisions == [True, False, False] * 3
+        assert gate.get_stats()["gated_frames"] == 6
+
+    def test_target_fps(self):
+        """30 FPS input at a 10 FPS inference target should infer one frame in three."""
+        gate = InferenceStrideGate(target_fps=10)
+        decisions = run_stride_gate(gate, 30)
+        assert sum(decisions) == 10
+        assert decisions[0]
+
+    def test_target_fps_restarts_with_stream(self):
+        gate = InferenceStrideGate(target_fps=1)
+        run_stride_gate(gate, 40)
+        # Timestamps going back (e.g. file loop) restart the schedule
+        assert gate.evaluate(SimpleNamespace(pts=0), None)
+
+    @pytest.mark.parametrize("kwargs", [{"stride": 0}, {"target_fps": 0}])
+    def test_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            InferenceStrideGate(**kwargs)
+
+
+def synthetic_frames(num_frames, moving_from=None, moving_to=None, size=(60, 80), seed=0):
+    """Builds a static noisy background with a bright square moving during [moving_from, moving_to)."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 200, size=size, dtype=np.uint8)
+    frames = []
+    for i in range(num_frames):
+        # Sensor noise well below the pixel threshold
+        frame = np.clip(background.astype(np.int16) + rng.integers(-3, 4, size=size), 0, 255).astype(np.uint8)
+        if moving_from is not None and moving_from <= i < moving_to:
+            x = 2 * (i - moving_from)
+            frame[20:35, x : x + 15] = 255
+        frames.append(frame)
+    return frames
+
+
+class TestMotionGate:
+    """Test cases for the motion gate on synthetic downscaled frames (CPU only)."""
+
+    def test_static_scene_is_gated(self):
+        gate = MotionGate(hold_frames=2, keyframe_interval=None)
+        decisions = [gate.update(frame) for frame in synthetic_frames(30)]
+        # Only the first frame (no reference yet) and the hysteresis frames run inference
+        assert decisions[:3] == [True, True, True]
+        assert not any(decisions[3:])
+
+    def test_motion_triggers_inference_with_hysteresis(self):
+        gate = MotionGate(hold_frames=5, keyframe_interval=None)
+        decisions = [gate.update(frame) for frame in synthetic_frames(60, moving_from=20, moving_to=30)]
+        assert not any(decisions[10:20])
+        assert all(decisions[20:31])
+        # Inference keeps running for hold_frames after the square disappears, then stops
+        assert all(decisions[31:36])
+        assert not any(decisions[36:])
+        assert gate.motion_frames >= 10
+
+    def test_keyframe_interval_refreshes_static_scene(self):
+        gate = MotionGate(hold_frames=0, keyframe_interval=10)
+        decisions = [gate.update(frame) for frame in synthetic_frames(41)]
+        assert [i for i, infer in enumerate(decisions) if infer] == [0, 10, 20, 30, 40]
+        assert gate.keyframes == 4
+
+    def test_pixel_threshold_option(self):
+        from hailo_apps.hailo_app_python.core.common.core import get_default_parser
+
+        parser = get_default_parser()
+        assert create_inference_gate(parser.parse_args(["--motion-gate"])).gate.pixel_threshold == 25
+        options = parser.parse_args(["--motion-gate", "--motion-pixel-threshold", "40"])
+        assert create_inference_gate(options).gate.pixel_threshold == 40
+
+
+class TestCombinedGate:
+    """Test cases for gates combined with CombinedGate."""
+
+    def test_keyframe_interval_counts_combined_decisions(self):
+        motion_gate = MotionGate(hold_frames=0, keyframe_interval=3)
+        motion_gate._get_downscaled_luma = lambda buffer, pad: buffer.luma
+        gate = CombinedGate([InferenceStrideGate(stride=2), motion_gate])
+        decisions = [
+            gate.evaluate(SimpleNamespace(pts=i * FRAME_NS, luma=frame), None)
+            for i, frame in enumerate(synthetic_frames(25))
+        ]
+        # A keyframe vetoed by the stride (odd frame) is inferred on the next allowed frame
+        assert [i for i, infer in enumerate(decisions) if infer] == [0, 4, 8, 12, 16, 20, 24]
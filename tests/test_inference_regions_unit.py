@@ -0,0 +1,48 @@
+# region imports
+# Standard library imports
+import argparse
+from types import SimpleNamespace
+
+# Third-party imports
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer.inference_regions import (
+    create_inference_regions,
+    map_bbox_to_frame,
+    parse_region,
+)
+# endregion imports
+
+
+class TestInferenceRegions:
+    """Test cases for region-of-interest parsing and coordinate mapping."""
+
+    def test_parse_region(self):
+        assert parse_region("0.25,0.1,0.5,0.8") == (0.25, 0.1, 0.5, 0.8)
+
+    @pytest.mark.parametrize("text", ["0.1,0.1,0.5", "a,b,c,d", "0.1,0.1,0,0.5", "0.6,0.0,0.5,0.5"])
+    def test_parse_invalid_region(self, text):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_region(text)
+
+    def test_invalid_roi_option_is_a_usage_error(self, capsys):
+        from hailo_apps.hailo_app_python.core.common.core import get_default_parser
+
+        parser = get_default_parser()
+        assert parser.parse_args(["--roi", "0,0,0.5,1"]).roi == [(0.0, 0.0, 0.5, 1.0)]
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--roi", "0.6,0,0.5,0.5"])
+        assert "must be inside the frame" in capsys.readouterr().err
+
+    def test_map_bbox_to_frame(self):
+        region = (0.5, 0.25, 0.5, 0.5)
+        assert map_bbox_to_frame(region, 0.0, 0.0, 1.0, 1.0) == region
+        assert map_bbox_to_frame(region, 0.5, 0.5, 0.2, 0.4) == pytest.approx((0.75, 0.5, 0.1, 0.2))
+
+    def test_no_roi_option(self):
+        assert create_inference_regions(SimpleNamespace(roi=None)) is None
+
+    def test_multiple_regions(self):
+        controller = create_inference_regions(SimpleNamespace(roi=["0,0,0.5,1", "0.5,0,0.5,1"]))
+        assert controller.regions == [(0.0, 0.0, 0.5, 1.0), (0.5, 0.0, 0.5, 1.0)]
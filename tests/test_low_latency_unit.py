@@ -0,0 +1,42 @@
+# region imports
+# Third-party imports
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer.low_latency import DeadlineDropStage, LatencyMonitor
+# endregion imports
+
+
+class TestLatencyMonitor:
+    """Test cases for the capture-to-display latency statistics."""
+
+    def test_empty_stats(self):
+        assert LatencyMonitor().get_stats() == {"frames": 0}
+
+    def test_stats(self):
+        monitor = LatencyMonitor()
+        for latency_ms in range(1, 101):
+            monitor.add_sample(float(latency_ms))
+        stats = monitor.get_stats()
+        assert stats["frames"] == 100
+        assert stats["mean_ms"] == 50.5
+        assert stats["p95_ms"] == 95.0
+        assert stats["max_ms"] == 100.0
+
+
+class TestDeadlineDropStage:
+    """Test cases for the per-source deadline drop counters."""
+
+    def test_counters_per_source(self):
+        stage = DeadlineDropStage(budget_ms=100)
+        for i in range(6):
+            stage.count("src_0", dropped=i < 2)
+        stage.count("src_1", dropped=False)
+        assert stage.get_stats() == {
+            "src_0": {"frames": 6, "dropped": 2},
+            "src_1": {"frames": 1, "dropped": 0},
+        }
+
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            DeadlineDropStage(budget_ms=0)
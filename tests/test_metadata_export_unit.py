@@ -0,0 +1,98 @@
+# region imports
+# Standard library imports
+import json
+import socket
+import threading
+
+# Third-party imports
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.metadata_export import (
+    JsonlFileSink,
+    MetadataExportWorker,
+    UdpSink,
+    UnixSocketSink,
+    create_metadata_sink,
+)
+# endregion imports
+
+
+class BlockedSink:
+    """A sink that blocks until released, to simulate a slow destination."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lines = []
+
+    def write_batch(self, lines):
+        self.release.wait()
+        self.lines.extend(lines)
+        return len(lines)
+
+    def close(self):
+        pass
+
+
+class TestMetadataExport:
+    """Test cases for the metadata export sinks and background writer."""
+
+    def test_jsonl_export(self, tmp_path):
+        path = tmp_path / "detections.jsonl"
+        worker = MetadataExportWorker(JsonlFileSink(str(path)), batch_size=4)
+        worker.start()
+        for i in range(10):
+            worker.submit({"frame": i, "detections": [{"label": "person", "bbox": [0.1, 0.1, 0.2, 0.2]}]})
+        worker.stop()
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record["frame"] for record in records] == list(range(10))
+        assert worker.get_stats()["records_written"] == 10
+
+    def test_back_pressure_drops_instead_of_blocking(self):
+        sink = BlockedSink()
+        worker = MetadataExportWorker(sink, batch_size=1, max_pending=5)
+        worker.start()
+        # The writer thread holds at most one record while blocked; the rest overflow the queue
+        results = [worker.submit({"frame": i}) for i in range(20)]
+        assert not all(results)
+        sink.release.set()
+        worker.stop()
+        stats = worker.get_stats()
+        assert stats["records_dropped"] == results.count(False)
+        assert stats["records_written"] + stats["records_dropped"] == 20
+
+    def test_udp_batches_records_into_datagrams(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(2.0)
+        sink = UdpSink("127.0.0.1", receiver.getsockname()[1], max_datagram_size=64)
+        lines = [json.dumps({"frame": i}).encode() for i in range(8)]
+        assert sink.write_batch(lines) == 8
+        received = []
+        while len(received) < 8:
+            datagram = receiver.recv(65536)
+            assert len(datagram) <= 64
+            received.extend(datagram.splitlines())
+        assert received == lines
+        sink.close()
+        receiver.close()
+
+    def test_unix_socket_without_listener_drops(self, tmp_path):
+        sink = UnixSocketSink(str(tmp_path / "missing.sock"))
+        assert sink.write_batch([b'{"frame":1}']) == 0
+        sink.close()
+
+    @pytest.mark.parametrize(
+        "spec, sink_type",
+        [("udp:127.0.0.1:5555", UdpSink), ("unix:/tmp/hailo_metadata.sock", UnixSocketSink)],
+    )
+    def test_create_metadata_sink(self, spec, sink_type):
+        sink = create_metadata_sink(spec)
+        assert isinstance(sink, sink_type)
+        assert repr(sink) == spec
+        sink.close()
+
+    @pytest.mark.parametrize("spec", ["tcp:host:1", "udp:nohostport", "udp:host:port"])
+    def test_invalid_destination(self, spec):
+        with pytest.raises(ValueError):
+            create_metadata_sink(spec)
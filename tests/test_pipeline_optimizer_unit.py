@@ -0,0 +1,62 @@
+# region imports
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import (
+    DISPLAY_PIPELINE,
+    QUEUE,
+    TRACKER_PIPELINE,
+    USER_CALLBACK_PIPELINE,
+)
+from hailo_apps.hailo_app_python.core.gstreamer.pipeline_optimizer import (
+    coalesce_queues,
+    count_streaming_threads,
+    split_pipeline_string,
+)
+# endregion imports
+
+
+class TestCoalesceQueues:
+    """Test cases for the queue coalescing pass."""
+
+    def test_split_ignores_quoted_links(self):
+        segments = split_pipeline_string('filesrc location="a!b.mp4" ! decodebin')
+        assert len(segments) == 2
+        assert "a!b.mp4" in segments[0]
+
+    def test_adjacent_helper_queues_merged(self):
+        pipeline = f"videotestsrc ! {TRACKER_PIPELINE(class_id=1)} ! {USER_CALLBACK_PIPELINE()} ! fakesink"
+        optimized, report = coalesce_queues(pipeline)
+        assert report["removed"] == ["hailo_tracker_q"]
+        assert "hailo_tracker_q" not in optimized
+        assert "name=identity_callback_q" in optimized
+        assert report["threads_before"] == 3
+        assert report["threads_after"] == 2
+
+    def test_multisource_callback_queue_merged(self):
+        pipeline = (
+            f"videotestsrc ! {USER_CALLBACK_PIPELINE(name='src_0_callback')} ! "
+            f"{QUEUE(name='callback_q_0')} ! {DISPLAY_PIPELINE(name='hailo_display_0')}"
+        )
+        optimized, report = coalesce_queues(pipeline)
+        assert report["removed"] == ["callback_q_0"]
+        assert "name=hailo_display_0_overlay_q" in optimized
+
+    def test_merged_queue_keeps_largest_size(self):
+        pipeline = f"videotestsrc ! {QUEUE('a', max_size_buffers=20)} ! {QUEUE('b', max_size_buffers=3)} ! fakesink"
+        optimized, _ = coalesce_queues(pipeline)
+        assert "name=b" in optimized
+        assert "max-size-buffers=20" in optimized
+        assert count_streaming_threads(optimized) == 2
+
+    def test_different_leaky_not_merged(self):
+        pipeline = f"videotestsrc ! {QUEUE('a')} ! {QUEUE('b', leaky='downstream')} ! fakesink"
+        optimized, report = coalesce_queues(pipeline)
+        assert optimized == pipeline
+        assert report["queues_removed"] == 0
+
+    def test_referenced_queue_not_merged(self):
+        pipeline = f"videotestsrc ! {QUEUE('a')} ! {QUEUE('b')} ! fakesink  a. ! fakesink"
+        assert coalesce_queues(pipeline)[0] == pipeline
+
+    def test_branch_start_not_merged(self):
+        pipeline = f"videotestsrc ! tee name=t ! {QUEUE('a')} ! fakesink t. ! {QUEUE('b')} ! fakesink"
+        assert coalesce_queues(pipeline)[0] == pipeline
@@ -0,0 +1,85 @@
+# region imports
+# Third-party imports
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.gstreamer import probe_dispatcher
+from hailo_apps.hailo_app_python.core.gstreamer.probe_dispatcher import ProbeDispatcher
+# endregion imports
+
+
+class FakeInfo:
+    def __init__(self, buffer=None):
+        self.buffer = buffer
+
+    def get_buffer(self):
+        return self.buffer
+
+
+class FakeRoi:
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+
+    def get_stream_id(self):
+        return self.stream_id
+
+
+def recording_handler(calls, name):
+    def handler(pad, info, user_data):
+        calls.append((name, user_data))
+        return probe_dispatcher.Gst.PadProbeReturn.OK
+
+    return handler
+
+
+class TestProbeDispatcher:
+    """Test cases for the single-probe handler dispatcher."""
+
+    def test_handlers_run_by_order_then_registration(self):
+        calls = []
+        dispatcher = ProbeDispatcher()
+        dispatcher.register("app_callback", recording_handler(calls, "app"), "user")
+        dispatcher.register("per_source", recording_handler(calls, "source"), order=1)
+        dispatcher.register("vector_db", recording_handler(calls, "db"), order=-1)
+        dispatcher.register("second_app", recording_handler(calls, "app2"))
+        dispatcher.dispatch(None, FakeInfo())
+        assert calls == [("db", None), ("app", "user"), ("app2", None), ("source", None)]
+
+    def test_disable_at_runtime(self):
+        calls = []
+        dispatcher = ProbeDispatcher()
+        dispatcher.register("a", recording_handler(calls, "a"))
+        dispatcher.register("b", recording_handler(calls, "b"))
+        dispatcher.set_enabled("a", False)
+        dispatcher.dispatch(None, FakeInfo())
+        dispatcher.set_enabled("a", True)
+        dispatcher.dispatch(None, FakeInfo())
+        assert [name for name, _ in calls] == ["b", "a", "b"]
+        stats = dispatcher.get_stats()
+        assert stats["a"]["calls"] == 1
+        assert stats["b"]["calls"] == 2
+        assert "mean_ms" in stats["b"] and "max_ms" in stats["b"]
+        with pytest.raises(KeyError):
+            dispatcher.set_enabled("missing", False)
+
+    def test_register_again_replaces_and_keeps_stats(self):
+        calls = []
+        dispatcher = ProbeDispatcher()
+        dispatcher.register("a", recording_handler(calls, "old"))
+        dispatcher.dispatch(None, FakeInfo())
+        dispatcher.register("a", recording_handler(calls, "new"))
+        dispatcher.dispatch(None, FakeInfo())
+        assert [name for name, _ in calls] == ["old", "new"]
+        assert len(dispatcher) == 1
+        assert dispatcher.get_stats()["a"]["calls"] == 2
+
+    def test_stream_filter(self, monkeypatch):
+        monkeypatch.setattr(probe_dispatcher.hailo, "get_roi_from_buffer", lambda buffer: FakeRoi(buffer), raising=False)
+        calls = []
+        dispatcher = ProbeDispatcher()
+        dispatcher.register("all", recording_handler(calls, "all"))
+        dispatcher.register("src_0", recording_handler(calls, "src_0"), stream_id="src_0")
+        dispatcher.register("src_1", recording_handler(calls, "src_1"), stream_id="src_1")
+        dispatcher.dispatch(None, FakeInfo("src_1"))
+        dispatcher.dispatch(None, FakeInfo("'src_0'"))
+        assert [name for name, _ in calls] == ["all", "src_1", "all", "src_0"]
@@ -0,0 +1,93 @@
+# region imports
+# Standard library imports
+import os
+import struct
+import subprocess
+
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local application-specific imports
+from hailo_apps.hailo_app_python.core.common.shm_frames import (
+    SharedMemoryFrameReader,
+    SharedMemoryFrameWriter,
+)
+# endregion imports
+
+
+@pytest.fixture
+def writer():
+    writer = SharedMemoryFrameWriter(f"hailo_test_frames_{os.getpid()}", num_slots=3)
+    yield writer
+    writer.close()
+
+
+def make_frame(value, height=48, width=64):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+class TestSharedMemoryFrames:
+    """Test cases for the shared-memory frame ring."""
+
+    def test_round_trip_with_metadata(self, writer):
+        metadata = {"detections": [{"label": "person", "confidence": 0.9, "bbox": [0.1, 0.2, 0.3, 0.4]}]}
+        assert writer.write(make_frame(7), "RGB", 64, 48, pts=1000, metadata=metadata)
+
+        reader = SharedMemoryFrameReader(writer.name)
+        shared_frame = reader.read_latest()
+        assert shared_frame.frame.shape == (48, 64, 3)
+        assert np.all(shared_frame.frame == 7)
+        assert shared_frame.pts == 1000
+        assert shared_frame.metadata == metadata
+        # No new frame since the last read
+        assert reader.read_latest() is None
+        del shared_frame
+        reader.close()
+
+    def test_multiple_readers(self, writer):
+        writer.write(make_frame(1), "RGB", 64, 48)
+        readers = [SharedMemoryFrameReader(writer.name) for _ in range(3)]
+        frames = [reader.read_latest(copy=True) for reader in readers]
+        assert all(shared_frame.seq == 1 for shared_frame in frames)
+        for reader in readers:
+            reader.close()
+
+    def test_view_invalidated_when_ring_wraps(self, writer):
+        writer.write(make_frame(1), "RGB", 64, 48)
+        reader = SharedMemoryFrameReader(writer.name)
+        shared_frame = reader.read_latest()
+        assert reader.is_valid(shared_frame)
+        for value in range(2, 2 + writer.num_slots):
+            writer.write(make_frame(value), "RGB", 64, 48)
+        assert not reader.is_valid(shared_frame)
+        # The reader skips to the newest frame
+        assert reader.read_latest(copy=True).seq == 1 + writer.num_slots
+        del shared_frame
+        reader.close()
+
+    def test_oversized_frame_is_dropped(self, writer):
+        writer.write(make_frame(1), "RGB", 64, 48)
+        assert not writer.write(make_frame(1, height=96), "RGB", 64, 96)
+        assert writer.get_stats()["frames_dropped"] == 1
+
+    def test_live_segment_is_not_replaced(self, writer):
+        writer.write(make_frame(1), "RGB", 64, 48)
+        with pytest.raises(FileExistsError):
+            SharedMemoryFrameWriter(writer.name)
+
+    def test_stale_segment_is_replaced(self, writer):
+        writer.write(make_frame(1), "RGB", 64, 48)
+        # The writer process died: its PID is gone and the segment was never unlinked
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        struct.pack_into("<I", writer._shm.buf, 40, dead.pid)
+        writer._shm.close()
+        writer._shm = None
+
+        replacement = SharedMemoryFrameWriter(writer.name)
+        assert replacement.write(make_frame(2), "RGB", 64, 48)
+        reader = SharedMemoryFrameReader(writer.name)
+        assert reader.read_latest(copy=True).seq == 1
+        reader.close()
+        replacement.close()